@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
+from app.core import exceptions
 from app.core.db.deps import AsyncSession, get_async_session
 from app.models.user import User
 from app.schemas.game import (
     GameModeInGameSchema,
-    GameSchemaOut,
+    GameSummarySchema,
+    GameHistoryPage,
     GameRules,
     ModesAndRules,
 )
 from app.api.services.games import GameService
+from app.api.services.lobby import lobby_index
 from app.auth.deps import get_current_user_dependency
 
 router = APIRouter()
@@ -41,21 +44,27 @@ async def update_rules(
 
 @router.get(
     '/games',
-    response_model=list[GameSchemaOut],
+    response_model=list[GameSummarySchema],
     description='Получить список игр, к которым можно присоединиться (как игрок или зритель)',
 )
-async def read_available_games(
-        user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_async_session),
-):
-    available_games = await GameService(db).get_available_games()
-    return available_games
+async def read_available_games(user: User = Depends(get_current_user)):
+    # список поддерживается в памяти по событиям игр (см. lobby.py)
+    return lobby_index.summaries()
 
 
-@router.get('/games/mine')
+@router.get(
+    '/games/mine',
+    response_model=GameHistoryPage,
+    description='Получить завершенные игры текущего юзера постранично, от новых к старым',
+)
 async def read_my_finished_games(
         user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_async_session),
+        limit: int = Query(20, ge=1, le=100, description='Размер страницы'),
+        cursor: str | None = Query(None, description='next_cursor предыдущей страницы'),
 ):
-    # TODO: Вернуть все Game с state=finished, user in get_players(game) ---
-    return {'hello': f'Hi, {user.name}', 'resp': f'You are not finished any game yet'}
+    try:
+        games, next_cursor = await GameService(db).get_finished_games_page(user, limit=limit, cursor=cursor)
+    except exceptions.InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='INVALID_CURSOR')
+    return GameHistoryPage(games=games, next_cursor=next_cursor)
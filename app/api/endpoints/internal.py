@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+
+from app.core.db.session import engine
+from app.core.ws.base import WebSocketActions
+from app.models.user import User
+from app.schemas.internal import DBPoolStatsSchema, WSStatsSchema
+from app.auth.deps import get_current_user_dependency
+
+router = APIRouter()
+get_current_superuser = get_current_user_dependency(is_verified=True, is_superuser=True)
+
+
+@router.get(
+    '/db-pool',
+    response_model=DBPoolStatsSchema,
+    description='Статистика пула соединений с БД текущего процесса (для подбора размера пула)',
+)
+async def read_db_pool_stats(user: User = Depends(get_current_superuser)):
+    return engine.pool.snapshot()
+
+
+@router.get(
+    '/ws',
+    response_model=WSStatsSchema,
+    description='Очереди исходящих сообщений вебсокетов текущего процесса: глубина и отброшенные сообщения',
+)
+async def read_ws_stats(user: User = Depends(get_current_superuser)):
+    return WebSocketActions.manager.metrics()
@@ -1,3 +1,5 @@
+import asyncio
+import logging
 import uuid
 from typing import Any
 from contextlib import asynccontextmanager
@@ -10,17 +12,24 @@ from app.core import exceptions
 from app.core.db.deps import get_async_session
 from app.core.ws.base import WebSocketActions
 from app.core.ws.manager import WSConnection
+from app.api.services import loaders
 from app.api.services.games import GameService
+from app.api.services.live import LiveGame, LiveMoveResult, live_games
+from app.api.services.lobby import lobby_index
 from app.auth.deps import get_current_user_dependency
 from app.auth.services import UserService
+from app.models.game import Game
 from app.models.user import User
 from app.schemas.game import GameCreateSchema, GameSchemaOut, GameJoinSchema, MoveInputSchema
 from app.schemas import message
 from app.enums.game import GameStateEnum, PlayerRoleEnum
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 get_current_user = get_current_user_dependency(is_verified=True, websocket_mode=True)
 async_session_context = asynccontextmanager(get_async_session)
+# фоновые задачи ходов бота по ID игры: не больше одной на игру, ссылки - чтобы их не собрал GC
+bot_tasks: dict[uuid.UUID, asyncio.Task] = {}
 
 
 class RenjuWSEndpoint(WebSocketActions):
@@ -35,6 +44,8 @@ class RenjuWSEndpoint(WebSocketActions):
                 user = await UserService(db).get_user_by_id(connection.user_id)
                 game_meta = await GameService(db).create_game(creator=user, game_data=game_input_data)
                 game_schema = GameSchemaOut.from_orm(game_meta.game)
+                lobby_row = lobby_index.update(game_schema)
+                self.sync_room(game_meta.game)
 
                 # открытие созданной игры
                 await self.manager.send_message(
@@ -49,8 +60,9 @@ class RenjuWSEndpoint(WebSocketActions):
                 if all([
                     not game_schema.is_private,
                     not game_schema.with_myself,
+                    not game_schema.with_bot,
                 ]):
-                    await self.manager.broadcast(message.GameAddedMessage(game=game_schema))
+                    await self.manager.broadcast(message.GameAddedMessage(game=lobby_row))
         except exceptions.UnfinishedGame:
             await self.manager.send_message(
                 websocket=connection.websocket,
@@ -67,8 +79,14 @@ class RenjuWSEndpoint(WebSocketActions):
             game_input_data = GameJoinSchema(id=uuid.UUID(data['game_id']))
             async with async_session_context() as db:
                 user = await UserService(db).get_user_by_id(connection.user_id)
-                game_meta = await GameService(db).join_game(player=user, game_id=game_input_data.id)
+                # идущая игра читается из БД - ходы ждут, ход из памяти успевает записаться
+                async with live_games.reloading(game_input_data.id):
+                    game_meta = await GameService(db).join_game(player=user, game_id=game_input_data.id)
+                    if game_meta.game.state == GameStateEnum.pending:
+                        self.resume_live_game(game_meta.game)
                 game_schema = GameSchemaOut.from_orm(game_meta.game)
+                lobby_row = lobby_index.update(game_schema)
+                self.sync_room(game_meta.game)
 
                 # открытие игры присоединившимся игроком
                 await self.manager.send_message(
@@ -83,8 +101,8 @@ class RenjuWSEndpoint(WebSocketActions):
                     return
 
                 # уведомление игроков и зрителей игры для обновления экрана игры
-                await self.manager.limited_broadcast(
-                    user_ids=[pr.player.id for pr in game_meta.game.players],
+                await self.manager.room_broadcast(
+                    game_id=game_meta.game.id,
                     message=message.PlayerJoinedMessage(
                         game=game_schema,
                         player_name=user.name,
@@ -94,7 +112,7 @@ class RenjuWSEndpoint(WebSocketActions):
 
                 # уведомление всех и вся для обновления списка игр
                 await self.manager.broadcast(message.PlayerJoinedListMessage(
-                    game=game_schema,
+                    game=lobby_row,
                     player_name=user.name,
                     player_role=game_meta.current_role,
                 ))
@@ -129,8 +147,10 @@ class RenjuWSEndpoint(WebSocketActions):
                 if not game_meta.game:
                     return
                 game_schema = GameSchemaOut.from_orm(game_meta.game)
-                await self.manager.limited_broadcast(
-                    user_ids=[pr.player.id for pr in game_meta.game.players],
+                lobby_index.update(game_schema)
+                self.sync_room(game_meta.game)
+                await self.manager.room_broadcast(
+                    game_id=game_meta.game.id,
                     message=message.PlayerReadyMessage(
                         game=game_schema,
                         player_name=game_meta.current_player_name,
@@ -141,6 +161,8 @@ class RenjuWSEndpoint(WebSocketActions):
                 game = await GameService(db).attempt_to_start_game(game_meta.game)
                 if not game:
                     return
+                # дальше ходы идут через состояние в памяти
+                self.resume_live_game(game)
 
                 game_schema = GameSchemaOut.from_orm(game)
                 current_player = game_schema.current_player()
@@ -148,17 +170,18 @@ class RenjuWSEndpoint(WebSocketActions):
                     raise ValueError('Cannot determine current player')
 
                 # для игроков и зрителей: игра началась --> отразить на экране игры
-                await self.manager.limited_broadcast(
-                    user_ids=[pr.player.id for pr in game.players],
+                await self.manager.room_broadcast(
+                    game_id=game.id,
                     message=message.GameStartedMessage(game=game_schema),
                 )
 
                 # для всех: игра началась - отразить в списке игр
-                await self.manager.broadcast(message=message.UpdateGameInListMessage(game=game_schema))
+                lobby_row = lobby_index.update(game_schema)
+                await self.manager.broadcast(message=message.UpdateGameInListMessage(game=lobby_row))
 
                 # для текущего игрока: разблокировать доску
-                await self.manager.send_message(
-                    websocket=self.manager.active_connections.get_websocket(user_id=current_player.player.id),
+                await self.manager.send_to_user(
+                    user_id=current_player.player.id,
                     message=message.UnblockBoardMessage(game=game_schema),
                 )
         except (exceptions.UnsuitableGameState, exceptions.NotAPlayer):
@@ -175,9 +198,11 @@ class RenjuWSEndpoint(WebSocketActions):
             game_input_data = GameJoinSchema(id=uuid.UUID(data['game_id']))
             async with async_session_context() as db:
                 user = await UserService(db).get_user_by_id(connection.user_id)
-                game_meta = await GameService(db).leave(player=user, game_id=game_input_data.id)
-                user_ids = [pr.player.id for pr in game_meta.game.players]
+                async with live_games.reloading(game_input_data.id):
+                    game_meta = await GameService(db).leave(player=user, game_id=game_input_data.id)
+                    self.resume_live_game(game_meta.game)
                 game_schema = GameSchemaOut.from_orm(game_meta.game)
+                self.sync_room(game_meta.game)
 
                 # вернуть на главный экран вышедшего игрока
                 await self.manager.send_message(
@@ -186,31 +211,36 @@ class RenjuWSEndpoint(WebSocketActions):
                 )
 
                 if game_meta.delete:
+                    live_games.discard(game_meta.game.id)
+                    lobby_index.remove(game_meta.game.id)
                     await GameService(db).remove_game(game_meta.game)
                     # для всех: убрать игру из GameList
                     await self.manager.broadcast(message.GameRemovedListMessage(game_id=game_input_data.id))
                     # для участников: выход в главное меню
-                    await self.manager.limited_broadcast(
-                        user_ids=user_ids,
+                    await self.manager.room_broadcast(
+                        game_id=game_input_data.id,
                         message=message.GameRemovedMessage(game_id=game_input_data.id),
                     )
+                    self.manager.close_room(game_input_data.id)
                     return
 
                 # для всех: отразить изменения в списке игр (красный либо пустой индикатор)
-                await self.manager.broadcast(message=message.UpdateGameInListMessage(game=game_schema))
+                lobby_row = lobby_index.update(game_schema)
+                await self.manager.broadcast(message=message.UpdateGameInListMessage(game=lobby_row))
                 # для участников: отразить изменения на экране игры
-                await self.manager.limited_broadcast(
-                    user_ids=user_ids,
+                await self.manager.room_broadcast(
+                    game_id=game_input_data.id,
                     message=message.UpdateGameMessage(game=game_schema),
                 )
 
                 if game_meta.game.state == GameStateEnum.finished:
                     # для участников: отобразить результат
                     verbose_result = game_schema.verbose_result()
-                    await self.manager.limited_broadcast(
-                        user_ids=user_ids,
+                    await self.manager.room_broadcast(
+                        game_id=game_input_data.id,
                         message=message.GameFinishedMessage(game=game_schema, result=verbose_result),
                     )
+                    self.manager.close_room(game_input_data.id)
 
         except exceptions.NotAPlayer:
             pass
@@ -221,38 +251,148 @@ class RenjuWSEndpoint(WebSocketActions):
         try:
             game_input_data = GameJoinSchema(id=uuid.UUID(data['game_id']))
             move_input_data = MoveInputSchema(x=data['x'], y=data['y'])
-            async with async_session_context() as db:
-                user = await UserService(db).get_user_by_id(connection.user_id)
-                move_meta = await GameService(db).move(player=user, cell=move_input_data, game_id=game_input_data.id)
-                user_ids = [pr.player.id for pr in move_meta.game.players]
-                game_schema = GameSchemaOut.from_orm(move_meta.game)
-                await self.manager.limited_broadcast(
-                    user_ids=user_ids,
-                    message=message.MoveMessage(game=move_meta.game, move=move_meta.move),
-                )
-                if move_meta.game.state == GameStateEnum.pending:
-                    current_player = game_schema.current_player()
-                    await self.manager.send_message(
-                        websocket=self.manager.active_connections.get_websocket(user_id=current_player.player.id),
-                        message=message.UnblockBoardMessage(game=game_schema),
-                    )
-                if move_meta.game.state == GameStateEnum.finished:
-                    verbose_result = game_schema.verbose_result()
-                    await self.manager.limited_broadcast(
-                        user_ids=user_ids,
-                        message=message.GameFinishedMessage(
-                            game=game_schema,
-                            result=verbose_result,
-                            winning_cells_coords=[cell.coord for cell in move_meta.winning_cells],
-                        ),
-                    )
-                    await self.manager.broadcast(message=message.UpdateGameInListMessage(game=game_schema))
-        except exceptions.FalseClick:
+            if live_games.get(game_input_data.id) is None:
+                # игра идет, но еще не в памяти этого процесса (например, после перезапуска)
+                await self.load_live_game(game_input_data.id)
+            result = await live_games.move(
+                user_id=connection.user_id,
+                cell=move_input_data,
+                game_id=game_input_data.id,
+            )
+            await self.notify_move(result)
+        except (exceptions.FalseClick, exceptions.NotAPlayer, exceptions.NoGameFound):
             pass
+        except exceptions.ForbiddenMove as e:
+            await self.manager.send_message(
+                websocket=connection.websocket,
+                message=message.ErrorMessage(detail=f'Forbidden move: {e.args[0].value}.'),
+            )
+            # ход не сделан - доска снова доступна тому же игроку
+            await self.manager.send_message(
+                websocket=connection.websocket,
+                message=message.UnblockBoardMessage(game=live_games.get(game_input_data.id).schema),
+            )
         except Exception as e:
             # TODO: log
             raise e
 
+    async def load_live_game(self, game_id: uuid.UUID) -> None:
+        """ Помещает идущую игру из БД в память процесса """
+        async with async_session_context() as db, live_games.reloading(game_id):
+            if (game := await GameService(db).get_game(game_id, loaders.IN_GAME)) is not None:
+                self.resume_live_game(game)
+                self.sync_room(game)
+
+    def resume_live_game(self, game: Game) -> None:
+        """ Помещает игру в память; если сейчас ходить боту (например, после перезапуска), запускает его ход """
+        if (live_game := live_games.load(game)) is not None and live_game.current_player.is_bot:
+            self.schedule_bot_move(live_game.id)
+
+    def sync_room(self, game: Game) -> None:
+        """ Комната игры - по ее игрокам и зрителям из БД """
+        self.manager.set_room(game.id, [pr.player.id for pr in game.players])
+
+    async def notify_move(self, result: LiveMoveResult) -> None:
+        """ Рассылка сделанного хода; передача хода следующему игроку либо объявление результата """
+        live_game = result.game
+        game_schema = live_game.schema
+        await self.manager.room_broadcast(
+            game_id=live_game.id,
+            message=message.MoveMessage(game=game_schema, move=result.move),
+        )
+        if not result.finished:
+            await self.pass_turn(live_game)
+            return
+        verbose_result = game_schema.verbose_result()
+        await self.manager.room_broadcast(
+            game_id=live_game.id,
+            message=message.GameFinishedMessage(
+                game=game_schema,
+                result=verbose_result,
+                winning_cells_coords=[cell.coord for cell in result.winning_cells],
+            ),
+        )
+        self.manager.close_room(live_game.id)
+        lobby_row = lobby_index.update(game_schema)
+        await self.manager.broadcast(message=message.UpdateGameInListMessage(game=lobby_row))
+
+    async def pass_turn(self, live_game: LiveGame) -> None:
+        """ Разблокирует доску игроку, который ходит; за бота ход делается в фоне """
+        current_player = live_game.current_player
+        if current_player.is_bot:
+            self.schedule_bot_move(live_game.id)
+            return
+        await self.manager.send_to_user(
+            user_id=current_player.user_id,
+            message=message.UnblockBoardMessage(game=live_game.schema),
+        )
+
+    async def restore_live_game(self, game_id: uuid.UUID) -> None:
+        """ Ход не записался в БД (см. live.py): игра перечитывается из БД, участникам - ее состояние оттуда """
+        try:
+            await self.load_live_game(game_id)
+            await self.manager.room_broadcast(
+                game_id=game_id,
+                message=message.ErrorMessage(detail='The last move was not saved. The game has been restored.'),
+            )
+            if (live_game := live_games.get(game_id)) is None:
+                return
+            await self.manager.room_broadcast(game_id=game_id, message=message.UpdateGameMessage(game=live_game.schema))
+            await self.pass_turn(live_game)
+        except Exception:
+            logger.exception('Unable to restore game %s', game_id)
+
+    def schedule_bot_move(self, game_id: uuid.UUID) -> None:
+        """ Запускает ход бота в фоне: обработчик сообщений игрока не ждет, пока бот думает """
+        task = bot_tasks.get(game_id)
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            return      # бот уже думает над ходом в этой игре
+        task = bot_tasks[game_id] = asyncio.create_task(self.bot_move(game_id))
+        task.add_done_callback(lambda done: bot_tasks.pop(game_id) if bot_tasks.get(game_id) is done else None)
+
+    async def bot_move(self, game_id: uuid.UUID) -> None:
+        """ Ход бота; если он не удался ``BOT_MOVE_ATTEMPTS`` раз подряд, бот сдается """
+        for attempt in range(1, config.BOT_MOVE_ATTEMPTS + 1):
+            try:
+                result = await live_games.bot_move(game_id)
+            except Exception:
+                logger.exception('Bot move failed in game %s (attempt %s)', game_id, attempt)
+                continue
+            try:
+                if result is not None:
+                    await self.notify_move(result)
+            except Exception:
+                logger.exception('Unable to notify about bot move in game %s', game_id)
+            return
+        try:
+            await self.bot_concede(game_id)
+        except Exception:
+            logger.exception('Bot was unable to concede in game %s', game_id)
+
+    async def bot_concede(self, game_id: uuid.UUID) -> None:
+        """ Бот не может сделать ход: ему засчитывается поражение, игра завершается """
+        if (live_game := live_games.get(game_id)) is None or not live_game.current_player.is_bot:
+            return
+        async with async_session_context() as db:
+            bot = await UserService(db).get_user_by_id(live_game.current_player.user_id)
+            async with live_games.reloading(game_id):
+                game_meta = await GameService(db).leave(player=bot, game_id=game_id)
+                live_games.load(game_meta.game)
+            game_schema = GameSchemaOut.from_orm(game_meta.game)
+            lobby_index.update(game_schema)
+            self.sync_room(game_meta.game)
+        await self.manager.room_broadcast(
+            game_id=game_id,
+            message=message.ErrorMessage(detail='The computer opponent failed to move and conceded.'),
+        )
+        await self.manager.room_broadcast(game_id=game_id, message=message.UpdateGameMessage(game=game_schema))
+        if game_meta.game.state == GameStateEnum.finished:
+            await self.manager.room_broadcast(
+                game_id=game_id,
+                message=message.GameFinishedMessage(game=game_schema, result=game_schema.verbose_result()),
+            )
+            self.manager.close_room(game_id)
+
     async def on_disconnect(self, connection: WSConnection, close_code: int) -> None:
         await super().on_disconnect(connection, close_code)
         if config.DEBUG:
@@ -263,41 +403,51 @@ class RenjuWSEndpoint(WebSocketActions):
                 game_service = GameService(db)
                 active_games = await game_service.get_user_games(user, scope='unfinished')
                 for game in active_games:
-                    game_meta = await game_service.leave(player=user, game_id=game.id)
-                    user_ids = [pr.player.id for pr in game_meta.game.players]
+                    async with live_games.reloading(game.id):
+                        game_meta = await game_service.leave(player=user, game_id=game.id)
+                        self.resume_live_game(game_meta.game)
                     game_schema = GameSchemaOut.from_orm(game_meta.game)
+                    self.sync_room(game_meta.game)
                     if game_meta.delete:
+                        live_games.discard(game.id)
+                        lobby_index.remove(game.id)
                         await game_service.remove_game(game_meta.game)
                         # для всех: убрать игру из списка игр
                         await self.manager.broadcast(message.GameRemovedListMessage(game_id=game.id))
                         # для участников: возврат в главное меню
-                        await self.manager.limited_broadcast(
-                            user_ids=user_ids,
+                        await self.manager.room_broadcast(
+                            game_id=game.id,
                             message=message.GameRemovedMessage(game_id=game.id),
                         )
+                        self.manager.close_room(game.id)
                         return
 
                     # для всех: отразить изменения в списке игр (красный либо пустой индикатор)
-                    await self.manager.broadcast(message=message.UpdateGameInListMessage(game=game_schema))
+                    lobby_row = lobby_index.update(game_schema)
+                    await self.manager.broadcast(message=message.UpdateGameInListMessage(game=lobby_row))
                     # для участников: отразить изменения на экране игры
-                    await self.manager.limited_broadcast(
-                        user_ids=user_ids,
+                    await self.manager.room_broadcast(
+                        game_id=game.id,
                         message=message.UpdateGameMessage(game=game_schema),
                     )
 
                     if game_meta.game.state == GameStateEnum.finished:
                         # для участников: отобразить результат
                         verbose_result = game_schema.verbose_result()
-                        await self.manager.limited_broadcast(
-                            user_ids=user_ids,
+                        await self.manager.room_broadcast(
+                            game_id=game.id,
                             message=message.GameFinishedMessage(game=game_schema, result=verbose_result),
                         )
+                        self.manager.close_room(game.id)
         except exceptions.NotAPlayer:
             pass
         except Exception as e:
             raise e     # TODO: log
 
 
+live_games.on_persist_error = RenjuWSEndpoint().restore_live_game
+
+
 @router.websocket('/renju/ws')
 async def renju(websocket: WebSocket, user: User = Depends(get_current_user)):
     await RenjuWSEndpoint().dispatch(websocket, user)
@@ -0,0 +1,84 @@
+"""
+Архивация завершенных игр.
+
+Ходы игры, завершенной больше ``ARCHIVE_AFTER`` секунд назад, упаковываются в одну колонку
+``gamearchive.moves`` (по 2 байта на ход, см. app/core/codec.py), строки ``move`` игры удаляются, доска обнуляется -
+она восстанавливается по ходам. Так в ``move`` остаются ходы только идущих и недавно завершенных игр.
+
+Читатели игр не различают место хранения: схема игры (``GameSchema``) берет ходы и доску из архива,
+если он есть, а история игр юзера обходится числом ходов ``game.move_count``.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Callable
+
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.core.db.session import async_session_maker
+from app.core.codec import pack_moves
+from app.enums.game import GameStateEnum
+from app.models.game import Game, GameArchive, Move
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveService:
+
+    def __init__(self, db: AsyncSession):
+        self.__db = db
+
+    async def archive_finished_games(self, finished_before: datetime, limit: int) -> int:
+        """
+        Архивирует одной транзакцией до ``limit`` игр, завершенных раньше ``finished_before``
+
+        :return: число архивированных игр
+        """
+        # параллельные задачи архивации (процессы приложения) пропускают чужие игры
+        stmt = (
+            select(Game.id)
+            .where(Game.state == GameStateEnum.finished, Game.finished_at < finished_before, ~Game.archive.has())
+            .order_by(Game.finished_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        game_ids = list(await self.__db.scalars(stmt))
+        if not game_ids:
+            await self.__db.commit()
+            return 0
+        await self.archive_games(game_ids)
+        return len(game_ids)
+
+    async def archive_games(self, game_ids: list[uuid.UUID]) -> None:
+        """ Упаковывает ходы завершенных игр в архив, удаляет их строки move и доски игр """
+        stmt = (
+            select(Move.game_id, Move.role, Move.x, Move.y)
+            .where(Move.game_id.in_(game_ids))
+            .order_by(Move.game_id, Move.id)
+        )
+        moves = {
+            game_id: pack_moves((int(role.value), x, y) for _, role, x, y in rows)
+            for game_id, rows in groupby(await self.__db.execute(stmt), key=lambda row: row.game_id)
+        }
+        self.__db.add_all(GameArchive(game_id=game_id, moves=moves.get(game_id, b'')) for game_id in game_ids)
+        await self.__db.execute(delete(Move).where(Move.game_id.in_(game_ids)))
+        await self.__db.execute(update(Game).where(Game.id.in_(game_ids)).values(board=None))
+        await self.__db.commit()
+
+
+async def run_archive_job(session_maker: Callable[[], AsyncSession] = async_session_maker) -> None:
+    """ Фоновая задача приложения: раз в ``ARCHIVE_INTERVAL`` архивирует все накопившиеся завершенные игры """
+    while True:
+        try:
+            async with session_maker() as db:
+                service = ArchiveService(db)
+                finished_before = datetime.now() - timedelta(seconds=config.ARCHIVE_AFTER)
+                while await service.archive_finished_games(finished_before, config.ARCHIVE_BATCH_SIZE):
+                    pass
+        except Exception:
+            logger.exception('Archive job failed')
+        await asyncio.sleep(config.ARCHIVE_INTERVAL)
@@ -0,0 +1,129 @@
+"""
+Пакетная проверка множества досок одного размера с помощью NumPy
+(валидация реплеев, аналитика, самоигра ботов).
+
+Доски передаются массивом ``(N, size, size)`` типа int8: 0 - пустая клетка, 1..3 - камень роли.
+"""
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+
+# направления линий (dx, dy) в порядке обхода RenjuBoard.check_victory: строка, столбец, диагонали
+DIRECTIONS = ((1, 0), (0, 1), (-1, 1), (1, 1))
+MAX_PLAYERS = 3
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """
+    Результаты проверки пачки досок
+
+    winners: (N,) - роль победителя либо 0
+    draws: (N,) - True, если победителя нет и свободных клеток не осталось
+    winning_cells: (N, length, 2) - координаты (x, y) победных клеток (с 1) либо нули
+    """
+    winners: np.ndarray
+    draws: np.ndarray
+    winning_cells: np.ndarray
+
+
+def boards_from_strings(strings: Iterable[str]) -> np.ndarray:
+    """
+    Преобразует доски из формата ``RenjuBoard.as_string`` в массив ``(N, size, size)``
+
+    :raise ValueError: если доски не квадратные либо разного размера
+    """
+    strings = list(strings)
+    if not strings:
+        return np.zeros((0, 0, 0), dtype=np.int8)
+    size = strings[0].count('.') + 1
+    if any(len(string) != size * (size + 1) - 1 for string in strings):
+        raise ValueError('All boards must be square and of the same size.')
+    raw = ''.join(strings).replace('.', '').encode('ascii')
+    boards = np.frombuffer(raw, dtype=np.uint8) - ord('0')
+    return boards.reshape(len(strings), size, size).astype(np.int8)
+
+
+def boards_to_strings(boards: np.ndarray) -> list[str]:
+    """ Преобразует массив ``(N, size, size)`` в список досок в формате ``RenjuBoard.as_string`` """
+    _, size, _ = boards.shape
+    # столбец из точек справа превращается в разделители строк
+    dots = np.full(boards.shape[:2] + (1,), ord('.'), dtype=np.uint8)
+    chars = np.concatenate([boards.astype(np.uint8) + ord('0'), dots], axis=2)
+    return [row.tobytes()[:-1].decode('ascii') for row in chars.reshape(len(boards), -1)]
+
+
+def evaluate_boards(boards: np.ndarray, length: int = 5) -> BatchResult:
+    """
+    Проверяет все доски пачки на победу (``length`` камней подряд) и ничью.
+    Победные клетки выбираются в том же порядке, в каком их нашел бы ``RenjuBoard.check_victory``
+
+    :param boards: массив ``(N, size, size)`` значений клеток
+    :param length: необходимое кол-во камней подряд
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    n, size, _ = boards.shape
+    winners = np.zeros(n, dtype=np.int8)
+    winning_cells = np.zeros((n, length, 2), dtype=np.int16)
+    found = np.zeros(n, dtype=bool)
+    if size >= length:
+        steps = np.arange(length)
+        for (dx, dy), order in zip(DIRECTIONS, _line_orders(size)):
+            best_key = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+            best_value = np.zeros(n, dtype=np.int8)
+            best_start = np.zeros(n, dtype=np.int32)
+            for value in range(1, MAX_PLAYERS + 1):
+                hits = _window_sums(boards == value, dx, dy, length) == length
+                keys = np.where(hits, order, np.iinfo(np.int32).max).reshape(n, -1)
+                starts = keys.argmin(axis=1)
+                min_keys = keys[np.arange(n), starts]
+                better = min_keys < best_key
+                best_key[better] = min_keys[better]
+                best_value[better] = value
+                best_start[better] = starts[better]
+            new = (best_value > 0) & ~found
+            if not new.any():
+                continue
+            # индекс окна -> координаты первой клетки (окна хранятся в сетке (size, size), см. _window_sums)
+            y0, x0 = np.divmod(best_start[new], size)
+            winning_cells[new, :, 0] = x0[:, None] + dx * steps + 1
+            winning_cells[new, :, 1] = y0[:, None] + dy * steps + 1
+            winners[new] = best_value[new]
+            found |= new
+    draws = ~found & (boards != 0).reshape(n, -1).all(axis=1)
+    return BatchResult(winners=winners, draws=draws, winning_cells=winning_cells)
+
+
+def _window_sums(mask: np.ndarray, dx: int, dy: int, length: int) -> np.ndarray:
+    """
+    Суммы скользящих окон длины ``length`` вдоль направления (dx, dy).
+
+    :return: массив ``(N, size, size)``, где [y, x] - сумма окна, начинающегося в клетке (x, y);
+        окна, выходящие за пределы доски, равны 0
+    """
+    n, size, _ = mask.shape
+    span = length - 1
+    sums = np.zeros((n, size, size), dtype=np.int8)
+    ys = slice(0, size - span * dy)
+    xs = slice(span, size) if dx < 0 else slice(0, size - span * dx)
+    for k in range(length):
+        sums[:, ys, xs] += mask[
+            :,
+            ys.start + k * dy:ys.stop + k * dy,
+            xs.start + k * dx:xs.stop + k * dx,
+        ]
+    return sums
+
+
+def _line_orders(size: int) -> tuple[np.ndarray, ...]:
+    """
+    Ключи сортировки начал окон для каждого направления - порядок, в котором RenjuBoard обходит линии
+    """
+    y, x = np.indices((size, size), dtype=np.int32)
+    return (
+        y * size + x,
+        x * size + y,
+        (x + y) * size + y,
+        (x - y + size) * size + y,
+    )
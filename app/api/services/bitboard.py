@@ -0,0 +1,247 @@
+from functools import lru_cache
+from typing import Iterator
+
+from app.schemas.game import MoveInputSchema
+from app.core import exceptions
+from .board import Cell, Coord
+from .geometry import WIN_LENGTH, get_geometry
+
+
+class RenjuBitBoard:
+    """
+    Игровая доска на битовых масках: по одному целому числу на каждую роль (до 3 игроков).
+
+    Клетка (x, y) хранится в бите ``(y - 1) * width + (x - 1)``, где ``width = size + 1``:
+    лишний всегда пустой столбец справа не дает рядам "перетекать" друг в друга при сдвигах.
+    Публичный интерфейс повторяет ``RenjuBoard``
+    """
+
+    MAX_PLAYERS = 3
+
+    def __init__(self, size: int, masks: list[int] | None = None):
+        self.size = size
+        self.width = size + 1
+        self.masks = masks if masks is not None else [0] * self.MAX_PLAYERS
+        self.stone_count = self.__count_stones()
+        # сдвиги для линий в порядке обхода RenjuBoard.check_victory: строка, столбец, диагонали
+        self.shifts = (1, self.width, self.width - 1, self.width + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RenjuBitBoard):
+            return NotImplemented
+        return self.size == other.size and self.masks == other.masks
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def default(cls, fill: int = 0, *, size: int) -> 'RenjuBitBoard':
+        """
+        Создание доски по умолчанию
+
+        :param fill: значение всех клеток
+        :param size: доска будет создана размером size x size
+        :return: экземпляр доски
+        """
+        board = cls(size)
+        if fill:
+            row = (1 << size) - 1
+            board.masks[fill - 1] = sum(row << (y * board.width) for y in range(size))
+            board.stone_count = size ** 2
+        return board
+
+    @classmethod
+    def from_string(cls, string: str) -> 'RenjuBitBoard':
+        """
+        Создание доски из строкового формата
+
+        :param string: Игровая доска в строковом виде (из БД)
+        :raise ValueError: если строка не соотв. формату "ddd.ddd.ddd"
+        """
+        rows = string.split('.')
+        size = len(rows)
+        if not all(len(row) == size for row in rows):
+            raise ValueError('Board must be square.')
+        if set(string) - _ALLOWED_CHARS:
+            raise ValueError('Board must consist of cell values and dots.')
+        board = cls(size)
+        # строка с разделителями-точками совпадает по раскладке с битами (точка - пустой столбец)
+        reversed_string = string[::-1]
+        for value, table in _BIT_TABLES.items():
+            if str(value) in string:
+                board.masks[value - 1] = int(reversed_string.translate(table), 2)
+        board.stone_count = board.__count_stones()
+        return board
+
+    @classmethod
+    def from_values(cls, values: bytes, size: int) -> 'RenjuBitBoard':
+        """
+        Создание доски из плоского массива значений клеток (построчно)
+
+        :param values: значения клеток, ``size ** 2`` байт
+        :param size: длина стороны доски
+        """
+        if len(values) != size ** 2:
+            raise ValueError('Board must be square.')
+        board = cls(size)
+        # пустой байт между строками - тот самый пустой столбец справа
+        padded = b'\x00'.join(values[y * size:(y + 1) * size] for y in range(size))[::-1]
+        for value, table in _VALUE_BIT_TABLES.items():
+            if value in values:
+                board.masks[value - 1] = int(padded.translate(table), 2)
+        board.stone_count = board.__count_stones()
+        return board
+
+    @property
+    def as_values(self) -> bytes:
+        """ Возвращает значения клеток текущей доски плоским массивом (построчно) """
+        values = bytearray(self.size ** 2)
+        for value, mask in enumerate(self.masks, start=1):
+            for index in self.__iter_bits(mask):
+                values[index - index // self.width] = value
+        return bytes(values)
+
+    @property
+    def as_string(self) -> str:
+        """ Возвращает текущую доску в строковом формате """
+        return '.'.join(''.join(str(value) for value in row) for row in self.as_array)
+
+    @property
+    def as_array(self) -> list[list[int]]:
+        """ Возвращает массив значений клеток текущей доски """
+        array = [[0] * self.size for _ in range(self.size)]
+        for value, mask in enumerate(self.masks, start=1):
+            for index in self.__iter_bits(mask):
+                array[index // self.width][index % self.width] = value
+        return array
+
+    def value_at(self, x: int, y: int) -> int:
+        """ Значение клетки (x, y), координаты с 1 """
+        bit = 1 << self.__index(x, y)
+        for value, mask in enumerate(self.masks, start=1):
+            if mask & bit:
+                return value
+        return 0
+
+    def move(self, new_cell: MoveInputSchema) -> None:
+        """ Изменяет текущую доску в соотв. со сделанным ходом """
+        bit = 1 << self.__index(new_cell.x, new_cell.y)
+        if self.__occupied & bit:
+            raise exceptions.CellOccupied()
+        self.masks[new_cell.value - 1] |= bit
+        self.stone_count += 1
+
+    def check_victory(self, length: int = WIN_LENGTH) -> list[Cell]:
+        """
+        :return: список клеток-победителей либо пустой список, если условие победы не выполнено
+        """
+        for shift, order in zip(self.shifts, self.__line_orders()):
+            candidates = []
+            for value, mask in enumerate(self.masks, start=1):
+                starts = self.__runs(mask, shift, length)
+                candidates.extend((order(index), value, index) for index in self.__iter_bits(starts))
+            if candidates:
+                _, value, index = min(candidates)
+                return self.__cells(index, shift, value, length)
+        return []
+
+    def check_victory_at(self, x: int, y: int) -> list[Cell]:
+        """
+        Проверка победы только по 4 линиям, проходящим через клетку (x, y) - т.е. через последний ход
+
+        :return: список клеток-победителей либо пустой список, если условие победы не выполнено
+        """
+        index = self.__index(x, y)
+        value = self.value_at(x, y)
+        if not value:
+            return []
+        mask = self.masks[value - 1]
+        windows = _window_masks(self.size)[(y - 1) * self.size + x - 1]
+        for shift, direction_windows in zip(self.shifts, windows):
+            if not any(mask & window == window for window in direction_windows):
+                continue
+            start = index
+            while start - shift >= 0 and mask >> (start - shift) & 1:
+                start -= shift
+            return self.__cells(start, shift, value, WIN_LENGTH)
+        return []
+
+    def check_free_space(self) -> bool:
+        """
+        :return: True, если на доске есть место для ходов
+        """
+        return self.stone_count < self.size ** 2
+
+    def __count_stones(self) -> int:
+        return sum(mask.bit_count() for mask in self.masks)
+
+    @property
+    def __occupied(self) -> int:
+        occupied = 0
+        for mask in self.masks:
+            occupied |= mask
+        return occupied
+
+    def __index(self, x: int, y: int) -> int:
+        if not (0 < x <= self.size and 0 < y <= self.size):
+            raise IndexError('Cell is out of the board.')
+        return (y - 1) * self.width + (x - 1)
+
+    @staticmethod
+    def __runs(mask: int, shift: int, length: int) -> int:
+        """ Биты-начала рядов из ``length`` камней подряд вдоль направления ``shift`` """
+        runs = mask
+        for i in range(1, length):
+            runs &= mask >> (shift * i)
+        return runs
+
+    @staticmethod
+    def __iter_bits(mask: int) -> Iterator[int]:
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def __cells(self, start: int, shift: int, value: int, length: int) -> list[Cell]:
+        cells = []
+        for i in range(length):
+            index = start + shift * i
+            cells.append(Cell(value=value, coord=Coord(index % self.width + 1, index // self.width + 1)))
+        return cells
+
+    def __line_orders(self):
+        """ Ключи сортировки начал рядов - порядок, в котором RenjuBoard обходит линии каждого направления """
+        width = self.width
+        return (
+            lambda i: (i // width, i % width),
+            lambda i: (i % width, i // width),
+            lambda i: (i % width + i // width, i // width),
+            lambda i: (i % width - i // width, i // width),
+        )
+
+
+_ALLOWED_CHARS = set('0123.')
+_BIT_TABLES = {
+    value: str.maketrans({char: '1' if char == str(value) else '0' for char in _ALLOWED_CHARS})
+    for value in range(1, RenjuBitBoard.MAX_PLAYERS + 1)
+}
+_VALUE_BIT_TABLES = {
+    value: bytes(ord('1') if byte == value else ord('0') for byte in range(256))
+    for value in range(1, RenjuBitBoard.MAX_PLAYERS + 1)
+}
+
+
+@lru_cache(maxsize=None)
+def _window_masks(size: int) -> tuple[tuple[tuple[int, ...], ...], ...]:
+    """ Окна из ``WIN_LENGTH`` клеток (см. ``LineGeometry.windows``) в виде битовых масок доски ``size`` """
+    # каждое окно входит в таблицы 5 клеток - маска строится (и хранится) один раз
+    masks = {}
+    for cell_windows in get_geometry(size).windows:
+        for direction_windows in cell_windows:
+            for window in direction_windows:
+                if window not in masks:
+                    masks[window] = sum(1 << (i + i // size) for i in window)
+    return tuple(
+        tuple(tuple(masks[window] for window in direction_windows) for direction_windows in cell_windows)
+        for cell_windows in get_geometry(size).windows
+    )
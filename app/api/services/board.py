@@ -0,0 +1,209 @@
+from typing import NamedTuple, Iterator
+from dataclasses import dataclass
+
+from app.schemas.game import MoveInputSchema
+from app.core import exceptions
+from .geometry import WIN_LENGTH, Line, LineGeometry, get_geometry
+
+# цифры строкового формата <-> значения клеток
+_FROM_DIGITS = bytes.maketrans(b'0123456789', bytes(range(10)))
+_TO_DIGITS = bytes.maketrans(bytes(range(10)), b'0123456789')
+
+
+class Coord(NamedTuple):
+    x: int
+    y: int
+
+
+@dataclass(slots=True)
+class Cell:
+    value: int
+    coord: Coord
+
+
+class RenjuBoard:
+    """
+    Игровая доска: значения клеток построчно в одном плоском bytearray
+    (клетка (x, y) - элемент ``(y - 1) * size + (x - 1)``) и поддерживаемое при ходах число камней.
+
+    Объекты ``Cell`` не хранятся, а создаются по запросу - для строк/линий доски и победных клеток
+    """
+
+    __slots__ = ('size', 'values', 'stone_count')
+
+    def __init__(self, values: bytearray, size: int):
+        self.size = size
+        self.values = values
+        self.stone_count = len(values) - values.count(0)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RenjuBoard):
+            return NotImplemented
+        return self.size == other.size and self.values == other.values
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, y: int) -> list[Cell]:
+        """ Строка доски (с 0) в виде клеток """
+        if not -self.size <= y < self.size:
+            raise IndexError('Board row index out of range.')
+        y %= self.size
+        return [self.__cell(y * self.size + x) for x in range(self.size)]
+
+    def __iter__(self) -> Iterator[list[Cell]]:
+        for y in range(self.size):
+            yield self[y]
+
+    @classmethod
+    def default(cls, fill: int = 0, *, size: int) -> 'RenjuBoard':
+        """
+        Создание доски по умолчанию
+
+        :param fill: значение всех клеток
+        :param size: доска будет создана размером size x size
+        :return: экземпляр доски
+        """
+        return cls(bytearray([fill]) * size ** 2, size)
+
+    @classmethod
+    def from_string(cls, string: str) -> 'RenjuBoard':
+        """
+        Создание доски из строкового формата
+
+        :param string: Игровая доска в строковом виде (из БД)
+        :raise ValueError: если строка не соотв. формату "ddd.ddd.ddd"
+        """
+        rows = string.split('.')
+        if not all(len(row) == len(rows) for row in rows):
+            raise ValueError('Board must be square.')
+        digits = ''.join(rows)
+        if not digits.isdecimal():
+            raise ValueError(f'Invalid board string: {string!r}.')
+        # не-ASCII цифры дадут UnicodeEncodeError (подкласс ValueError)
+        return cls(bytearray(digits.encode('ascii').translate(_FROM_DIGITS)), len(rows))
+
+    @classmethod
+    def from_values(cls, values: bytes, size: int) -> 'RenjuBoard':
+        """
+        Создание доски из плоского массива значений клеток (построчно)
+
+        :param values: значения клеток, ``size ** 2`` байт
+        :param size: длина стороны доски
+        """
+        if len(values) != size ** 2:
+            raise ValueError('Board must be square.')
+        return cls(bytearray(values), size)
+
+    @property
+    def as_values(self) -> bytes:
+        """ Возвращает значения клеток текущей доски плоским массивом (построчно) """
+        return bytes(self.values)
+
+    @property
+    def as_string(self) -> str:
+        """ Возвращает текущую доску в строковом формате """
+        digits = self.values.translate(_TO_DIGITS).decode('ascii')
+        return '.'.join(digits[i:i + self.size] for i in range(0, len(digits), self.size))
+
+    @property
+    def as_array(self) -> list[list[int]]:
+        """ Возвращает массив значений клеток текущей доски """
+        return [list(self.values[i:i + self.size]) for i in range(0, len(self.values), self.size)]
+
+    @property
+    def columns(self) -> list[list[Cell]]:
+        return self.__lines(self.__geometry.columns)
+
+    @property
+    def diagonals(self) -> list[list[Cell]]:
+        geometry = self.__geometry
+        return self.__lines(geometry.primary_diagonals + geometry.secondary_diagonals)
+
+    @property
+    def __geometry(self) -> LineGeometry:
+        return get_geometry(self.size)
+
+    def __cell(self, index: int) -> Cell:
+        y, x = divmod(index, self.size)
+        return Cell(value=self.values[index], coord=Coord(x + 1, y + 1))
+
+    def __lines(self, lines: tuple[Line, ...]) -> list[list[Cell]]:
+        """ Линии клеток текущей доски по таблицам индексов """
+        return [[self.__cell(i) for i in line] for line in lines]
+
+    def value_at(self, x: int, y: int) -> int:
+        """ Значение клетки (x, y), координаты с 1 """
+        if not (1 <= x <= self.size and 1 <= y <= self.size):
+            raise IndexError('Cell is out of the board.')
+        return self.values[(y - 1) * self.size + x - 1]
+
+    def move(self, new_cell: MoveInputSchema) -> None:
+        """ Изменяет текущую доску в соотв. со сделанным ходом """
+        if not (1 <= new_cell.x <= self.size and 1 <= new_cell.y <= self.size):
+            raise IndexError('Cell is out of the board.')
+        index = (new_cell.y - 1) * self.size + new_cell.x - 1
+        if self.values[index]:
+            raise exceptions.CellOccupied()
+        self.values[index] = new_cell.value
+        self.stone_count += 1
+
+    def __check_line(self, line: Line, length: int = WIN_LENGTH) -> list[Cell]:
+        """
+        Проверка, содержит ли линия ``length`` одинаковых значений подряд
+
+        :return: список победных клеток
+        """
+        values = self.values
+        current_value = 0
+        counter = 0
+        for position, index in enumerate(line):
+            value = values[index]
+            if value and value == current_value:
+                counter += 1
+                if counter >= length:
+                    return [self.__cell(i) for i in line[position - length + 1:position + 1]]
+            else:
+                counter = 1
+            current_value = value
+        return []
+
+    def check_victory(self) -> list[Cell]:
+        """
+        :return: список клеток-победителей либо пустой список, если условие победы не выполнено
+        """
+        for line in self.__geometry.lines:
+            if winning_cells := self.__check_line(line):
+                return winning_cells
+        return []
+
+    def check_victory_at(self, x: int, y: int) -> list[Cell]:
+        """
+        Проверка победы только по 4 линиям, проходящим через клетку (x, y) - т.е. через последний ход.
+        Результат совпадает с ``check_victory``, если до этого хода победного ряда на доске не было
+
+        :param x: координата клетки по горизонтали (с 1)
+        :param y: координата клетки по вертикали (с 1)
+        :return: список клеток-победителей либо пустой список, если условие победы не выполнено
+        """
+        values = self.values
+        index = (y - 1) * self.size + x - 1
+        value = values[index]
+        if not value:
+            return []
+        # линии в том же порядке, в каком их обходит check_victory: строка, столбец, диагонали
+        for line, position in self.__geometry.cell_lines[index]:
+            # откат к началу непрерывной последовательности значений value
+            start = position
+            while start > 0 and values[line[start - 1]] == value:
+                start -= 1
+            run = line[start:start + WIN_LENGTH]
+            if len(run) == WIN_LENGTH and all(values[i] == value for i in run):
+                return [self.__cell(i) for i in run]
+        return []
+
+    def check_free_space(self) -> bool:
+        """
+        :return: True, если на доске есть место для ходов
+        """
+        return self.stone_count < len(self.values)
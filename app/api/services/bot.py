@@ -0,0 +1,251 @@
+"""
+Компьютерный соперник: альфа-бета поиск (negamax) с итеративным углублением,
+таблицей транспозиций по хешам Зобриста и ограничением времени на ход.
+
+Поиск выполняется в отдельном процессе (``ProcessPoolExecutor``), чтобы не блокировать event loop.
+Поддерживаются только игры на двоих.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from app.config import config
+from .geometry import WIN_LENGTH, get_geometry
+
+WIN_SCORE = 10 ** 9
+# стоимость окна из WIN_LENGTH клеток с k камнями одного игрока и без камней соперника
+WINDOW_SCORES = (0, 1, 12, 150, 4000, WIN_SCORE)
+MAX_DEPTH = 10
+BRANCHING = 12          # сколько лучших по эвристике ходов рассматривается в каждом узле
+NEIGHBOURHOOD = 2       # кандидаты - пустые клетки не дальше 2 клеток от камней
+TT_MAX_SIZE = 500_000
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _tables(size: int) -> tuple:
+    """
+    Таблицы для доски ``size`` (строятся один раз на размер в каждом процессе):
+    окна клеток (номера), список клеток каждого окна, соседи клеток и ключи Зобриста
+    """
+    geometry = get_geometry(size)
+    window_ids = {}
+    for cell_windows in geometry.windows:
+        for direction_windows in cell_windows:
+            for window in direction_windows:
+                window_ids.setdefault(window, len(window_ids))
+    cell_windows = tuple(
+        tuple(window_ids[window] for direction_windows in windows for window in direction_windows)
+        for windows in geometry.windows
+    )
+    neighbours = tuple(
+        tuple(
+            ny * size + nx
+            for ny in range(max(0, y - NEIGHBOURHOOD), min(size, y + NEIGHBOURHOOD + 1))
+            for nx in range(max(0, x - NEIGHBOURHOOD), min(size, x + NEIGHBOURHOOD + 1))
+            if (nx, ny) != (x, y)
+        )
+        for y in range(size) for x in range(size)
+    )
+    rnd = random.Random(size)
+    zobrist = tuple((0, rnd.getrandbits(64), rnd.getrandbits(64)) for _ in range(size ** 2))
+    return cell_windows, len(window_ids), neighbours, zobrist
+
+
+# таблица транспозиций процесса: переживает итерации углубления и соседние ходы одной партии
+_transpositions: dict[int, tuple[int, int, int, int]] = {}
+
+
+class Searcher:
+    """ Позиция с инкрементально поддерживаемыми оценкой, хешем и соседством клеток """
+
+    def __init__(self, values: bytes, size: int):
+        self.size = size
+        self.values = bytearray(values)
+        self.cell_windows, num_windows, self.neighbours, self.zobrist = _tables(size)
+        # counts[p][w] - число камней игрока p (1, 2) в окне w
+        self.counts = [None, [0] * num_windows, [0] * num_windows]
+        self.near = [0] * size ** 2
+        self.score = 0      # с точки зрения игрока 1
+        self.hash = 0
+        self.deadline = float('inf')
+        for cell, value in enumerate(self.values):
+            if value:
+                self.values[cell] = 0
+                self.place(cell, value)
+
+    @staticmethod
+    def window_score(own: int, opponent: int) -> int:
+        if opponent == 0:
+            return WINDOW_SCORES[own]
+        if own == 0:
+            return -WINDOW_SCORES[opponent]
+        return 0
+
+    def place(self, cell: int, player: int) -> bool:
+        """ Ставит камень; возвращает True, если он дал 5 в ряд """
+        counts, other = self.counts[player], self.counts[3 - player]
+        sign = 1 if player == 1 else -1
+        won = False
+        for w in self.cell_windows[cell]:
+            own = counts[w]
+            self.score += sign * (self.window_score(own + 1, other[w]) - self.window_score(own, other[w]))
+            counts[w] = own + 1
+            won = won or own + 1 == WIN_LENGTH
+        self.values[cell] = player
+        self.hash ^= self.zobrist[cell][player]
+        for n in self.neighbours[cell]:
+            self.near[n] += 1
+        return won
+
+    def undo(self, cell: int, player: int) -> None:
+        counts, other = self.counts[player], self.counts[3 - player]
+        sign = 1 if player == 1 else -1
+        for w in self.cell_windows[cell]:
+            own = counts[w]
+            self.score += sign * (self.window_score(own - 1, other[w]) - self.window_score(own, other[w]))
+            counts[w] = own - 1
+        self.values[cell] = 0
+        self.hash ^= self.zobrist[cell][player]
+        for n in self.neighbours[cell]:
+            self.near[n] -= 1
+
+    def gain(self, cell: int, player: int) -> int:
+        """ Эвристика хода: польза для себя + вред соседу (насколько ход мешает его окнам) """
+        own_counts, other_counts = self.counts[player], self.counts[3 - player]
+        total = 0
+        for w in self.cell_windows[cell]:
+            own, other = own_counts[w], other_counts[w]
+            if other == 0:
+                total += WINDOW_SCORES[own + 1] - WINDOW_SCORES[own]
+            if own == 0:
+                total += WINDOW_SCORES[other]
+        return total
+
+    def candidates(self, player: int) -> list[int]:
+        values, near = self.values, self.near
+        cells = [cell for cell in range(len(values)) if not values[cell] and near[cell]]
+        cells.sort(key=lambda cell: self.gain(cell, player), reverse=True)
+        return cells[:BRANCHING]
+
+    def negamax(self, depth: int, alpha: int, beta: int, player: int, ply: int) -> int:
+        if time.monotonic() > self.deadline:
+            raise SearchTimeout()
+        if depth == 0:
+            return self.score if player == 1 else -self.score
+
+        key = self.hash ^ player
+        alpha_orig = alpha
+        tt_move = -1
+        if (entry := _transpositions.get(key)) is not None:
+            tt_depth, tt_value, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    return tt_value
+                if tt_flag == LOWER:
+                    alpha = max(alpha, tt_value)
+                elif tt_flag == UPPER:
+                    beta = min(beta, tt_value)
+                if alpha >= beta:
+                    return tt_value
+
+        moves = self.candidates(player)
+        if not moves:
+            return 0    # доска заполнена - ничья
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        best_value, best_move = -WIN_SCORE * 2, moves[0]
+        for cell in moves:
+            if self.place(cell, player):
+                value = WIN_SCORE - ply
+            else:
+                value = -self.negamax(depth - 1, -beta, -alpha, 3 - player, ply + 1)
+            self.undo(cell, player)
+            if value > best_value:
+                best_value, best_move = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        flag = UPPER if best_value <= alpha_orig else LOWER if best_value >= beta else EXACT
+        if len(_transpositions) > TT_MAX_SIZE:
+            _transpositions.clear()
+        _transpositions[key] = (depth, best_value, flag, best_move)
+        return best_value
+
+    def best_move(self, player: int, time_limit: float, max_depth: int = MAX_DEPTH) -> int:
+        """ Итеративное углубление до ``max_depth`` либо до истечения ``time_limit`` секунд """
+        moves = self.candidates(player)
+        if not moves:
+            empty = [cell for cell, value in enumerate(self.values) if not value]
+            # пустая доска - ход в центр
+            return (self.size // 2) * self.size + self.size // 2 if len(empty) == len(self.values) else empty[0]
+        best = moves[0]
+        self.deadline = time.monotonic() + time_limit
+        for depth in range(1, max_depth + 1):
+            try:
+                self.negamax(depth, -WIN_SCORE * 2, WIN_SCORE * 2, player, ply=0)
+            except SearchTimeout:
+                break
+            best = _transpositions[self.hash ^ player][3]
+            if _transpositions[self.hash ^ player][1] >= WIN_SCORE - MAX_DEPTH:
+                break   # найден форсированный выигрыш
+        return best
+
+
+def search(values: bytes, size: int, player: int, time_limit: float, max_depth: int = MAX_DEPTH) -> tuple[int, int]:
+    """
+    Выбор хода (выполняется в процессе-воркере)
+
+    :param values: значения клеток доски построчно (``as_values``)
+    :param player: номер игрока (1 либо 2), за которого ищется ход
+    :return: координаты (x, y) хода, с 1
+    """
+    cell = Searcher(values, size).best_move(player, time_limit, max_depth)
+    y, x = divmod(cell, size)
+    return x + 1, y + 1
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=config.BOT_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def choose_move(values: bytes, size: int, player: int, time_limit: float | None = None) -> tuple[int, int]:
+    """ Выбор хода бота в процессе-воркере, не блокируя event loop """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            get_executor(),
+            search,
+            values,
+            size,
+            player,
+            time_limit if time_limit is not None else config.BOT_MOVE_TIME_LIMIT,
+        )
+    except BrokenProcessPool:
+        # процесс-воркер упал - следующий ход создаст новый пул
+        shutdown_executor()
+        raise
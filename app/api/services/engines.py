@@ -0,0 +1,18 @@
+from app.config import config
+from .board import RenjuBoard
+from .bitboard import RenjuBitBoard
+
+BoardEngine = RenjuBoard | RenjuBitBoard
+
+BOARD_ENGINES: dict[str, type[BoardEngine]] = {
+    'list': RenjuBoard,
+    'bitboard': RenjuBitBoard,
+}
+
+
+def get_board_engine(name: str | None = None) -> type[BoardEngine]:
+    """
+    :param name: название движка доски; по умолчанию - ``config.BOARD_ENGINE``
+    :return: класс доски с интерфейсом ``RenjuBoard``
+    """
+    return BOARD_ENGINES[name or config.BOARD_ENGINE]
@@ -1,33 +1,40 @@
+import base64
 import uuid
 from datetime import datetime
-from typing import Literal, NamedTuple
-from dataclasses import dataclass, field
+from typing import Literal, TYPE_CHECKING
+from dataclasses import dataclass
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, tuple_
+from sqlalchemy.sql import ColumnElement
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import config
-from app.models.game import GameMode, Game, PlayerRole, PlayerResult, Move
+from app.models.game import GameMode, Game, PlayerRole, PlayerResult, Move, game_mode_m2m
 from app.models.user import User
 from app.schemas.game import (
     GameModeInGameSchema,
     GameCreateSchema,
     GameRules,
-    MoveInputSchema,
+    GameSummarySchema,
+    LobbyPlayerSchema,
 )
 from app.enums.game import PlayerRoleEnum, GameStateEnum, PlayerResultEnum, PlayerResultReasonEnum
 from app.core import exceptions
+from app.core.codec import encode_board
+from app.auth.services import UserService
+from .engines import get_board_engine
+from . import loaders
+from .loaders import LoaderProfile
 
+if TYPE_CHECKING:
+    from .live import MoveRecord
 
-class Coord(NamedTuple):
-    x: int
-    y: int
 
-
-@dataclass
-class Cell:
-    value: int
-    coord: Coord
+# столбцы game в строке списка игр (GameSummarySchema)
+LOBBY_GAME_COLUMNS = (
+    'id', 'state', 'is_private', 'num_players', 'time_limit', 'board_size', 'classic_mode', 'with_myself',
+    'with_bot', 'created_at', 'started_at', 'finished_at',
+)
 
 
 @dataclass(frozen=True)
@@ -40,135 +47,6 @@ class GameMetaWrapper:
     delete: bool = False
 
 
-@dataclass(frozen=True)
-class MoveMetaWrapper:
-    move: Move
-    game: Game
-    winning_cells: list[Cell] = field(default_factory=list)
-
-
-class RenjuBoard(list[list[Cell]]):
-    """ Двумерный массив-представление игровой доски """
-
-    @classmethod
-    def default(cls, fill: int = 0, *, size: int) -> 'RenjuBoard':
-        """
-        Создание доски по умолчанию
-
-        :param fill: значение value для всех Cell
-        :param size: доска будет создана размером size x size
-        :return: экземпляр доски
-        """
-        array = [[Cell(value=fill, coord=Coord(x, y)) for x in range(1, size + 1)] for y in range(1, size + 1)]
-        return cls(array)
-
-    @classmethod
-    def from_string(cls, string: str) -> 'RenjuBoard':
-        """
-        Создание доски из строкового формата
-
-        :param string: Игровая доска в строковом виде (из БД)
-        :raise ValueError: если строка не соотв. формату "ddd.ddd.ddd"
-        """
-        array = []
-        for y, row in enumerate(string.split('.'), start=1):
-            array_row = []
-            for x, value in enumerate(row, start=1):
-                cell = Cell(value=int(value), coord=Coord(x, y))
-                array_row.append(cell)
-            array.append(array_row)
-        if not all(len(obj) == len(array) for obj in array):
-            raise ValueError('Board must be square.')
-        return cls(array)
-
-    @property
-    def as_string(self) -> str:
-        """ Возвращает текущую доску в строковом формате """
-        return '.'.join(''.join(str(cell.value) for cell in row) for row in self)
-
-    @property
-    def as_array(self) -> list[list[int]]:
-        """ Возвращает массив значений клеток текущей доски """
-        return [[cell.value for cell in row] for row in self]
-
-    @property
-    def columns(self) -> list[list[Cell]]:
-        return [list(col) for col in zip(*self)]
-
-    @property
-    def diagonals(self) -> list[list[Cell]]:
-        primary_diagonals = []
-        secondary_diagonals = []
-        for offset in range(1 - len(self), len(self)):
-            prim_diag = []
-            sec_diag = []
-            for i, row in enumerate(self):
-                if -len(row) < offset - i <= 0:
-                    prim_diag.append(row[offset - i - 1])
-                if 0 <= i + offset < len(row):
-                    sec_diag.append(row[i + offset])
-            primary_diagonals.append(prim_diag)
-            secondary_diagonals.append(sec_diag)
-        return primary_diagonals + secondary_diagonals
-
-    def move(self, new_cell: MoveInputSchema) -> None:
-        """ Изменяет текущую доску в соотв. со сделанным ходом """
-        if self[new_cell.y - 1][new_cell.x - 1].value:
-            raise exceptions.CellOccupied()
-        self[new_cell.y - 1][new_cell.x - 1].value = new_cell.value
-
-    @staticmethod
-    def __check_line(line: list[Cell], length: int = 5) -> list[Cell]:
-        """
-        Проверка, содержит ли линия ``length`` одинаковых значений подряд
-
-        :return: список победных клеток
-        """
-        current_value = 0
-        counter = 0
-        winning_cells = []
-        for cell in line:
-            if cell.value == 0:
-                winning_cells.clear()
-                current_value = 0
-                counter = 0
-                continue
-            winning_cells.append(cell)
-            if cell.value == current_value:
-                counter += 1
-                if counter >= length:
-                    return winning_cells
-            else:
-                counter = 1
-            current_value = cell.value
-        return []
-
-    def check_victory(self) -> list[Cell]:
-        """
-        :return: список клеток-победителей либо пустой список, если условие победы не выполнено
-        """
-        for row in self:
-            if winning_cells := self.__check_line(row):
-                return winning_cells
-        for column in self.columns:
-            if winning_cells := self.__check_line(column):
-                return winning_cells
-        for diagonal in self.diagonals:
-            if winning_cells := self.__check_line(diagonal):
-                return winning_cells
-        return []
-
-    def check_free_space(self) -> bool:
-        """
-        :return: True, если на доске есть место для ходов
-        """
-        for row in self:
-            for cell in row:
-                if not cell.value:
-                    return True
-        return False
-
-
 class GameService:
 
     def __init__(self, db_session: AsyncSession):
@@ -209,23 +87,28 @@ class GameService:
         game.board_size = rules.board_size
         game.classic_mode = rules.classic_mode
         game.with_myself = rules.with_myself
-        if rules.three_players:
+        game.with_bot = rules.with_bot
+        if rules.three_players and not rules.with_bot:
             game.num_players = 3
 
-        game.board = RenjuBoard.default(size=rules.board_size).as_string
+        game.board = encode_board(get_board_engine().default(size=rules.board_size))
 
         pr = PlayerRole(role=PlayerRoleEnum.first)
         pr.player = creator
         pr.result = PlayerResult()
         game.players.append(pr)
 
+        if rules.with_bot:
+            # место второго игрока сразу занимает бот, готовый к игре
+            bot = await UserService(self.__db).get_bot_user()
+            game.players.append(PlayerRole(role=PlayerRoleEnum.second, player=bot, result=PlayerResult(), ready=True))
+
         for m in chosen_modes:
             game.modes.append(m)
 
         self.__db.add(game)
         await self.__db.commit()
-        await self.__db.refresh(game)
-        return GameMetaWrapper(game=game)
+        return GameMetaWrapper(game=await self.__refresh(game))
 
     @staticmethod
     def determine_rules(modes: list[GameMode]) -> GameRules:
@@ -248,50 +131,154 @@ class GameService:
             if mode.with_myself is not None:
                 rules.with_myself = mode.with_myself
 
+            if mode.with_bot is not None:
+                rules.with_bot = mode.with_bot
+
             if mode.three_players is not None:
                 rules.three_players = mode.three_players
 
         return rules
 
-    async def get_available_games(self) -> list[Game]:
-        """ Возвращает список общедоступных игр """
-        stmt = select(Game).where(and_(
+    @staticmethod
+    def __lobby_filter() -> list[ColumnElement]:
+        """ Условие на общедоступные игры; повторено в частичном индексе ix_game_lobby """
+        return [
             Game.state.in_([GameStateEnum.created, GameStateEnum.pending]),
             ~Game.with_myself,
+            ~Game.with_bot,
             ~Game.is_private,
-        ))
-        available_games = await self.__db.scalars(stmt)
-        return available_games.all()
+        ]
+
+    async def get_lobby_summaries(self) -> list[GameSummarySchema]:
+        """
+        Список общедоступных игр для лобби - выборкой столбцов, без ORM-объектов:
+        по одному запросу на игры, их игроков и моды
+        """
+        stmt = select(
+            *[getattr(Game, name) for name in LOBBY_GAME_COLUMNS],
+        ).where(*self.__lobby_filter()).order_by(Game.created_at)
+        rows = (await self.__db.execute(stmt)).mappings()
+        games = {row['id']: dict(row, modes=[], spectators_num=0) for row in rows}
+        if not games:
+            return []
+
+        stmt = select(
+            PlayerRole.game_id, PlayerRole.role, PlayerRole.ready, User.name, PlayerResult.result,
+        ).join(User, User.id == PlayerRole.player_id).outerjoin(
+            PlayerResult, PlayerResult.id == PlayerRole.result_id,
+        ).where(PlayerRole.game_id.in_(games))
+        for game_id, role, ready, name, result in await self.__db.execute(stmt):
+            if role == PlayerRoleEnum.spectator:
+                games[game_id]['spectators_num'] += 1
+            else:
+                games[game_id][f'player_{role.value}'] = LobbyPlayerSchema(name=name, ready=ready, result=result)
+
+        stmt = select(game_mode_m2m.c.game_id, GameMode.id, GameMode.name).join(
+            GameMode, GameMode.id == game_mode_m2m.c.gamemode_id,
+        ).where(game_mode_m2m.c.game_id.in_(games))
+        for game_id, mode_id, name in await self.__db.execute(stmt):
+            games[game_id]['modes'].append(GameModeInGameSchema(id=mode_id, name=name))
+
+        return [GameSummarySchema(**game) for game in games.values()]
 
-    @staticmethod
     async def get_user_games(
+            self,
             user: User,
             scope: Literal['nonstarted', 'active', 'finished', 'unfinished', 'all'] = 'all',
+            profile: LoaderProfile = (),
     ) -> list[Game]:
         """
         :param user: ORM объект пользователя
         :param scope: фильтр возвращаемых игр
+        :param profile: профиль загрузки связей игр (см. loaders.py)
         :return: список игр, в которых пользователь принимал участие
         """
+        stmt = select(Game).join(Game.players).where(
+            PlayerRole.player_id == user.id,
+            *self.__user_games_filter(scope),
+        ).options(*profile)
+        user_games = await self.__db.scalars(stmt)
+        return user_games.all()
+
+    @staticmethod
+    def __user_games_filter(
+            scope: Literal['nonstarted', 'active', 'finished', 'unfinished', 'all'],
+    ) -> list[ColumnElement]:
+        """
+        Условия на участие юзера в игре (PlayerRole) для выборки его игр.
+        Незавершенные участия (``NOT finished``) ищутся по частичному индексу ix_playerrole_player_id_unfinished
+        """
         match scope:
             case 'nonstarted':
-                return [pr.game for pr in user.games if pr.game.state == GameStateEnum.created]
+                return [~PlayerRole.finished, Game.state == GameStateEnum.created]
             case 'active':
-                return [pr.game for pr in user.games if pr.ready and pr.result.result is None]
+                return [~PlayerRole.finished, PlayerRole.ready]
             case 'finished':
-                return [pr.game for pr in user.games if pr.game.state == GameStateEnum.finished]
+                return [Game.state == GameStateEnum.finished]
             case 'unfinished':
-                return [pr.game for pr in user.games
-                        if pr.result.result is None and pr.game.state != GameStateEnum.finished]
+                return [~PlayerRole.finished]
             case _:
-                return [pr.game for pr in user.games]
+                return []
+
+    async def get_finished_games_page(
+            self,
+            user: User,
+            limit: int,
+            cursor: str | None = None,
+    ) -> tuple[list[Game], str | None]:
+        """
+        Страница завершенных игр юзера, от новых к старым. Постраничность - по ключу (finished_at, id):
+        страница начинается сразу после последней игры предыдущей, без OFFSET
+
+        :param limit: размер страницы
+        :param cursor: курсор из предыдущей страницы; None - первая страница
+        :return: игры страницы + курсор следующей страницы (None, если страница последняя)
+        :raise InvalidCursor: если курсор не удалось разобрать
+        """
+        stmt = select(Game).join(Game.players).where(
+            PlayerRole.player_id == user.id,
+            Game.state == GameStateEnum.finished,
+            Game.finished_at.isnot(None),
+        )
+        if cursor is not None:
+            stmt = stmt.where(tuple_(Game.finished_at, Game.id) < self.decode_history_cursor(cursor))
+        stmt = stmt.order_by(Game.finished_at.desc(), Game.id.desc()).limit(limit + 1).options(*loaders.HISTORY)
+        games = (await self.__db.scalars(stmt)).all()
+        if len(games) <= limit:
+            return games, None
+        games = games[:limit]
+        return games, self.encode_history_cursor(games[-1])
 
-    async def get_game(self, game_id: uuid.UUID) -> Game | None:
-        """ Возвращает игру по ID, если она существует """
-        stmt = select(Game).where(Game.id == game_id)
+    @staticmethod
+    def encode_history_cursor(game: Game) -> str:
+        key = f'{game.finished_at.isoformat()}|{game.id}'
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    @staticmethod
+    def decode_history_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+        """ :raise InvalidCursor: если курсор не соотв. формату encode_history_cursor """
+        try:
+            finished_at, game_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(finished_at), uuid.UUID(game_id)
+        except ValueError:
+            raise exceptions.InvalidCursor()
+
+    async def get_game(self, game_id: uuid.UUID, profile: LoaderProfile = loaders.IN_GAME) -> Game | None:
+        """
+        Возвращает игру по ID, если она существует
+
+        :param profile: профиль загрузки связей игры (см. loaders.py)
+        """
+        stmt = select(Game).where(Game.id == game_id).options(*profile)
         game = await self.__db.scalars(stmt)
         return game.one_or_none()
 
+    async def __refresh(self, game: Game, profile: LoaderProfile = loaders.IN_GAME) -> Game:
+        """ Перечитывает игру из БД вместе со связями профиля (замена refresh: связи не загружаются неявно) """
+        stmt = select(Game).where(Game.id == game.id).options(*profile).execution_options(populate_existing=True)
+        game = await self.__db.scalars(stmt)
+        return game.one()
+
     async def join_game(self, player: User, game_id: uuid.UUID) -> GameMetaWrapper:
         """
         Присоединение нового игрока
@@ -351,14 +338,16 @@ class GameService:
         pr = PlayerRole(role=role, player=player, result=PlayerResult())
         game.players.append(pr)
         await self.__db.commit()
-        await self.__db.refresh(game)
-        return game
+        return await self.__refresh(game)
 
     async def __check_user_active_games(self, user: User) -> bool:
         """ Возвращает True, если юзер имеет незаконченную игру """
         # Юзер не закончил игру, если ready уже нажато, но результат игры еще не записан
-        active_games = await self.get_user_games(user, scope='active')
-        return bool(active_games)
+        stmt = select(PlayerRole.game_id).where(
+            PlayerRole.player_id == user.id,
+            *self.__user_games_filter('active'),
+        ).limit(1)
+        return await self.__db.scalar(stmt) is not None
 
     async def __get_empty_seat(self, game: Game) -> PlayerRoleEnum | None:
         """
@@ -417,8 +406,7 @@ class GameService:
         pr.ready = True
         name, role = pr.player.name, pr.role
         await self.__db.commit()
-        await self.__db.refresh(game)
-        return GameMetaWrapper(game=game, current_player_name=name, current_role=role)
+        return GameMetaWrapper(game=await self.__refresh(game), current_player_name=name, current_role=role)
 
     async def get_role_ready_to_move(self, game: Game) -> PlayerRoleEnum | None:
         players = await self.__get_players(game)
@@ -439,6 +427,12 @@ class GameService:
 
     async def switch_turn_order(self, game: Game) -> Game:
         """ Передает ход следующему игроку """
+        await self.__pass_turn(game)
+        await self.__db.commit()
+        return await self.__refresh(game)
+
+    async def __pass_turn(self, game: Game) -> None:
+        """ Передача хода без записи в БД """
         role_ready_to_move = await self.get_role_ready_to_move(game)
         role_next_to_move = await self.get_role_next_to_move(game, previous=role_ready_to_move)
         previous_player = await self.__get_player_by_role(game, role=role_ready_to_move)
@@ -446,18 +440,14 @@ class GameService:
         if previous_player:
             previous_player.can_move = False
         current_player.can_move = True
-        await self.__db.commit()
-        await self.__db.refresh(game)
-        return game
 
     async def start_game(self, game: Game) -> Game:
         """ Определяет очередность ходов, запускает игру """
-        game = await self.switch_turn_order(game)
+        await self.__pass_turn(game)
         game.state = GameStateEnum.pending
         game.started_at = datetime.now()
         await self.__db.commit()
-        await self.__db.refresh(game)
-        return game
+        return await self.__refresh(game)
 
     async def attempt_to_start_game(self, game: Game) -> Game | None:
         """ Начинает игру при выполнении всех условий """
@@ -467,64 +457,32 @@ class GameService:
         ]):
             return await self.start_game(game)
 
-    async def move(self, player: User, cell: MoveInputSchema, game_id: uuid.UUID) -> MoveMetaWrapper:
-        """ Обрабатывает ход """
-        if (game := await self.get_game(game_id)) is None:
-            raise exceptions.NoGameFound()
-        if not await self.__check_user_in_game(user=player, game=game):
-            raise exceptions.NotInGame()
-        pr = await self.__get_game_player_association(game, player)
-        pr_enums = await self.__get_player_role_enums(game)
-        if pr.role not in pr_enums:
-            raise exceptions.NotAPlayer()
-        if not pr.can_move:
-            # пришел клик от игрока, который по идее и не мог ходить. Просто игнор
-            raise exceptions.FalseClick()
-
-        board = RenjuBoard.from_string(game.board)
-        cell.value = int(pr.role.value)
-        try:
-            board.move(cell)
-        except IndexError as e:
-            # TODO: обработать (может возникнуть в теории)
-            raise e
-        except exceptions.CellOccupied:
-            # если клетка занята - клик игнорируется так же, как при not player.can_move
-            raise exceptions.FalseClick()
-
-        # Клетка свободна, очередность хода правильная --> сохранение изменений в БД
-        move = Move()
-        move.role = pr.role
-        move.x = cell.x
-        move.y = cell.y
-        game.moves.append(move)
-
-        game.board = board.as_string
+    async def save_move(self, record: 'MoveRecord') -> Game:
+        """
+        Запись в БД хода, уже примененного к игре в памяти (см. live.py): ход, доска, очередность, результаты
 
-        await self.__db.commit()
-        await self.__db.refresh(game)
-        await self.__db.refresh(move)
-
-        # проверки позиции
-        if winning_cells := board.check_victory():      # условие 5 в ряд выполнено
-            pr_enum = PlayerRoleEnum(str(winning_cells[0].value))
-            pr = await self.__get_player_by_role(game, pr_enum)
-            game = await self.__set_players_result(players=[pr], game=game, result=PlayerResultEnum.win,
-                                                   reason=PlayerResultReasonEnum.fair)
-            return MoveMetaWrapper(
-                move=move,
-                game=await self.finish_game(game, reason=PlayerResultReasonEnum.fair),
-                winning_cells=winning_cells,
-            )
-        if not board.check_free_space():   # делать ходы больше некуда
-            # Всем оставшимся игрокам проставляется ничья
+        :raise NoGameFound: если игры с данным ID не существует
+        """
+        if (game := await self.get_game(record.game_id, loaders.MOVE)) is None:
+            raise exceptions.NoGameFound()
+        self.__db.add(Move(game_id=game.id, role=record.role, x=record.x, y=record.y))
+        game.board = record.board
+        game.move_count = record.move_count
+        for pr in await self.__get_players(game):
+            pr.can_move = pr.role == record.next_role
+
+        if record.winner_role is not None:
+            pr = await self.__get_player_by_role(game, record.winner_role)
+            await self.__apply_players_result(players=[pr], result=PlayerResultEnum.win,
+                                              reason=PlayerResultReasonEnum.fair)
+            await self.__apply_finish(game, reason=PlayerResultReasonEnum.fair)
+        elif record.draw:
             active_players = await self.__get_players(game, only_active=True)
-            game = await self.__set_players_result(players=active_players, game=game, result=PlayerResultEnum.draw,
-                                                   reason=PlayerResultReasonEnum.full_board)
-            return MoveMetaWrapper(move=move, game=await self.finish_game(game))
-
-        # игра продолжается
-        return MoveMetaWrapper(move=move, game=await self.switch_turn_order(game))
+            await self.__apply_players_result(players=active_players, result=PlayerResultEnum.draw,
+                                              reason=PlayerResultReasonEnum.full_board)
+            await self.__apply_finish(game)
+        await self.__db.commit()
+        return game
 
     async def leave(self, player: User, game_id: uuid.UUID, disconnected: bool = False) -> GameMetaWrapper:
         """ Обработка выхода участника из игры по любой причине """
@@ -545,8 +503,7 @@ class GameService:
         """ Полностью удаляет соответствующего игрока из игры; возвращает ORM объект игры """
         await self.__db.delete(pr)
         await self.__db.commit()
-        await self.__db.refresh(game)
-        return game
+        return await self.__refresh(game)
 
     async def remove_game(self, game: Game) -> None:
         """ Удаление игры из БД """
@@ -556,7 +513,8 @@ class GameService:
     async def __player_leave(self, pr: PlayerRole, game: Game) -> GameMetaWrapper:
         """ Выход игрока из игры без простановки результата """
         game = await self.__remove_player(pr, game)
-        if not await self.__get_players(game):
+        if all(player.player.is_bot for player in await self.__get_players(game)):
+            # в игре не осталось игроков-людей
             return GameMetaWrapper(game=game, delete=True)
         return GameMetaWrapper(game=game)
 
@@ -594,12 +552,21 @@ class GameService:
         """
         if not players:
             return game
+        await self.__apply_players_result(players, result, reason)
+        await self.__db.commit()
+        return await self.__refresh(game)
+
+    @staticmethod
+    async def __apply_players_result(
+            players: list[PlayerRole],
+            result: PlayerResultEnum,
+            reason: PlayerResultReasonEnum,
+    ) -> None:
+        """ Простановка результатов без записи в БД """
         for pr in players:
             pr.result.result = result
             pr.result.reason = reason
-        await self.__db.commit()
-        await self.__db.refresh(game)
-        return game
+            pr.finished = True
 
     async def finish_game(self, game: Game, reason: PlayerResultReasonEnum = PlayerResultReasonEnum.tech) -> Game:
         """
@@ -609,12 +576,17 @@ class GameService:
         :param reason: причина завершения игры
         :return: ORM-объект завершенной игры
         """
+        await self.__apply_finish(game, reason)
+        await self.__db.commit()
+        return await self.__refresh(game)
+
+    async def __apply_finish(self, game: Game, reason: PlayerResultReasonEnum = PlayerResultReasonEnum.tech) -> None:
+        """ Завершение игры без записи в БД """
         # простановка поражения игрокам с еще не проставленным результатом
         active_players = await self.__get_players(game, only_active=True)
-        game = await self.__set_players_result(players=active_players, game=game, result=PlayerResultEnum.lose,
-                                               reason=reason)
+        await self.__apply_players_result(players=active_players, result=PlayerResultEnum.lose, reason=reason)
+        for pr in game.players:
+            pr.can_move = False
+            pr.finished = True     # в т.ч. зрители
         game.state = GameStateEnum.finished
         game.finished_at = datetime.now()
-        await self.__db.commit()
-        await self.__db.refresh(game)
-        return game
@@ -0,0 +1,73 @@
+"""
+Общая для всех досок одного размера геометрия линий.
+
+Клетки задаются плоским индексом ``(y - 1) * size + (x - 1)``. Таблицы неизменяемы (кортежи)
+и строятся лениво - один раз на каждый размер доски (11-40, см. ``GameRules.board_size``).
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+WIN_LENGTH = 5
+
+Line = tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class LineGeometry:
+    """
+    size: длина стороны доски
+    rows, columns: линии сверху вниз / слева направо
+    primary_diagonals, secondary_diagonals: диагонали в порядке ``RenjuBoard.diagonals``
+        (обе обходятся сверху вниз; primary - с наклоном влево, secondary - вправо)
+    lines: все линии в порядке обхода ``RenjuBoard.check_victory``
+    cell_lines: для каждой клетки - 4 пары (линия, позиция клетки в ней): строка, столбец, диагонали
+    windows: для каждой клетки - 4 кортежа (по направлениям) окон из ``WIN_LENGTH`` клеток, содержащих ее
+    """
+    size: int
+    rows: tuple[Line, ...]
+    columns: tuple[Line, ...]
+    primary_diagonals: tuple[Line, ...]
+    secondary_diagonals: tuple[Line, ...]
+    lines: tuple[Line, ...]
+    cell_lines: tuple[tuple[tuple[Line, int], ...], ...]
+    windows: tuple[tuple[tuple[Line, ...], ...], ...]
+
+
+@lru_cache(maxsize=None)
+def get_geometry(size: int) -> LineGeometry:
+    """ Таблицы линий для доски ``size`` x ``size`` (строятся при первом обращении) """
+    # общие объекты-индексы, чтобы таблицы не хранили тысячи одинаковых int
+    cells = tuple(range(size ** 2))
+    rows = tuple(cells[y * size:(y + 1) * size] for y in range(size))
+    columns = tuple(cells[x::size] for x in range(size))
+    primary = tuple(
+        tuple(cells[y * size + s - y] for y in range(size) if 0 <= s - y < size)
+        for s in range(2 * size - 1)
+    )
+    secondary = tuple(
+        tuple(cells[y * size + y + d] for y in range(size) if 0 <= y + d < size)
+        for d in range(1 - size, size)
+    )
+    directions = (rows, columns, primary, secondary)
+
+    cell_lines = [[None] * len(directions) for _ in cells]
+    windows = [[[] for _ in directions] for _ in cells]
+    for direction, lines in enumerate(directions):
+        for line in lines:
+            for position, cell in enumerate(line):
+                cell_lines[cell][direction] = (line, position)
+            for start in range(len(line) - WIN_LENGTH + 1):
+                window = line[start:start + WIN_LENGTH]
+                for cell in window:
+                    windows[cell][direction].append(window)
+
+    return LineGeometry(
+        size=size,
+        rows=rows,
+        columns=columns,
+        primary_diagonals=primary,
+        secondary_diagonals=secondary,
+        lines=rows + columns + primary + secondary,
+        cell_lines=tuple(tuple(lines) for lines in cell_lines),
+        windows=tuple(tuple(tuple(w) for w in cell_windows) for cell_windows in windows),
+    )
@@ -0,0 +1,315 @@
+"""
+Состояние идущих (``pending``) игр в памяти процесса.
+
+Ход проверяется и применяется без обращения к Postgres: доска, очередность ходов, игроки и часы
+хранятся в ``LiveGame``, снимок ``GameSchemaOut`` для рассылок обновляется вместе с ними.
+Ходы и результаты записываются в БД фоновой задачей (write-behind) строго в порядке поступления.
+
+Операции, идущие через БД (выход, отключение, повторное открытие игры), выполняются под блокировкой игры
+(``reloading``): ходы этой игры ждут, пока очередь записи дописывается (``flush``), игра читается из БД
+и заново помещается в память либо убирается из нее - иначе ход, сделанный во время чтения, затерся бы
+устаревшим состоянием из БД.
+Если ход не записался в БД, игра убирается из памяти (следующие ее ходы из очереди не пишутся),
+а ``on_persist_error`` уведомляет игроков - игра перечитывается из БД.
+Состояние - на процесс: все соединения игры должны обслуживаться одним процессом приложения.
+"""
+import asyncio
+import logging
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import exceptions
+from app.core.db.session import async_session_maker
+from app.core.codec import encode_board, decode_board
+from app.enums.game import PlayerRoleEnum, GameStateEnum, PlayerResultEnum, PlayerResultReasonEnum
+from app.models.game import Game
+from app.schemas.game import GameSchemaOut, MoveInputSchema, MoveSchema, PlayerSchema
+from .board import Cell
+from .bot import choose_move
+from .engines import BoardEngine, get_board_engine
+from .forbidden import find_forbidden
+from .games import GameService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LivePlayer:
+    user_id: uuid.UUID
+    role: PlayerRoleEnum
+    is_bot: bool = False
+    clock: float = 0.0      # суммарное время на ходы (с)
+
+
+@dataclass
+class LiveGame:
+    id: uuid.UUID
+    schema: GameSchemaOut
+    board: BoardEngine
+    players: list[LivePlayer]   # в порядке очередности ходов
+    current: int                # индекс игрока, который ходит
+    classic_mode: bool
+    move_count: int
+    turn_started: float = field(default_factory=time.monotonic)
+
+    @property
+    def current_player(self) -> LivePlayer:
+        return self.players[self.current]
+
+    def player_schema(self, role: PlayerRoleEnum) -> PlayerSchema:
+        return {
+            PlayerRoleEnum.first: self.schema.player_1,
+            PlayerRoleEnum.second: self.schema.player_2,
+            PlayerRoleEnum.third: self.schema.player_3,
+        }[role]
+
+
+@dataclass(frozen=True)
+class MoveRecord:
+    """ Сделанный в памяти ход - задание для фоновой записи в БД """
+    game_id: uuid.UUID
+    role: PlayerRoleEnum
+    x: int
+    y: int
+    board: bytes
+    move_count: int
+    next_role: PlayerRoleEnum | None = None
+    winner_role: PlayerRoleEnum | None = None
+    draw: bool = False
+
+
+@dataclass(frozen=True)
+class LiveMoveResult:
+    game: LiveGame
+    move: MoveSchema
+    winning_cells: list[Cell] = field(default_factory=list)
+
+    @property
+    def finished(self) -> bool:
+        return self.game.schema.state == GameStateEnum.finished
+
+
+class LiveGameStore:
+    """ Идущие игры процесса + очередь их фоновой записи в БД """
+
+    def __init__(self, session_maker: Callable[[], AsyncSession] = async_session_maker):
+        self.games: dict[uuid.UUID, LiveGame] = {}
+        self.__session_maker = session_maker
+        # блокировки игр живут, пока их кто-то держит либо ждет
+        self.__locks: weakref.WeakValueDictionary[uuid.UUID, asyncio.Lock] = weakref.WeakValueDictionary()
+        # вызывается с ID игры, ход которой не записался в БД
+        self.on_persist_error: Callable[[uuid.UUID], Awaitable[None]] | None = None
+        self.__queue: asyncio.Queue[MoveRecord] | None = None
+        self.__worker: asyncio.Task | None = None
+        self.__failed: set[uuid.UUID] = set()      # игры, ходы которых из очереди больше не пишутся
+        self.__error_tasks: set[asyncio.Task] = set()
+
+    def get(self, game_id: uuid.UUID) -> LiveGame | None:
+        return self.games.get(game_id)
+
+    @asynccontextmanager
+    async def reloading(self, game_id: uuid.UUID) -> AsyncIterator[None]:
+        """
+        Перечитывание игры из БД: ходы игры ждут выхода из блока, очередь записи к его началу дописана.
+        Внутри блока игра читается из БД и передается в ``load`` (либо ``discard``)
+        """
+        async with self.__lock(game_id):
+            await self.flush()
+            yield
+
+    def load(self, game: Game) -> LiveGame | None:
+        """
+        Помещает идущую игру в память (заменяя прежнее состояние); завершенная либо не начатая - убирается
+
+        :param game: ORM-объект игры с игроками
+        """
+        if game.state != GameStateEnum.pending:
+            self.discard(game.id)
+            return None
+        role_order = list(PlayerRoleEnum)
+        prs = sorted(
+            (pr for pr in game.players if pr.role != PlayerRoleEnum.spectator and pr.result.result is None),
+            key=lambda pr: role_order.index(pr.role),
+        )
+        players = [LivePlayer(user_id=pr.player.id, role=pr.role, is_bot=bool(pr.player.is_bot)) for pr in prs]
+        board, _ = decode_board(game.board, get_board_engine())
+        live_game = LiveGame(
+            id=game.id,
+            schema=GameSchemaOut.from_orm(game),
+            board=board,
+            players=players,
+            current=next((i for i, pr in enumerate(prs) if pr.can_move), 0),
+            classic_mode=bool(game.classic_mode),
+            move_count=game.move_count,
+        )
+        if (previous := self.games.get(game.id)) is not None:
+            # перечитывание игры из БД (например, после входа зрителя) не сбрасывает часы
+            clocks = {player.user_id: player.clock for player in previous.players}
+            for player in players:
+                player.clock = clocks.get(player.user_id, 0.0)
+            live_game.turn_started = previous.turn_started
+        self.games[game.id] = live_game
+        self.__failed.discard(game.id)
+        return live_game
+
+    def discard(self, game_id: uuid.UUID) -> None:
+        self.games.pop(game_id, None)
+
+    async def move(self, user_id: uuid.UUID, cell: MoveInputSchema, game_id: uuid.UUID) -> LiveMoveResult:
+        """
+        Проверяет и применяет ход в памяти; запись в БД ставится в очередь.
+        Если игра сейчас перечитывается из БД (``reloading``), ход применяется после этого
+
+        :raise NoGameFound: если игры нет среди идущих в этом процессе
+        :raise NotAPlayer: если пользователь - не игрок этой игры
+        :raise FalseClick: если ходить сейчас не этому игроку либо клетка занята
+        :raise ForbiddenMove: если ход запрещен классическими правилами (причина - в ``args[0]``)
+        """
+        async with self.__lock(game_id):
+            return self.__apply_move(user_id, cell, game_id)
+
+    def __apply_move(self, user_id: uuid.UUID, cell: MoveInputSchema, game_id: uuid.UUID) -> LiveMoveResult:
+        if (game := self.games.get(game_id)) is None:
+            raise exceptions.NoGameFound()
+        player = game.current_player
+        if player.user_id != user_id:
+            if all(p.user_id != user_id for p in game.players):
+                raise exceptions.NotAPlayer()
+            raise exceptions.FalseClick()
+
+        board = game.board
+        if board.value_at(cell.x, cell.y):
+            raise exceptions.FalseClick()
+        if game.classic_mode and player.role == PlayerRoleEnum.first:
+            if reason := find_forbidden(board.as_values, len(board), cell.x, cell.y):
+                raise exceptions.ForbiddenMove(reason)
+        cell.value = int(player.role.value)
+        board.move(cell)
+
+        now = time.monotonic()
+        player.clock += now - game.turn_started
+        game.turn_started = now
+        game.move_count += 1
+        # ID строки move в БД еще неизвестен - вместо него номер хода в партии
+        move = MoveSchema(id=game.move_count, role=player.role, x=cell.x, y=cell.y, value=cell.value)
+        game.schema.moves.append(move)
+        game.schema.move_count = game.move_count
+        game.schema.board[cell.y - 1][cell.x - 1] = cell.value
+
+        next_role, winner_role, draw = None, None, False
+        if winning_cells := board.check_victory_at(cell.x, cell.y):
+            winner_role = player.role
+            self.__finish(game, winner=winner_role)
+        elif game.move_count >= len(board) ** 2:   # делать ходы больше некуда
+            draw = True
+            self.__finish(game, winner=None)
+        else:
+            game.player_schema(player.role).can_move = False
+            game.current = (game.current + 1) % len(game.players)
+            next_role = game.current_player.role
+            game.player_schema(next_role).can_move = True
+
+        self.__enqueue(MoveRecord(
+            game_id=game.id,
+            role=player.role,
+            x=cell.x,
+            y=cell.y,
+            board=encode_board(board, move_count=game.move_count),
+            move_count=game.move_count,
+            next_role=next_role,
+            winner_role=winner_role,
+            draw=draw,
+        ))
+        if winner_role or draw:
+            self.discard(game.id)
+        return LiveMoveResult(game=game, move=move, winning_cells=winning_cells)
+
+    async def bot_move(self, game_id: uuid.UUID) -> LiveMoveResult | None:
+        """
+        Ход компьютерного соперника, если сейчас его очередь
+
+        :return: результат хода; None, если игры нет среди идущих, ходить не боту
+            либо пока бот думал, игра завершилась или была удалена
+        """
+        if (game := self.games.get(game_id)) is None or not game.current_player.is_bot:
+            return None
+        bot = game.current_player
+        x, y = await choose_move(game.board.as_values, len(game.board), player=int(bot.role.value))
+        try:
+            return await self.move(user_id=bot.user_id, cell=MoveInputSchema(x=x, y=y), game_id=game_id)
+        except (exceptions.FalseClick, exceptions.NoGameFound):
+            return None
+
+    async def flush(self) -> None:
+        """ Дожидается записи в БД всех поставленных в очередь ходов """
+        if self.__queue is not None:
+            await self.__queue.join()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self.__worker is not None:
+            self.__worker.cancel()
+            self.__worker = None
+            self.__queue = None
+
+    def __lock(self, game_id: uuid.UUID) -> asyncio.Lock:
+        if (lock := self.__locks.get(game_id)) is None:
+            lock = self.__locks[game_id] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def __finish(game: LiveGame, winner: PlayerRoleEnum | None) -> None:
+        """ Результаты в снимке игры - так же, как их проставит GameService """
+        for player in game.players:
+            schema = game.player_schema(player.role)
+            schema.can_move = False
+            if winner is None:
+                schema.result.result, schema.result.reason = PlayerResultEnum.draw, PlayerResultReasonEnum.full_board
+            elif player.role == winner:
+                schema.result.result, schema.result.reason = PlayerResultEnum.win, PlayerResultReasonEnum.fair
+            else:
+                schema.result.result, schema.result.reason = PlayerResultEnum.lose, PlayerResultReasonEnum.fair
+        game.schema.state = GameStateEnum.finished
+        game.schema.finished_at = datetime.now()
+
+    def __enqueue(self, record: MoveRecord) -> None:
+        if self.__queue is None:
+            self.__queue = asyncio.Queue()
+        if self.__worker is None or self.__worker.done():
+            self.__worker = asyncio.create_task(self.__persist())
+        self.__queue.put_nowait(record)
+
+    async def __persist(self) -> None:
+        """ Фоновая запись ходов в БД по одному, в порядке очереди """
+        while True:
+            record = await self.__queue.get()
+            try:
+                if record.game_id in self.__failed:
+                    continue
+                async with self.__session_maker() as db:
+                    await GameService(db).save_move(record)
+            except Exception:
+                logger.exception('Move %s of game %s was not saved', record.move_count, record.game_id)
+                self.__fail(record.game_id)
+            finally:
+                self.__queue.task_done()
+
+    def __fail(self, game_id: uuid.UUID) -> None:
+        """ Игра в памяти разошлась с БД: убирается из памяти до перечитывания из БД """
+        self.__failed.add(game_id)
+        self.discard(game_id)
+        if self.on_persist_error is not None:
+            # не ждем: обработчик перечитывает игру из БД, а значит, ждет записи очереди (flush)
+            task = asyncio.create_task(self.on_persist_error(game_id))
+            self.__error_tasks.add(task)
+            task.add_done_callback(self.__error_tasks.discard)
+
+
+live_games = LiveGameStore()
@@ -0,0 +1,33 @@
+"""
+Профили загрузки связей для запросов игр.
+
+Связи моделей по умолчанию не загружаются (``lazy='raise'``), поэтому каждый запрос передает профиль -
+набор опций загрузки ровно под то, что сериализует вызывающий код.
+"""
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.models.game import Game, PlayerRole
+
+LoaderProfile = tuple[LoaderOption, ...]
+
+# игроки игры вместе с пользователями и результатами - одним дополнительным запросом
+_PLAYERS = selectinload(Game.players).options(joinedload(PlayerRole.player), joinedload(PlayerRole.result))
+
+# ходы игры: строки move либо архив завершенной игры (см. archive.py) - GameSchema читает из обоих
+_MOVES = (selectinload(Game.moves), selectinload(Game.archive))
+
+# экран игры (GameSchemaOut) и состояние идущей игры в памяти процесса
+IN_GAME: LoaderProfile = (_PLAYERS, selectinload(Game.modes), *_MOVES)
+
+# обработка хода: очередность и результаты игроков, без истории ходов и модов
+MOVE: LoaderProfile = (_PLAYERS,)
+
+# страница истории игр пользователя: GameHistorySchema, без доски, ходов и модов
+HISTORY: LoaderProfile = (
+    load_only(
+        Game.id, Game.state, Game.num_players, Game.time_limit, Game.board_size, Game.classic_mode,
+        Game.with_myself, Game.with_bot, Game.move_count, Game.created_at, Game.started_at, Game.finished_at,
+    ),
+    _PLAYERS,
+)
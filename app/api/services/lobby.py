@@ -0,0 +1,72 @@
+"""
+Список игр лобби в памяти процесса.
+
+Строки лобби (``GameSummarySchema``) обновляются по событиям, которые и так проходят через обработчики
+вебсокета: создание, вход, готовность, выход, завершение и удаление игры. ``GET /games`` отдается из памяти
+без запроса к БД. При старте приложения индекс строится из БД (``rebuild``); ``find_inconsistencies``
+сравнивает его с БД - для тестов и диагностики.
+Состояние - на процесс, как и у live.py.
+"""
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.enums.game import GameStateEnum
+from app.schemas.game import GameSchemaOut, GameSummarySchema
+from .games import GameService
+
+
+class LobbyIndex:
+
+    def __init__(self):
+        self.games: dict[uuid.UUID, GameSummarySchema] = {}
+
+    def summaries(self) -> list[GameSummarySchema]:
+        """ Строки лобби в порядке создания игр - как их возвращает GameService.get_lobby_summaries """
+        return sorted(self.games.values(), key=lambda summary: summary.created_at)
+
+    @staticmethod
+    def is_listed(summary: GameSummarySchema) -> bool:
+        """ Попадает ли игра в лобби; повторяет условие GameService.get_lobby_summaries """
+        return all([
+            summary.state in (GameStateEnum.created, GameStateEnum.pending),
+            not summary.with_myself,
+            not summary.with_bot,
+            not summary.is_private,
+        ])
+
+    def update(self, game: GameSchemaOut) -> GameSummarySchema:
+        """
+        Обновляет строку игры по ее текущей схеме: игра, которой не место в лобби (например, завершенная), убирается
+
+        :return: строка лобби для рассылки
+        """
+        summary = GameSummarySchema.from_game(game)
+        if self.is_listed(summary):
+            self.games[summary.id] = summary
+        else:
+            self.remove(summary.id)
+        return summary
+
+    def remove(self, game_id: uuid.UUID) -> None:
+        self.games.pop(game_id, None)
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """ Строит индекс заново по БД """
+        self.games = {summary.id: summary for summary in await GameService(db).get_lobby_summaries()}
+
+    async def find_inconsistencies(self, db: AsyncSession) -> list[uuid.UUID]:
+        """
+        Сравнивает индекс с БД
+
+        :return: ID игр, строки которых отсутствуют, лишние либо отличаются; пустой список - индекс согласован
+        """
+        expected = {summary.id: summary for summary in await GameService(db).get_lobby_summaries()}
+        return sorted(
+            (game_id for game_id in expected.keys() | self.games.keys()
+             if expected.get(game_id) != self.games.get(game_id)),
+            key=str,
+        )
+
+
+lobby_index = LobbyIndex()
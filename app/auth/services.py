@@ -1,3 +1,4 @@
+import secrets
 from datetime import datetime
 from uuid import UUID
 
@@ -8,7 +9,7 @@ from app.core.db.deps import AsyncSession
 from app.core import exceptions
 from app.config import config
 from app.models.user import User
-from app.schemas.user import UserCreate, UserInDb, TokenResponse
+from app.schemas.user import UserCreate, UserCreateProgrammatically, UserInDb, TokenResponse
 from .utils import get_password_hash, generate_jwt, decode_jwt, validate_password, check_password
 from app.core.email.sending import send_email
 from app.schemas.email import EmailSchema
@@ -27,6 +28,14 @@ class UserService:
         user = await self.__db.scalars(stmt)
         return bool(user.first())
 
+    @staticmethod
+    def is_reserved(user_data: UserCreate) -> bool:
+        """ Имя или почта зарезервированы за ботом и недоступны при регистрации """
+        return any([
+            user_data.name.casefold() == config.BOT_USERNAME.casefold(),
+            user_data.email.lower() == config.BOT_EMAIL.lower(),
+        ])
+
     async def get_user_by_email(self, email: EmailStr) -> User:
         stmt = select(User).where(User.email == email)
         user = await self.__db.scalars(stmt)
@@ -40,11 +49,12 @@ class UserService:
     async def create_user(self, user_data: UserCreate) -> User:
         """
         :return: ORM-объект пользователя
-        :raise UserAlreadyExists: если такой пользователь уже существует
+        :raise UserAlreadyExists: если такой пользователь уже существует либо имя или почта зарезервированы
         """
         validate_password(user_data)
 
-        if await self.user_exists(user_data):
+        is_bot = isinstance(user_data, UserCreateProgrammatically) and user_data.is_bot
+        if await self.user_exists(user_data) or (not is_bot and self.is_reserved(user_data)):
             raise exceptions.UserAlreadyExists()
 
         user_in_db = UserInDb(
@@ -60,6 +70,28 @@ class UserService:
 
         return user
 
+    async def get_bot_user(self) -> User:
+        """ Пользователь - компьютерный соперник (``is_bot``); создается при первом обращении """
+        stmt = select(User).where(User.is_bot)
+        bot = await self.__db.scalars(stmt)
+        if (bot := bot.first()) is not None:
+            return bot
+        user_data = UserCreateProgrammatically(
+            name=config.BOT_USERNAME,
+            email=config.BOT_EMAIL,
+            password=secrets.token_urlsafe(32),     # под ботом не входят
+            is_active=True,
+            is_verified=True,
+            is_bot=True,
+        )
+        if await self.user_exists(user_data):
+            # имя или почту занял пользователь, зарегистрированный до их резервирования
+            suffix = secrets.token_hex(3)
+            local, domain = config.BOT_EMAIL.split('@')
+            user_data.name = f'{config.BOT_USERNAME} {suffix}'
+            user_data.email = f'{local}+{suffix}@{domain}'
+        return await self.create_user(user_data)
+
     async def send_verify_token(self, email: EmailStr) -> None:
         user = await self.get_user_by_email(email)
         if all([
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseSettings, EmailStr
 
@@ -17,6 +18,13 @@ class Config(BaseSettings):
     POSTGRES_PASSWORD: str = 'password'
     POSTGRES_PORT: str = 5432
     POSTGRES_DB: str = 'db'
+    POSTGRES_HOST: str = 'db'
+    DB_POOL_SIZE: int = 5               # постоянные соединения пула (на процесс)
+    DB_MAX_OVERFLOW: int = 10           # временные соединения сверх DB_POOL_SIZE
+    DB_POOL_TIMEOUT: float = 30.0       # ожидание свободного соединения (с)
+    DB_POOL_PRE_PING: bool = False      # проверять соединение перед выдачей из пула
+    DB_POOL_RECYCLE: int = -1           # пересоздавать соединения старше (с); -1 - никогда
+    DB_STATEMENT_CACHE_SIZE: int = 100  # кэш подготовленных выражений на соединение; 0 - для pgbouncer
     JWT_SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_SECONDS: int = 30 * 60 * 1000      # TODO: add refresh_token
     RESET_PASSWORD_TOKEN_SECRET: str
@@ -36,7 +44,26 @@ class Config(BaseSettings):
     REDIS_HOST_NAME: str = 'redis'
     REDIS_PORT: int = 6379
     REDIS_HOST_PASSWORD: str = ''
+    WS_BROKER: Literal['local'] = 'local'  # доставка рассылок вебсокетов (см. app/core/ws/broker.py)
     MAX_SPECTATORS_NUM: int = 5
+    WS_SEND_TIMEOUT: float = 5.0        # таймаут отправки сообщения в одно соединение (с)
+    WS_SEND_QUEUE_SIZE: int = 100       # очередь исходящих сообщений соединения (см. app/core/ws/writer.py)
+    WS_OVERFLOW_POLICY: Literal['coalesce', 'drop', 'disconnect'] = 'coalesce'
+    WS_ONLINE_INTERVAL: float = 1.0     # рассылка счетчика онлайна не чаще (с)
+    BOARD_ENGINE: Literal['list', 'bitboard'] = 'list'     # реализация игровой доски (см. engines.py)
+    BOT_USERNAME: str = 'Renju Bot'
+    BOT_EMAIL: EmailStr = 'bot@renju-online.com'
+    BOT_MOVE_TIME_LIMIT: float = 2.0    # время на обдумывание хода ботом (с)
+    BOT_WORKERS: int = 1                # процессы для поиска ходов бота
+    BOT_MOVE_ATTEMPTS: int = 3          # попыток хода бота, после которых ему засчитывается поражение
+    ARCHIVE_AFTER: int = 24 * 60 * 60   # через сколько после завершения игра архивируется (с)
+    ARCHIVE_INTERVAL: int = 60 * 60     # период запуска архивации (с)
+    ARCHIVE_BATCH_SIZE: int = 500       # игр за одну транзакцию архивации
+
+    def database_url(self, database: str | None = None) -> str:
+        """ URL подключения к Postgres (asyncpg); по умолчанию - к БД POSTGRES_DB """
+        return f'postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:' \
+               f'{self.POSTGRES_PORT}/{database or self.POSTGRES_DB}'
 
     class Config:
         env_file = '.env.dev'
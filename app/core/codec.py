@@ -0,0 +1,110 @@
+"""
+Упакованный двоичный формат игровой доски (колонка ``game.board``, bytea).
+
+Заголовок: размер доски (1 байт) и число сделанных ходов (2 байта, big-endian);
+далее - значения клеток построчно, по 2 бита на клетку (4 клетки в байте, старшие биты - первая клетка).
+
+Упакованный список ходов (колонка ``gamearchive.moves``): по 2 байта (big-endian) на ход в порядке партии -
+значение роли (2 бита), ``x - 1`` и ``y - 1`` (по 6 бит).
+"""
+import struct
+from typing import Iterable, NamedTuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.api.services.engines import BoardEngine
+
+HEADER = struct.Struct('>BH')
+CELLS_PER_BYTE = 4
+MOVE = struct.Struct('>H')
+
+# байт упакованной доски -> значения его 4 клеток
+_UNPACK_TABLE = [bytes((byte >> 6 & 3, byte >> 4 & 3, byte >> 2 & 3, byte & 3)) for byte in range(256)]
+
+
+class PackedBoard(NamedTuple):
+    size: int
+    move_count: int
+    values: bytes
+
+
+def pack(values: bytes, size: int, move_count: int = 0) -> bytes:
+    """
+    :param values: значения клеток (0-3) построчно, ``size ** 2`` байт
+    :param size: длина стороны доски
+    :param move_count: число сделанных ходов
+    :return: доска в упакованном формате
+    """
+    if len(values) != size ** 2:
+        raise ValueError('Board must be square.')
+    padded = values + bytes(-len(values) % CELLS_PER_BYTE)
+    body = bytes(
+        padded[i] << 6 | padded[i + 1] << 4 | padded[i + 2] << 2 | padded[i + 3]
+        for i in range(0, len(padded), CELLS_PER_BYTE)
+    )
+    return HEADER.pack(size, move_count) + body
+
+
+def unpack(data: bytes) -> PackedBoard:
+    """
+    :param data: доска в упакованном формате
+    :raise ValueError: если длина данных не соответствует заголовку
+    """
+    size, move_count = HEADER.unpack_from(data)
+    body = data[HEADER.size:]
+    if len(body) != -(-size ** 2 // CELLS_PER_BYTE):
+        raise ValueError('Packed board is corrupted.')
+    values = b''.join(_UNPACK_TABLE[byte] for byte in body)[:size ** 2]
+    return PackedBoard(size=size, move_count=move_count, values=values)
+
+
+def unpack_array(data: bytes) -> list[list[int]]:
+    """ Значения клеток упакованной доски в виде двумерного массива (для клиента) """
+    size, _, values = unpack(data)
+    return [list(values[y * size:(y + 1) * size]) for y in range(size)]
+
+
+def encode_board(board: 'BoardEngine', move_count: int = 0) -> bytes:
+    """ Упаковывает доску любого движка """
+    return pack(board.as_values, len(board), move_count)
+
+
+def decode_board(data: bytes, engine: type['BoardEngine']) -> tuple['BoardEngine', int]:
+    """
+    Распаковывает доску сразу в движок ``engine``, минуя строковый формат
+
+    :return: доска и число сделанных ходов
+    """
+    size, move_count, values = unpack(data)
+    return engine.from_values(values, size), move_count
+
+
+def pack_moves(moves: Iterable[tuple[int, int, int]]) -> bytes:
+    """
+    :param moves: ходы партии по порядку: (значение роли 1-3, x, y), координаты с 1 (до 64)
+    :return: ходы в упакованном формате
+    """
+    data = bytearray()
+    for value, x, y in moves:
+        if not (1 <= value <= 3 and 1 <= x <= 64 and 1 <= y <= 64):
+            raise ValueError(f'Move ({value}, {x}, {y}) cannot be packed.')
+        data += MOVE.pack(value << 12 | (x - 1) << 6 | (y - 1))
+    return bytes(data)
+
+
+def unpack_moves(data: bytes) -> list[tuple[int, int, int]]:
+    """
+    :param data: ходы в упакованном формате
+    :return: ходы партии по порядку: (значение роли, x, y)
+    :raise ValueError: если длина данных не кратна размеру хода
+    """
+    if len(data) % MOVE.size:
+        raise ValueError('Packed moves are corrupted.')
+    return [(code >> 12, (code >> 6 & 63) + 1, (code & 63) + 1) for code, in MOVE.iter_unpack(data)]
+
+
+def board_from_moves(moves: list[tuple[int, int, int]], size: int) -> bytes:
+    """ Упакованная доска, восстановленная по списку ходов (для архивированных игр) """
+    values = bytearray(size ** 2)
+    for value, x, y in moves:
+        values[(y - 1) * size + x - 1] = value
+    return pack(bytes(values), size, move_count=len(moves))
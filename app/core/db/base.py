@@ -1,3 +1,3 @@
 from .session import Base
 from app.models.user import User
-from app.models.game import Game, PlayerRole, PlayerResult, GameMode, Move
+from app.models.game import Game, PlayerRole, PlayerResult, GameMode, Move, GameArchive
@@ -0,0 +1,61 @@
+"""
+Пул соединений с Postgres со статистикой: сколько соединений выдано, сколько ждали соединения,
+сколько раз пул выходил за ``pool_size`` (overflow) и сколько раз соединения не дождались (таймаут).
+
+Статистика - на процесс; отдается внутренним эндпоинтом ``GET /internal/db-pool``.
+"""
+import time
+from dataclasses import dataclass, asdict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0          # выдано соединений
+    wait_total: float = 0.0     # суммарное ожидание соединения (с)
+    wait_max: float = 0.0       # самое долгое ожидание соединения (с)
+    overflows: int = 0          # открыто соединений сверх pool_size
+    timeouts: int = 0           # соединение не получено за pool_timeout
+
+    def record_wait(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """ Пул соединений движка (``poolclass``), собирающий ``PoolStats`` """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def _inc_overflow(self):
+        if incremented := super()._inc_overflow():
+            # до pool_size соединения открываются "в счет" пула, дальше - сверх него
+            if self._overflow > 0:
+                self.stats.overflows += 1
+        return incremented
+
+    def snapshot(self) -> dict:
+        """ Текущее состояние пула и накопленная статистика """
+        return {
+            'size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            **asdict(self.stats),
+        }
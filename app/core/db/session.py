@@ -2,10 +2,20 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, declared_attr
 
 from app.config import config
+from .pool import InstrumentedQueuePool
 
-DB_URL = f'postgresql+asyncpg://{config.POSTGRES_USER}:{config.POSTGRES_PASSWORD}@db:' \
-         f'{config.POSTGRES_PORT}/{config.POSTGRES_DB}'
-engine = create_async_engine(DB_URL, future=True)
+DB_URL = config.database_url()
+engine = create_async_engine(
+    DB_URL,
+    future=True,
+    poolclass=InstrumentedQueuePool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    connect_args={'prepared_statement_cache_size': config.DB_STATEMENT_CACHE_SIZE},
+)
 
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -72,3 +72,11 @@ class CellOccupied(Exception):
 
 class FalseClick(Exception):
     pass
+
+
+class ForbiddenMove(Exception):
+    pass
+
+
+class InvalidCursor(Exception):
+    pass
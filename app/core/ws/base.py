@@ -108,13 +108,16 @@ class WebSocketActions(WebSocketEndpoint):
             await self.on_disconnect(connection, close_code)
 
     async def update_total_online(self) -> None:
-        await self.manager.broadcast({
-            'action': 'online_counter',
-            'total': await self.manager.get_online(),
-        })
+        """ Счетчик онлайна рассылается всем тикером менеджера (см. online.py) """
+        self.manager.online.touch()
 
     async def on_connect(self, connection: WSConnection) -> None:
         await self.manager.connect(connection)
+        # подключившемуся - текущее значение сразу, остальным - с ближайшим тиком
+        await self.manager.send_message(connection.websocket, {
+            'action': 'online_counter',
+            'total': await self.manager.get_online(),
+        })
         await self.update_total_online()
 
     async def on_receive(self, connection: WSConnection, data: Any) -> None:
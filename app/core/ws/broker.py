@@ -0,0 +1,89 @@
+"""
+Брокер рассылок: доставка сообщений менеджерам соединений всех процессов приложения.
+
+``ConnectionManager`` публикует рассылку (``Envelope``: получатели и закодированное сообщение) в брокер,
+брокер передает ее ``deliver`` каждого менеджера - и тот ставит сообщение в очереди своих соединений.
+
+Сейчас есть только ``local`` - рассылка доставляется сразу своему менеджеру. Приложение работает одним процессом:
+идущие игры (live.py), список игр лобби (lobby.py) и счетчик онлайна хранятся в памяти процесса, и одна общая
+рассылка их не синхронизирует. Межпроцессный брокер (например, Redis pub/sub) добавляется в ``BROKERS``
+вместе с переносом этого состояния в общее хранилище; формат рассылки для канала - ``Envelope.dumps/loads``.
+"""
+import json
+from abc import ABCMeta, abstractmethod
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable
+from uuid import UUID
+
+from app.config import config
+from .writer import OutgoingMessage
+
+
+@dataclass(frozen=True)
+class Envelope:
+    """ Рассылка: сообщение и ID пользователей-получателей (None - все подключенные) """
+    message: OutgoingMessage
+    user_ids: tuple[UUID, ...] | None = None
+
+    @classmethod
+    def to_users(cls, message: OutgoingMessage, user_ids: Iterable[UUID]) -> 'Envelope':
+        return cls(message, tuple(set(user_ids)))
+
+    def dumps(self) -> str:
+        """ Заголовок (JSON) и текст сообщения через перевод строки - текст не кодируется повторно """
+        header = {
+            'users': None if self.user_ids is None else [str(user_id) for user_id in self.user_ids],
+            'critical': self.message.critical,
+            'key': None if self.message.key is None else list(self.message.key),
+        }
+        return f'{json.dumps(header)}\n{self.message.text}'
+
+    @classmethod
+    def loads(cls, data: str | bytes) -> 'Envelope':
+        if isinstance(data, bytes):
+            data = data.decode()
+        header, text = data.split('\n', 1)
+        header = json.loads(header)
+        key = None if header['key'] is None else tuple(header['key'])
+        user_ids = None if header['users'] is None else tuple(UUID(user_id) for user_id in header['users'])
+        return cls(OutgoingMessage(text, critical=header['critical'], key=key), user_ids)
+
+
+Deliver = Callable[[Envelope], Awaitable[None]]
+
+
+class Broker:
+    __metaclass__ = ABCMeta
+
+    def __init__(self) -> None:
+        self.deliver: Deliver | None = None     # доставка менеджеру соединений этого процесса
+
+    async def start(self) -> None:
+        """ Подключение к брокеру (при старте приложения) """
+
+    async def close(self) -> None:
+        """ Отключение от брокера (при остановке приложения) """
+
+    @abstractmethod
+    async def publish(self, envelope: Envelope) -> None:
+        """ Доставка рассылки менеджерам соединений всех процессов """
+
+
+class LocalBroker(Broker):
+    """ Рассылки в пределах процесса """
+
+    async def publish(self, envelope: Envelope) -> None:
+        await self.deliver(envelope)
+
+
+BROKERS: dict[str, type[Broker]] = {
+    'local': LocalBroker,
+}
+
+
+def get_broker(name: str | None = None) -> Broker:
+    """
+    :param name: название брокера рассылок; по умолчанию - ``config.WS_BROKER``
+    :return: новый экземпляр брокера
+    """
+    return BROKERS[name or config.WS_BROKER]()
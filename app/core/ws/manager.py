@@ -1,11 +1,14 @@
-from dataclasses import dataclass, field
+import asyncio
+from dataclasses import dataclass, field, asdict
 from uuid import UUID
-from typing import Any
+from typing import Any, Iterable
 
 from fastapi import WebSocket
-from fastapi.encoders import jsonable_encoder
 
 from app.config import config
+from .broker import Broker, Envelope, get_broker
+from .online import OnlineTicker
+from .writer import ConnectionWriter, OutgoingMessage, WriterStats
 
 
 @dataclass(frozen=True)
@@ -17,31 +20,86 @@ class WSConnection:
 
 @dataclass
 class WSConnectionList:
-    all: list[WSConnection] = field(default_factory=list)
+    """ Открытые соединения процесса: все по порядку подключения и по ID пользователя """
+    all: dict[WSConnection, None] = field(default_factory=dict)
+    by_user: dict[UUID | None, list[WSConnection]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.all)
+
+    def __contains__(self, connection: WSConnection) -> bool:
+        return connection in self.all
+
+    def add(self, connection: WSConnection) -> None:
+        self.all[connection] = None
+        self.by_user.setdefault(connection.user_id, []).append(connection)
+
+    def remove(self, connection: WSConnection) -> bool:
+        """ :return: True, если это было последнее соединение пользователя """
+        if connection not in self.all:
+            return False
+        del self.all[connection]
+        connections = self.by_user[connection.user_id]
+        connections.remove(connection)
+        if connections:
+            return False
+        del self.by_user[connection.user_id]
+        return True
 
     def get_websocket(self, user_id: UUID) -> WebSocket | None:
         """ Возвращает вебсокет по ID пользователя, если подключение открыто """
-        for conn in self.all:
-            if conn.user_id == user_id:
-                return conn.websocket
+        if connections := self.by_user.get(user_id):
+            return connections[0].websocket
 
-    def get_websocket_list(self, user_ids: list[UUID]) -> list[WebSocket]:
-        return [conn.websocket for conn in self.all if conn.user_id in user_ids]
+    def get_websocket_list(self, user_ids: Iterable[UUID]) -> list[WebSocket]:
+        return [conn.websocket for user_id in set(user_ids) for conn in self.by_user.get(user_id, ())]
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
+    """
+    Соединения процесса и комнаты игр.
+
+    Комната - игроки и зрители игры (ID пользователей). Состав комнаты задается обработчиками событий игры
+    по списку ее участников (``set_room``), отключившийся от процесса пользователь убирается из его комнат.
+    Рассылка в комнату стоит O(размер комнаты) независимо от числа подключенных пользователей.
+
+    Рассылки кодируют сообщение один раз и публикуются в брокер (см. broker.py), полученную из брокера
+    рассылку менеджер кладет в очереди своих соединений,
+    отправляют писатели соединений (см. writer.py), у каждой отправки свой таймаут ``WS_SEND_TIMEOUT``
+    """
+
+    def __init__(self, broker: Broker | None = None) -> None:
         self.active_connections: WSConnectionList = WSConnectionList()
+        self.rooms: dict[UUID, set[UUID]] = {}
+        self.user_rooms: dict[UUID, set[UUID]] = {}
+        self.writers: dict[WebSocket, ConnectionWriter] = {}
+        self.stats = WriterStats()
+        self.broker = broker or get_broker()
+        self.broker.deliver = self.deliver
+        self.online = OnlineTicker(self)
+
+    async def start(self) -> None:
+        await self.broker.start()
+
+    async def close(self) -> None:
+        self.online.stop()
+        await self.broker.close()
 
     async def connect(self, connection: WSConnection) -> None:
         if not config.DEBUG and self.active_connections.get_websocket(connection.user_id):
             await self.send_message(connection.websocket, {'action': 'already_connected'})
             return
-        self.active_connections.all.append(connection)
+        self.active_connections.add(connection)
+        self.writers[connection.websocket] = ConnectionWriter(connection.websocket, self.stats)
 
     def disconnect(self, connection: WSConnection) -> None:
-        if connection in self.active_connections.all:
-            self.active_connections.all.remove(connection)
+        if connection not in self.active_connections:
+            return
+        if (writer := self.writers.pop(connection.websocket, None)) is not None:
+            writer.stop()
+        if self.active_connections.remove(connection) and connection.user_id is not None:
+            for game_id in list(self.user_rooms.get(connection.user_id, ())):
+                self.leave_room(game_id, connection.user_id)
 
     def get_ws(self, user_id: UUID) -> WebSocket:
         ws = self.active_connections.get_websocket(user_id)
@@ -49,20 +107,99 @@ class ConnectionManager:
             print('Websocket not found!')
         return ws
 
+    def set_room(self, game_id: UUID, user_ids: Iterable[UUID]) -> None:
+        """
+        Состав комнаты игры - ``user_ids`` (игроки и зрители игры)
+        """
+        members = set(user_ids)
+        for user_id in self.rooms.get(game_id, set()) - members:
+            self.leave_room(game_id, user_id)
+        for user_id in members:
+            self.join_room(game_id, user_id)
+
+    def join_room(self, game_id: UUID, user_id: UUID) -> None:
+        self.rooms.setdefault(game_id, set()).add(user_id)
+        self.user_rooms.setdefault(user_id, set()).add(game_id)
+
+    def leave_room(self, game_id: UUID, user_id: UUID) -> None:
+        if (room := self.rooms.get(game_id)) is not None:
+            room.discard(user_id)
+            if not room:
+                del self.rooms[game_id]
+        if (games := self.user_rooms.get(user_id)) is not None:
+            games.discard(game_id)
+            if not games:
+                del self.user_rooms[user_id]
+
+    def close_room(self, game_id: UUID) -> None:
+        for user_id in list(self.rooms.get(game_id, ())):
+            self.leave_room(game_id, user_id)
+
     async def send_message(self, websocket: WebSocket, message: Any) -> None:
-        """ Отправляет сообщение конкретному пользователю """
-        await websocket.send_json(jsonable_encoder(message))
+        """ Отправляет сообщение в конкретное соединение этого процесса """
+        await self.__fan_out([websocket], OutgoingMessage.encode(message))
+
+    async def send_to_user(self, user_id: UUID, message: Any) -> None:
+        """ Отправляет сообщение во все соединения пользователя, если он подключен """
+        await self.limited_broadcast([user_id], message)
 
     async def broadcast(self, message: Any) -> None:
         """ Отправляет сообщение всем подключенным пользователям """
-        for conn in self.active_connections.all:
-            await conn.websocket.send_json(jsonable_encoder(message))
+        await self.broker.publish(Envelope(OutgoingMessage.encode(message)))
+
+    async def local_broadcast(self, message: Any) -> None:
+        """ Отправляет сообщение всем соединениям этого процесса, минуя брокер """
+        await self.deliver(Envelope(OutgoingMessage.encode(message)))
 
-    async def limited_broadcast(self, user_ids: list[UUID], message: Any) -> None:
+    async def limited_broadcast(self, user_ids: Iterable[UUID], message: Any) -> None:
         """ Отправляет сообщение группе пользователей """
-        for ws in self.active_connections.get_websocket_list(user_ids):
-            await ws.send_json(jsonable_encoder(message))
+        envelope = Envelope.to_users(OutgoingMessage.encode(message), user_ids)
+        if envelope.user_ids:
+            await self.broker.publish(envelope)
+
+    async def room_broadcast(self, game_id: UUID, message: Any) -> None:
+        """ Отправляет сообщение игрокам и зрителям игры """
+        await self.limited_broadcast(self.rooms.get(game_id, ()), message)
+
+    async def deliver(self, envelope: Envelope) -> None:
+        """ Рассылка из брокера - в очереди соединений получателей в этом процессе """
+        if envelope.user_ids is None:
+            websockets = [conn.websocket for conn in self.active_connections.all]
+        else:
+            websockets = self.active_connections.get_websocket_list(envelope.user_ids)
+        await self.__fan_out(websockets, envelope.message)
+
+    async def __fan_out(self, websockets: list[WebSocket], outgoing: OutgoingMessage) -> None:
+        for ws in websockets:
+            if (writer := self.writers.get(ws)) is not None:
+                writer.put(outgoing)
+            else:
+                # соединение не зарегистрировано (например, отклонено как повторное) - отправка сразу
+                await self.__send_now(ws, outgoing.text)
+
+    async def __send_now(self, websocket: WebSocket, text: str) -> None:
+        try:
+            await asyncio.wait_for(websocket.send_text(text), timeout=config.WS_SEND_TIMEOUT)
+            self.stats.sent += 1
+        except Exception:
+            self.stats.failed_sends += 1
+
+    async def flush(self) -> None:
+        """ Дожидается отправки сообщений из очередей всех соединений """
+        await asyncio.gather(*(writer.join() for writer in list(self.writers.values())))
+
+    def metrics(self) -> dict:
+        """ Глубина очередей соединений и счетчики писателей """
+        depths = [writer.depth for writer in self.writers.values()]
+        return {
+            'connections': len(self.active_connections),
+            'queued': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            **asdict(self.stats),
+            'online_broadcasts': self.online.broadcasts,
+            'online_broadcasts_saved': self.online.saved,
+        }
 
     async def get_online(self) -> int:
-        """ Возвращает число текущих соединений """
-        return len(self.active_connections.all)
+        """ Возвращает число текущих соединений этого процесса """
+        return len(self.active_connections)
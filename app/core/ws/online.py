@@ -0,0 +1,65 @@
+"""
+Счетчик онлайна: вместо рассылки всем на каждое подключение/отключение (O(n^2) сообщений при массовом
+переподключении, например после деплоя) изменения копятся, а одна задача-тикер процесса рассылает
+``online_counter`` не чаще раза в ``WS_ONLINE_INTERVAL`` и только если значение изменилось.
+Значение - число соединений процесса, поэтому и рассылается оно только соединениям процесса, минуя брокер.
+"""
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from app.config import config
+
+if TYPE_CHECKING:
+    from .manager import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class OnlineTicker:
+
+    def __init__(self, manager: 'ConnectionManager', interval: float | None = None):
+        self.interval = interval or config.WS_ONLINE_INTERVAL
+        self.requested = 0      # изменений онлайна - прежде каждое давало рассылку
+        self.broadcasts = 0     # сделанных рассылок
+        self.last_total: int | None = None
+        self.__manager = manager
+        self.__changed = False
+        self.__task: asyncio.Task | None = None
+
+    @property
+    def saved(self) -> int:
+        """ Рассылок, которых удалось избежать """
+        return self.requested - self.broadcasts
+
+    def touch(self) -> None:
+        """ Онлайн изменился: значение уйдет с ближайшим тиком """
+        self.requested += 1
+        self.__changed = True
+        if self.__task is None or self.__task.done():
+            self.__task = asyncio.create_task(self.__run())
+
+    def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    async def tick(self) -> None:
+        """ Рассылка текущего значения, если оно изменилось с прошлой рассылки """
+        if not self.__changed:
+            return
+        self.__changed = False
+        total = await self.__manager.get_online()
+        if total == self.last_total:
+            return
+        self.last_total = total
+        self.broadcasts += 1
+        await self.__manager.local_broadcast({'action': 'online_counter', 'total': total})
+
+    async def __run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception('Online counter broadcast failed')
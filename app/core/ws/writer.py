@@ -0,0 +1,152 @@
+"""
+Отправка сообщений в соединение: у каждого соединения своя задача-писатель и ограниченная очередь.
+
+Рассылки только кладут сообщение в очереди получателей и не ждут отправки, поэтому медленный клиент
+задерживает лишь собственную очередь. Переполнение очереди (``WS_SEND_QUEUE_SIZE``) разрешается
+политикой ``WS_OVERFLOW_POLICY``:
+
+- ``coalesce`` - новое сообщение списка игр / счетчика онлайна заменяет устаревшее с тем же ключом
+  (то же действие для той же игры) на его месте в очереди, порядок с соседними сообщениями сохраняется;
+  если такого нет - как ``drop``;
+- ``drop`` - некритичное сообщение (списка игр, счетчика онлайна) отбрасывается, а для критичного
+  из очереди вытесняется самое старое некритичное; если такого нет - как ``disconnect``;
+- ``disconnect`` - соединение закрывается: клиент переподключится и получит актуальное состояние.
+"""
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+from starlette import status
+
+from app.config import config
+
+OverflowPolicy = Literal['coalesce', 'drop', 'disconnect']
+
+# сообщения, которые клиент может пропустить: состояние списка игр и онлайна приходит следующими
+NON_CRITICAL_ACTIONS = frozenset({
+    'online_counter', 'game_added', 'update_game_list', 'player_joined_list', 'game_removed_list',
+})
+
+
+@dataclass(frozen=True, slots=True)
+class OutgoingMessage:
+    """ Сообщение, закодированное один раз на рассылку """
+    text: str
+    critical: bool = True
+    key: tuple | None = None    # сообщение вытесняет из очереди устаревшее с тем же ключом (coalesce)
+
+    @classmethod
+    def encode(cls, message: Any) -> 'OutgoingMessage':
+        """ JSON сообщения (как у ``WebSocket.send_json``) и его класс по ключу ``action`` """
+        data = jsonable_encoder(message)
+        action = data.get('action') if isinstance(data, dict) else None
+        if action not in NON_CRITICAL_ACTIONS:
+            return cls(json.dumps(data))
+        game = data.get('game')
+        game_id = game.get('id') if isinstance(game, dict) else data.get('game_id')
+        return cls(json.dumps(data), critical=False, key=(action, game_id))
+
+
+@dataclass
+class WriterStats:
+    """ Счетчики писателей всех соединений процесса """
+    sent: int = 0
+    failed_sends: int = 0           # отправки, завершившиеся ошибкой либо таймаутом
+    coalesced: int = 0              # вытеснено устаревших сообщений
+    dropped: int = 0                # отброшено некритичных сообщений
+    overflow_disconnects: int = 0   # соединения, закрытые из-за переполнения очереди
+
+
+class ConnectionWriter:
+    """ Очередь исходящих сообщений соединения и задача, отправляющая их по одному """
+
+    def __init__(
+            self,
+            websocket: WebSocket,
+            stats: WriterStats,
+            max_size: int | None = None,
+            policy: OverflowPolicy | None = None,
+    ):
+        self.websocket = websocket
+        self.queue: deque[OutgoingMessage] = deque()
+        self.max_size = max_size or config.WS_SEND_QUEUE_SIZE
+        self.policy = policy or config.WS_OVERFLOW_POLICY
+        self.overflowed = False
+        self.__stats = stats
+        self.__wakeup = asyncio.Event()
+        self.__idle = asyncio.Event()
+        self.__idle.set()
+        self.__task = asyncio.create_task(self.__run())
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue)
+
+    def put(self, message: OutgoingMessage) -> None:
+        """ Ставит сообщение в очередь; при переполнении действует политика соединения """
+        if self.overflowed:
+            return
+        if len(self.queue) >= self.max_size and not self.__make_room(message):
+            return
+        self.queue.append(message)
+        self.__idle.clear()
+        self.__wakeup.set()
+
+    async def join(self) -> None:
+        """ Дожидается отправки всех сообщений очереди """
+        await self.__idle.wait()
+
+    def stop(self) -> None:
+        """ Останавливает писателя закрытого соединения; неотправленные сообщения теряются """
+        self.__task.cancel()
+        self.queue.clear()
+        self.__idle.set()
+
+    def __make_room(self, message: OutgoingMessage) -> bool:
+        """ :return: True, если после применения политики сообщение нужно добавить в конец очереди """
+        if self.policy == 'coalesce' and message.key is not None:
+            for i, queued in enumerate(self.queue):
+                if queued.key == message.key:
+                    self.queue[i] = message
+                    self.__stats.coalesced += 1
+                    return False
+        if self.policy in ('coalesce', 'drop'):
+            if not message.critical:
+                self.__stats.dropped += 1
+                return False
+            for i, queued in enumerate(self.queue):
+                if not queued.critical:
+                    del self.queue[i]
+                    self.__stats.dropped += 1
+                    return True
+        self.__stats.overflow_disconnects += 1
+        self.overflowed = True
+        self.queue.clear()
+        self.__wakeup.set()
+        return False
+
+    async def __run(self) -> None:
+        while not self.overflowed:
+            if not self.queue:
+                self.__idle.set()
+                await self.__wakeup.wait()
+                self.__wakeup.clear()
+                continue
+            message = self.queue.popleft()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(message.text), timeout=config.WS_SEND_TIMEOUT)
+                self.__stats.sent += 1
+            except Exception:
+                # ошибка не пробрасывается - соединение закроется своим обработчиком
+                self.__stats.failed_sends += 1
+        try:
+            # отключение обработает цикл приема сообщений соединения (on_disconnect)
+            await self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+        finally:
+            self.__idle.set()
@@ -28,3 +28,9 @@ class PlayerResultReasonEnum(enum.Enum):
     full_board = 'the board is full'
     tech = 'technical'
     agreement = 'agreement'
+
+
+class ForbiddenMoveEnum(enum.Enum):
+    double_three = 'double three'
+    double_four = 'double four'
+    overline = 'overline'
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Boolean, Table, SmallInteger
+from sqlalchemy import (
+    Column, String, Integer, DateTime, ForeignKey, Enum, Boolean, Table, SmallInteger, LargeBinary, Index,
+)
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql.expression import func
+from sqlalchemy.sql.expression import func, and_
 from sqlalchemy.dialects import postgresql as psql
 
 from app.core.db.session import Base
@@ -21,6 +23,9 @@ class PlayerRole(Base):
     Association Object
 
     https://docs.sqlalchemy.org/en/14/orm/basic_relationships.html#association-object
+
+    Связи моделей не загружаются неявно (``lazy='raise'``): запросы явно указывают, что загрузить,
+    см. профили в app/api/services/loaders.py
     """
     player_id = Column(psql.UUID(as_uuid=True), ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
     game_id = Column(psql.UUID(as_uuid=True), ForeignKey('game.id', ondelete='CASCADE'), primary_key=True)
@@ -31,19 +36,27 @@ class PlayerRole(Base):
     )
     ready = Column(Boolean, default=False)
     can_move = Column(Boolean, default=False)
+    # результат игрока проставлен либо игра завершена; незавершенные игры юзера - по частичному индексу
+    finished = Column(Boolean, default=False, nullable=False)
 
     # One To One (PlayerResult)
     result_id = Column(Integer, ForeignKey('playerresult.id', ondelete='CASCADE'))
     result = relationship(
         'PlayerResult',
         back_populates='pr',
-        lazy='selectin',
+        lazy='raise',
         cascade='save-update, merge, delete, delete-orphan',
         single_parent=True,
     )
 
-    game = relationship('Game', back_populates='players', lazy='selectin')
-    player = relationship('User', back_populates='games', lazy='selectin')
+    game = relationship('Game', back_populates='players', lazy='raise')
+    player = relationship('User', back_populates='games', lazy='raise')
+
+    __table_args__ = (
+        Index('ix_playerrole_player_id_unfinished', 'player_id', postgresql_where=~finished),
+        # загрузка игроков игр (selectinload Game.players); по player_id - первичный ключ (player_id, game_id)
+        Index('ix_playerrole_game_id_role', 'game_id', 'role'),
+    )
 
 
 class Game(UuidIdMixin, Base):
@@ -51,7 +64,7 @@ class Game(UuidIdMixin, Base):
     players = relationship(
         'PlayerRole',
         back_populates='game',
-        lazy='selectin',
+        lazy='raise',
         cascade='save-update, merge, delete, delete-orphan',
     )
 
@@ -62,17 +75,49 @@ class Game(UuidIdMixin, Base):
     is_private = Column(Boolean, default=False)
 
     # m2m (GameMode)
-    modes = relationship('GameMode', secondary=game_mode_m2m, back_populates='games', lazy='selectin')
+    modes = relationship(
+        'GameMode',
+        secondary=game_mode_m2m,
+        back_populates='games',
+        lazy='raise',
+        passive_deletes=True,
+    )
+
+    # One To Many (Move); у архивированной игры ходы - в archive, а строк move нет
+    moves = relationship('Move', back_populates='game', lazy='raise', passive_deletes=True)
 
-    # One To Many (Move)
-    moves = relationship('Move', back_populates='game', lazy='selectin')
+    # One To One (GameArchive)
+    archive = relationship('GameArchive', back_populates='game', uselist=False, lazy='raise', passive_deletes=True)
 
     time_limit = Column(Integer)
     board_size = Column(Integer, default=15)
     classic_mode = Column(Boolean, default=False)
     with_myself = Column(Boolean, default=False)
+    with_bot = Column(Boolean, default=False)
     num_players = Column(Integer, default=2)
-    board = Column(String)
+    board = Column(LargeBinary)     # упакованный формат, см. app/core/codec.py; NULL - игра в архиве
+    move_count = Column(Integer, default=0, nullable=False)     # число сделанных ходов = число камней на доске
+
+    __table_args__ = (
+        # история завершенных игр: постраничность по ключу (finished_at, id)
+        Index(
+            'ix_game_finished_at_id',
+            'finished_at',
+            'id',
+            postgresql_where=state == GameStateEnum.finished,
+        ),
+        # список игр в лобби (GameService.get_lobby_summaries): условие индекса повторяет условие запроса
+        Index(
+            'ix_game_lobby',
+            'created_at',
+            postgresql_where=and_(
+                state.in_([GameStateEnum.created, GameStateEnum.pending]),
+                ~with_myself,
+                ~with_bot,
+                ~is_private,
+            ),
+        ),
+    )
 
 
 class PlayerResult(Base):
@@ -81,7 +126,7 @@ class PlayerResult(Base):
     reason = Column(Enum(PlayerResultReasonEnum))
 
     # One To One (PlayerRole)
-    pr = relationship('PlayerRole', back_populates='result', uselist=False, lazy='selectin')
+    pr = relationship('PlayerRole', back_populates='result', uselist=False, lazy='raise')
 
 
 class GameMode(Base):
@@ -91,12 +136,13 @@ class GameMode(Base):
     board_size = Column(Integer, default=None)
     classic_mode = Column(Boolean, default=None)
     with_myself = Column(Boolean, default=None)
+    with_bot = Column(Boolean, default=None)
     three_players = Column(Boolean, default=None)
     is_active = Column(Boolean, default=False)
     dev = Column(Boolean, default=False)
 
     # m2m (Game)
-    games = relationship('Game', secondary=game_mode_m2m, back_populates='modes', lazy='selectin')
+    games = relationship('Game', secondary=game_mode_m2m, back_populates='modes', lazy='raise')
 
 
 class Move(Base):
@@ -104,7 +150,7 @@ class Move(Base):
 
     # Many To One (Game)
     game_id = Column(psql.UUID(as_uuid=True), ForeignKey('game.id', ondelete='CASCADE'))
-    game = relationship('Game', back_populates='moves', lazy='selectin')
+    game = relationship('Game', back_populates='moves', lazy='raise')
 
     role = Column(
         Enum(PlayerRoleEnum, values_callable=lambda obj: [e.value for e in obj]),
@@ -113,3 +159,20 @@ class Move(Base):
     )
     x = Column(SmallInteger)
     y = Column(SmallInteger)
+
+    __table_args__ = (
+        # ходы игры в порядке их совершения
+        Index('ix_move_game_id_id', 'game_id', 'id'),
+    )
+
+
+class GameArchive(Base):
+    """
+    Архив завершенной игры: все ходы одной упакованной колонкой вместо строк ``move``.
+    Доска игры при архивации не хранится - она восстанавливается по ходам (см. app/api/services/archive.py)
+    """
+    game_id = Column(psql.UUID(as_uuid=True), ForeignKey('game.id', ondelete='CASCADE'), primary_key=True)
+    game = relationship('Game', back_populates='archive', lazy='raise')
+
+    moves = Column(LargeBinary, nullable=False)     # упакованный формат, см. app/core/codec.py
+    archived_at = Column(DateTime(timezone=True), default=func.now())
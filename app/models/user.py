@@ -15,6 +15,7 @@ class User(UuidIdMixin, Base):
     is_active = Column(Boolean, default=False)
     is_verified = Column(Boolean, default=False)
     is_superuser = Column(Boolean, default=False)
+    is_bot = Column(Boolean, default=False)
 
     # One to Many
-    games = relationship(PlayerRole, back_populates='player', lazy='selectin')
+    games = relationship(PlayerRole, back_populates='player', lazy='raise')
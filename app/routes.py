@@ -4,6 +4,7 @@ from .auth.endpoints import auth_router, users_router
 from .api.endpoints.common import router as common_router
 from .api.endpoints.home import router as home_router
 from .api.endpoints.ws import router as ws_router
+from .api.endpoints.internal import router as internal_router
 
 
 routes = APIRouter()
@@ -13,3 +14,4 @@ routes.include_router(users_router, tags=['users'], prefix='/users')
 routes.include_router(common_router, tags=['games'])
 routes.include_router(home_router, tags=['home'])
 routes.include_router(ws_router, tags=['ws_apps'])
+routes.include_router(internal_router, tags=['internal'], prefix='/internal')
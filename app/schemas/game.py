@@ -3,9 +3,12 @@ from datetime import datetime
 from typing import Type, Any
 
 from pydantic import BaseModel, Field
+from pydantic.utils import GetterDict
+from sqlalchemy import inspect
 
 from .user import UserRead
 from app.enums.game import PlayerRoleEnum, GameStateEnum, PlayerResultEnum, PlayerResultReasonEnum
+from app.core.codec import unpack_array, unpack_moves, board_from_moves
 
 
 class GameModeBaseSchema(BaseModel):
@@ -26,6 +29,7 @@ class GameRules(BaseModel):
     board_size: int | None = Field(15, gt=10, le=40, description='Длина стороны квадратного поля (в клетках)')
     classic_mode: bool | None = Field(False, description='Включить классические правила рэндзю')
     with_myself: bool | None = Field(False, description='Игра с самим собой')
+    with_bot: bool | None = Field(False, description='Игра против компьютера')
     three_players: bool | None = Field(False, description='Три игрока (каждый против каждого)')
 
 
@@ -35,6 +39,7 @@ class GameModeSchema(GameModeBaseSchema):
     board_size: int | None = Field(None, gt=10, le=40, description='Длина стороны квадратного поля (в клетках)')
     classic_mode: bool | None = Field(None, description='Включить классические правила рэндзю')
     with_myself: bool | None = Field(None, description='Игра с самим собой')
+    with_bot: bool | None = Field(None, description='Игра против компьютера')
     three_players: bool | None = Field(None, description='Три игрока (каждый против каждого)')
     is_active: bool = Field(False, description='Доступен ли мод для игры')
     dev: bool = Field(False, description='Находится ли мод в разработке')
@@ -77,6 +82,31 @@ class MoveSchema(MoveInputSchema):
     role: PlayerRoleEnum
 
 
+class GameGetterDict(GetterDict):
+    """
+    Чтение ORM-объекта игры: ходы и доска архивированной игры - из ее архива (см. archive.py).
+    Архив, не загруженный профилем запроса (см. loaders.py), не читается - игра считается неархивированной
+    """
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key in ('moves', 'board') and (archive := self.__get_archive()) is not None:
+            moves = unpack_moves(archive.moves)
+            if key == 'board':
+                return board_from_moves(moves, self._obj.board_size)
+            # строк move больше нет - вместо ID номер хода в партии
+            return [
+                MoveSchema(id=number, role=PlayerRoleEnum(str(value)), x=x, y=y)
+                for number, (value, x, y) in enumerate(moves, start=1)
+            ]
+        return super().get(key, default)
+
+    def __get_archive(self) -> Any:
+        state = inspect(self._obj, raiseerr=False)
+        if state is None or 'archive' in state.unloaded:
+            return None
+        return self._obj.archive
+
+
 class GameJoinSchema(GameBaseSchema):
     id: uuid.UUID
 
@@ -95,12 +125,17 @@ class GameSchema(GameCreateSchema):
     board_size: int = Field(..., gt=10, le=40, description='Длина стороны квадратного поля (в клетках)')
     classic_mode: bool = Field(..., description='Включить классические правила рэндзю')
     with_myself: bool = Field(..., description='Игра с самим собой')
-    board: str | list[list[int]]
+    with_bot: bool = Field(False, description='Игра против компьютера')
+    board: bytes | list[list[int]]
+    move_count: int = Field(0, ge=0, description='Число сделанных ходов (камней на доске)')
     created_at: datetime
     started_at: datetime | None = None
     finished_at: datetime | None = None
     moves: list[MoveSchema]
 
+    class Config:
+        getter_dict = GameGetterDict
+
     def get_player_by_role(self, role: PlayerRoleEnum) -> PlayerSchema | None:
         for player in self.players:
             if player.role == role:
@@ -127,7 +162,7 @@ class GameSchemaOut(GameSchema):
         schema.player_3 = instance.get_player_by_role(PlayerRoleEnum.third)
         schema.spectators = instance.get_spectators()
         schema.players = None
-        schema.board = [[int(cell) for cell in row] for row in schema.board.split('.')]  # (!) дубл. Board.from_string()
+        schema.board = unpack_array(schema.board)
         return schema
 
     def current_player(self) -> PlayerSchema | None:
@@ -164,6 +199,65 @@ class GameSchemaOut(GameSchema):
         return ''
 
 
+class LobbyPlayerSchema(BaseModel):
+    name: str
+    ready: bool = False
+    result: PlayerResultEnum | None = None
+
+
+class GameSummarySchema(BaseModel):
+    """ Строка списка игр в лобби: без доски, ходов и данных пользователей, кроме имен игроков """
+    id: uuid.UUID
+    state: GameStateEnum
+    is_private: bool = False
+    modes: list[GameModeInGameSchema] = []
+    num_players: int = Field(2, ge=2, le=3, description='Кол-во игроков')
+    time_limit: int | None = Field(None, ge=0, le=1200, description='Время, отведенное игрокам на ходы (с)')
+    board_size: int = Field(..., gt=10, le=40, description='Длина стороны квадратного поля (в клетках)')
+    classic_mode: bool = Field(..., description='Классические правила рэндзю')
+    with_myself: bool = Field(..., description='Игра с самим собой')
+    with_bot: bool = Field(False, description='Игра против компьютера')
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    player_1: LobbyPlayerSchema | None = None
+    player_2: LobbyPlayerSchema | None = None
+    player_3: LobbyPlayerSchema | None = None
+    spectators_num: int = Field(0, ge=0, description='Кол-во зрителей')
+
+    @classmethod
+    def from_game(cls, game: 'GameSchemaOut') -> 'GameSummarySchema':
+        """ Строка списка игр по уже построенной схеме игры - без обращения к БД """
+        players = {}
+        for key in ['player_1', 'player_2', 'player_3']:
+            if player := getattr(game, key):
+                players[key] = LobbyPlayerSchema(name=player.player.name, ready=player.ready,
+                                                 result=player.result.result)
+        fields = set(cls.__fields__) - set(players) - {'spectators_num'}
+        return cls(**game.dict(include=fields), **players, spectators_num=len(game.spectators))
+
+
+class GameHistorySchema(GameBaseSchema):
+    """ Завершенная игра в истории юзера - без доски и списка ходов """
+    id: uuid.UUID
+    players: list[PlayerSchema] = Field(..., description='Игроки и зрители с результатами')
+    num_players: int = Field(2, ge=2, le=3, description='Кол-во игроков')
+    time_limit: int | None = Field(None, ge=0, le=1200, description='Время, отведенное игрокам на ходы (с)')
+    board_size: int = Field(..., gt=10, le=40, description='Длина стороны квадратного поля (в клетках)')
+    classic_mode: bool = Field(..., description='Классические правила рэндзю')
+    with_myself: bool = Field(..., description='Игра с самим собой')
+    with_bot: bool = Field(False, description='Игра против компьютера')
+    move_count: int = Field(0, ge=0, description='Число сделанных ходов')
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime
+
+
+class GameHistoryPage(BaseModel):
+    games: list[GameHistorySchema]
+    next_cursor: str | None = Field(None, description='Курсор следующей страницы; None - страница последняя')
+
+
 class GameFullSchema(GameSchema):
     started_at: datetime | None = None
     finished_at: datetime | None = None
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+
+
+class DBPoolStatsSchema(BaseModel):
+    """ Состояние пула соединений процесса и статистика с его запуска (см. app/core/db/pool.py) """
+    size: int = Field(..., description='Постоянные соединения пула (pool_size)')
+    max_overflow: int = Field(..., description='Предел соединений сверх pool_size')
+    checked_out: int = Field(..., description='Выданные сейчас соединения')
+    checked_in: int = Field(..., description='Свободные соединения в пуле')
+    overflow: int = Field(..., description='Открытые сейчас соединения сверх pool_size')
+    checkouts: int = Field(..., description='Всего выдано соединений')
+    wait_total: float = Field(..., description='Суммарное ожидание соединения (с)')
+    wait_max: float = Field(..., description='Самое долгое ожидание соединения (с)')
+    overflows: int = Field(..., description='Всего открыто соединений сверх pool_size')
+    timeouts: int = Field(..., description='Соединение не получено за pool_timeout')
+
+
+class WSStatsSchema(BaseModel):
+    """ Очереди исходящих сообщений вебсокетов процесса (см. app/core/ws/writer.py) """
+    connections: int = Field(..., description='Открытые соединения')
+    queued: int = Field(..., description='Сообщений в очередях всех соединений')
+    max_queue_depth: int = Field(..., description='Самая длинная очередь соединения')
+    sent: int = Field(..., description='Всего отправлено сообщений')
+    failed_sends: int = Field(..., description='Отправки, завершившиеся ошибкой либо таймаутом')
+    coalesced: int = Field(..., description='Устаревшие сообщения, вытесненные новыми')
+    dropped: int = Field(..., description='Отброшенные некритичные сообщения')
+    overflow_disconnects: int = Field(..., description='Соединения, закрытые из-за переполнения очереди')
+    online_broadcasts: int = Field(..., description='Рассылки счетчика онлайна')
+    online_broadcasts_saved: int = Field(..., description='Рассылки счетчика онлайна, которых удалось избежать')
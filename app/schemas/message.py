@@ -2,7 +2,7 @@ from uuid import UUID
 
 from pydantic import BaseModel
 
-from .game import GameSchemaOut, MoveSchema
+from .game import GameSchemaOut, GameSummarySchema, MoveSchema
 from app.enums.game import PlayerRoleEnum
 
 
@@ -18,7 +18,7 @@ class OpenGameMessage(BaseMessageSchema):
 
 class GameAddedMessage(BaseMessageSchema):
     action: str = 'game_added'
-    game: GameSchemaOut
+    game: GameSummarySchema
 
 
 class PlayerJoinedMessage(BaseMessageSchema):
@@ -28,8 +28,11 @@ class PlayerJoinedMessage(BaseMessageSchema):
     player_role: PlayerRoleEnum
 
 
-class PlayerJoinedListMessage(PlayerJoinedMessage):
+class PlayerJoinedListMessage(BaseMessageSchema):
     action: str = 'player_joined_list'
+    game: GameSummarySchema
+    player_name: str
+    player_role: PlayerRoleEnum
 
 
 class SpectatorJoinedMessage(BaseMessageSchema):
@@ -66,7 +69,7 @@ class GameRemovedMessage(BaseMessageSchema):
 
 class UpdateGameInListMessage(BaseMessageSchema):
     action: str = 'update_game_list'
-    game: GameSchemaOut
+    game: GameSummarySchema
 
 
 class UpdateGameMessage(BaseMessageSchema):
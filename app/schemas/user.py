@@ -26,6 +26,7 @@ class UserCreateProgrammatically(UserCreate):
     is_active: bool = True
     is_verified: bool = False
     is_superuser: bool = False
+    is_bot: bool = False
 
 
 class UserInDb(UserBase):
@@ -35,6 +36,7 @@ class UserInDb(UserBase):
     is_active: bool = True
     is_verified: bool = False
     is_superuser: bool = False
+    is_bot: bool = False
 
 
 class UserUpdate(UserBase):
@@ -0,0 +1,142 @@
+"""
+Микробенчмарки операций доски и определения правил (без БД)
+
+    python -m benchmarks.bench_board
+    python -m benchmarks.bench_board --engine bitboard --sizes 15 30 --repeats 7
+
+Для каждого движка доски, размера (15, 30, 40) и позиции (пустая, середина партии, почти заполненная)
+печатаются ops/s (лучший из ``--repeats`` замеров, число вызовов подбирается на ~0.2 с)
+и пик выделенной памяти на один вызов (tracemalloc).
+Позиции генерируются с фиксированным seed и не содержат 5 в ряд - check_victory проходит доску целиком
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable
+
+from app.api.services.engines import BOARD_ENGINES, BoardEngine
+from app.api.services.geometry import get_geometry
+from app.api.services.games import GameService
+from app.models.game import GameMode
+from app.schemas.game import MoveInputSchema
+
+SIZES = (15, 30, 40)
+POSITIONS = {'empty': 0.0, 'mid-game': 0.3, 'near-full': 0.95}
+MIN_TIME = 0.2
+
+
+def make_position(engine: type[BoardEngine], size: int, fill: float, seed: int) -> BoardEngine:
+    """ Случайная позиция на 2 игроков с долей заполнения ``fill`` без 5 в ряд """
+    rnd = random.Random(seed)
+    windows = get_geometry(size).windows
+    values = bytearray(size ** 2)
+    cells = list(range(size ** 2))
+    rnd.shuffle(cells)
+    placed = 0
+    for cell in cells:
+        if placed >= int(size ** 2 * fill):
+            break
+        for value in rnd.sample([1, 2], 2):
+            values[cell] = value
+            if not any(all(values[i] == value for i in window) for direction in windows[cell] for window in direction):
+                placed += 1
+                break
+            values[cell] = 0
+    return engine.from_values(bytes(values), size)
+
+
+def bench(func: Callable[[], object], repeats: int) -> tuple[float, int]:
+    """
+    :return: ops/s (лучший замер) и пик памяти одного вызова (байт)
+    """
+    number, elapsed = 1, 0.0
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_TIME:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(MIN_TIME / elapsed * 1.2))
+    best = elapsed
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return number / best, peak
+
+
+def board_cases(board: BoardEngine, engine: type[BoardEngine]) -> dict[str, Callable[[], object]]:
+    string = board.as_string
+    values = board.as_values
+    size = len(board)
+    moves = [MoveInputSchema(x=i % size + 1, y=i // size + 1, value=1) for i, value in enumerate(values) if not value]
+    move_index = 0
+
+    def move() -> None:
+        # ход на копии позиции: в замер входит и копирование (from_values), как при загрузке доски из БД
+        nonlocal move_index
+        move_index = (move_index + 1) % len(moves)
+        engine.from_values(values, size).move(moves[move_index])
+
+    cases = {
+        'from_string': lambda: engine.from_string(string),
+        'as_string': lambda: board.as_string,
+        'from_values+move': move,
+        'check_victory': board.check_victory,
+        'check_free_space': board.check_free_space,
+    }
+    if hasattr(board, 'diagonals'):
+        cases['diagonals'] = lambda: board.diagonals
+    return cases
+
+
+def rules_cases() -> dict[str, Callable[[], object]]:
+    modes = [
+        GameMode(id=1, name='Rapid', time_limit=600),
+        GameMode(id=3, name='Big Board', board_size=30),
+        GameMode(id=4, name='Trinity', three_players=True, board_size=30),
+        GameMode(id=5, name='Versus Computer', with_bot=True),
+    ]
+    return {
+        'determine_rules (no modes)': lambda: GameService.determine_rules([]),
+        'determine_rules (4 modes)': lambda: GameService.determine_rules(modes),
+    }
+
+
+def print_row(name: str, ops: float, peak: int) -> None:
+    print(f'  {name:<28} {ops:>14,.0f} ops/s {peak:>12,} B peak/op')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', choices=list(BOARD_ENGINES), action='append', help='по умолчанию - все')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    for engine_name in args.engine or list(BOARD_ENGINES):
+        engine = BOARD_ENGINES[engine_name]
+        for size in args.sizes:
+            for position_name, fill in POSITIONS.items():
+                board = make_position(engine, size, fill, seed=size)
+                print(f'[{engine_name}] {size}x{size}, {position_name}')
+                for case_name, func in board_cases(board, engine).items():
+                    print_row(case_name, *bench(func, args.repeats))
+
+    print('[rules]')
+    for case_name, func in rules_cases().items():
+        print_row(case_name, *bench(func, args.repeats))
+
+
+if __name__ == '__main__':
+    main()
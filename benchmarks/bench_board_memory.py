@@ -0,0 +1,63 @@
+"""
+Память на одну доску: прежнее представление (список списков dataclass Cell + Coord на каждую клетку)
+против плоского bytearray в RenjuBoard и битовых масок RenjuBitBoard
+
+    python -m benchmarks.bench_board_memory
+"""
+import random
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from app.api.services.board import Coord, RenjuBoard
+from app.api.services.bitboard import RenjuBitBoard
+
+SIZES = (15, 30, 40)
+BOARDS = 200
+
+
+@dataclass
+class LegacyCell:
+    """ Клетка в том виде, в каком ее хранила доска до перехода на плоский массив """
+    value: int
+    coord: Coord
+
+
+def legacy_board(values: bytes, size: int) -> list[list[LegacyCell]]:
+    return [
+        [LegacyCell(value=values[(y - 1) * size + x - 1], coord=Coord(x, y)) for x in range(1, size + 1)]
+        for y in range(1, size + 1)
+    ]
+
+
+def measure(factory: Callable[[bytes, int], object], positions: list[bytes], size: int) -> float:
+    """ Среднее число байт, удерживаемых одной доской """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = [factory(values, size) for values in positions]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del boards
+    return (after - before) / len(positions)
+
+
+def main() -> None:
+    rnd = random.Random(0)
+    engines = {
+        'legacy list[list[Cell]]': legacy_board,
+        'RenjuBoard (bytearray)': RenjuBoard.from_values,
+        'RenjuBitBoard': RenjuBitBoard.from_values,
+    }
+    print(f'{"size":>6} | ' + ' | '.join(f'{name:>24}' for name in engines))
+    for size in SIZES:
+        # позиции середины партии: заполнена примерно треть доски
+        positions = [
+            bytes(rnd.randint(1, 2) if rnd.random() < 0.3 else 0 for _ in range(size ** 2))
+            for _ in range(BOARDS)
+        ]
+        results = [measure(factory, positions, size) for factory in engines.values()]
+        print(f'{size:>6} | ' + ' | '.join(f'{result:>18,.0f} B/brd' for result in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Рассылка сообщения списка игр всем подключенным против прежней последовательной отправки
+с кодированием сообщения на каждого получателя:
+- broadcast - ConnectionManager.broadcast и отправка всех очередей писателей соединений;
+- enqueue - только ConnectionManager.broadcast (постановка в очереди), т.е. время обработчика.
+Вебсокеты - заглушки: отправка уступает цикл событий, 1% получателей отвечает с задержкой SLOW_DELAY
+
+    python -m benchmarks.bench_broadcast
+"""
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import config
+from app.core.ws.manager import ConnectionManager, WSConnection
+from app.enums.game import GameStateEnum
+from app.schemas.game import GameSummarySchema, LobbyPlayerSchema
+from app.schemas.message import UpdateGameInListMessage
+
+CONNECTIONS = [100, 1000, 10000]
+SLOW_SHARE = 0.01
+SLOW_DELAY = 0.05   # (с)
+REPEATS = 3
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+
+    async def send_text(self, data: str) -> None:
+        await asyncio.sleep(self.delay)
+
+    async def send_json(self, data) -> None:
+        # как WebSocket.send_json: JSON кодируется при каждой отправке
+        await self.send_text(json.dumps(data))
+
+
+def make_message() -> UpdateGameInListMessage:
+    game = GameSummarySchema(
+        id=uuid.uuid4(),
+        state=GameStateEnum.created,
+        board_size=15,
+        classic_mode=False,
+        with_myself=False,
+        created_at=datetime.now(),
+        player_1=LobbyPlayerSchema(name='first_player', ready=True),
+    )
+    return UpdateGameInListMessage(game=game)
+
+
+async def sequential_broadcast(manager: ConnectionManager, message: UpdateGameInListMessage) -> None:
+    """ Прежняя рассылка: по одному получателю, кодирование на каждого """
+    for conn in manager.active_connections.all:
+        await conn.websocket.send_json(jsonable_encoder(message))
+
+
+async def bench(connections: int) -> None:
+    manager = ConnectionManager()
+    slow_every = int(1 / SLOW_SHARE)
+    for i in range(connections):
+        websocket = FakeWebSocket(delay=SLOW_DELAY if i % slow_every == 0 else 0)
+        await manager.connect(WSConnection(websocket, uuid.uuid4()))
+    message = make_message()
+
+    async def broadcast(manager: ConnectionManager, message: UpdateGameInListMessage) -> None:
+        await manager.broadcast(message)
+        await manager.flush()
+
+    variants = [('sequential', sequential_broadcast), ('broadcast', broadcast), ('enqueue', ConnectionManager.broadcast)]
+    for name, broadcast in variants:
+        best = float('inf')
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            await broadcast(manager, message)
+            best = min(best, time.perf_counter() - started)
+            await manager.flush()
+        print(f'{name:>10}, {connections:>5} connections: {best * 1000:9.1f} ms (best of {REPEATS})')
+    for connection in list(manager.active_connections.all):
+        manager.disconnect(connection)
+
+
+async def main() -> None:
+    config.WS_SEND_TIMEOUT = 1.0
+    config.DEBUG = True
+    for connections in CONNECTIONS:
+        await bench(connections)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
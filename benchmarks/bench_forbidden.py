@@ -0,0 +1,43 @@
+"""
+Скорость проверки запрещенных ходов на позициях 15x15
+
+    python -m benchmarks.bench_forbidden
+"""
+import random
+import time
+
+from app.api.services.forbidden import find_forbidden
+
+SIZE = 15
+POSITIONS = 200
+REPEATS = 5
+
+
+def random_position(rnd: random.Random, stones: int) -> tuple[bytes, list[tuple[int, int]]]:
+    """ Случайная позиция с ``stones`` камнями и список свободных клеток """
+    cells = [(x, y) for x in range(1, SIZE + 1) for y in range(1, SIZE + 1)]
+    rnd.shuffle(cells)
+    values = bytearray(SIZE ** 2)
+    for i, (x, y) in enumerate(cells[:stones]):
+        values[(y - 1) * SIZE + x - 1] = i % 2 + 1
+    return bytes(values), cells[stones:]
+
+
+def main() -> None:
+    rnd = random.Random(0)
+    checks = []
+    for _ in range(POSITIONS):
+        values, free_cells = random_position(rnd, stones=rnd.randint(10, 120))
+        checks.extend((values, x, y) for x, y in free_cells[:20])
+
+    best = float('inf')
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for values, x, y in checks:
+            find_forbidden(values, SIZE, x, y)
+        best = min(best, time.perf_counter() - started)
+    print(f'find_forbidden, {SIZE}x{SIZE}: {len(checks) / best:,.0f} checks/s ({len(checks)} checks, best of {REPEATS})')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 #!/bin/sh
 
-alembic revision --autogenerate
 alembic upgrade head
 
-exec "$@"
\ No newline at end of file
+exec "$@"
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 import uvicorn
@@ -7,6 +8,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.routes import routes
 from app.api.services.game_modes import bulk_create_game_modes
+from app.api.services.bot import shutdown_executor
+from app.api.services.forbidden import get_patterns
+from app.api.services.live import live_games
+from app.api.services.lobby import lobby_index
+from app.api.services.archive import run_archive_job
+from app.core.ws.base import WebSocketActions
 from app.auth.services import UserService
 from app.core.db.deps import get_async_session
 from app.core.exceptions import UserAlreadyExists
@@ -48,11 +55,64 @@ async def create_superuser():
             print(f'User {user_schema.name} already exists.')
 
 
+@app.on_event('startup')
+async def create_bot_user():
+    async with get_async_session_context() as db:
+        bot = await UserService(db).get_bot_user()
+        print(f'Bot user: {bot.name}.')
+
+
 @app.on_event('startup')
 async def create_game_modes():
     async with get_async_session_context() as db:
         await bulk_create_game_modes(db)
 
 
+@app.on_event('startup')
+def build_forbidden_patterns():
+    # таблица запрещенных ходов строится до приема соединений, а не на первом ходе под блокировкой игры
+    get_patterns()
+
+
+@app.on_event('startup')
+async def build_lobby_index():
+    # список игр лобби отдается из памяти и дальше обновляется событиями игр
+    async with get_async_session_context() as db:
+        await lobby_index.rebuild(db)
+
+
+@app.on_event('startup')
+async def start_ws_broker():
+    # подключение брокера рассылок вебсокетов (см. broker.py)
+    await WebSocketActions.manager.start()
+
+
+@app.on_event('startup')
+async def start_archive_job():
+    # ходы завершенных игр периодически упаковываются в архив (см. archive.py)
+    app.state.archive_job = asyncio.create_task(run_archive_job())
+
+
+@app.on_event('shutdown')
+def stop_archive_job():
+    app.state.archive_job.cancel()
+
+
+@app.on_event('shutdown')
+async def stop_ws_broker():
+    await WebSocketActions.manager.close()
+
+
+@app.on_event('shutdown')
+def stop_bot_workers():
+    shutdown_executor()
+
+
+@app.on_event('shutdown')
+async def flush_live_games():
+    # дописать в БД ходы, сделанные в памяти
+    await live_games.close()
+
+
 if __name__ == '__main__':
     uvicorn.run('main:app', host=config.APP_HOST, port=config.APP_PORT)
@@ -33,8 +33,7 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
-DB_URL = f'postgresql+asyncpg://{app_config.POSTGRES_USER}:{app_config.POSTGRES_PASSWORD}@db:' \
-         f'{app_config.POSTGRES_PORT}/{app_config.POSTGRES_DB}'
+DB_URL = app_config.database_url()
 
 
 def run_migrations_offline() -> None:
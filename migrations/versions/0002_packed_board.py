@@ -0,0 +1,86 @@
+"""packed binary board
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:10:00.000000
+
+Колонка game.board: строка "ddd.ddd.ddd" -> bytea в упакованном формате (app/core/codec.py).
+Упаковка продублирована здесь, чтобы миграция не зависела от дальнейших изменений кода приложения.
+"""
+import struct
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+HEADER = struct.Struct('>BH')
+
+game = sa.table(
+    'game',
+    sa.column('id'),
+    sa.column('board', sa.String),
+    sa.column('board_packed', sa.LargeBinary),
+)
+move = sa.table('move', sa.column('game_id'))
+
+
+def pack(string: str, move_count: int) -> bytes:
+    rows = string.split('.')
+    values = [int(value) for value in ''.join(rows)]
+    values += [0] * (-len(values) % 4)
+    body = bytes(
+        values[i] << 6 | values[i + 1] << 4 | values[i + 2] << 2 | values[i + 3]
+        for i in range(0, len(values), 4)
+    )
+    return HEADER.pack(len(rows), move_count) + body
+
+
+def unpack(data: bytes) -> str:
+    size, _ = HEADER.unpack_from(data)
+    values = []
+    for byte in data[HEADER.size:]:
+        values.extend((byte >> 6 & 3, byte >> 4 & 3, byte >> 2 & 3, byte & 3))
+    return '.'.join(''.join(str(value) for value in values[y * size:(y + 1) * size]) for y in range(size))
+
+
+def upgrade() -> None:
+    op.add_column('game', sa.Column('board_packed', sa.LargeBinary(), nullable=True))
+    conn = op.get_bind()
+    move_counts = dict(conn.execute(
+        sa.select(move.c.game_id, sa.func.count()).group_by(move.c.game_id)
+    ).all())
+    for game_id, board in conn.execute(sa.select(game.c.id, game.c.board).where(game.c.board.isnot(None))):
+        conn.execute(
+            game.update()
+            .where(game.c.id == game_id)
+            .values(board_packed=pack(board, move_counts.get(game_id, 0)))
+        )
+    op.drop_column('game', 'board')
+    op.alter_column('game', 'board_packed', new_column_name='board')
+
+
+def downgrade() -> None:
+    op.add_column('game', sa.Column('board_string', sa.String(), nullable=True))
+    conn = op.get_bind()
+    game_packed = sa.table(
+        'game',
+        sa.column('id'),
+        sa.column('board', sa.LargeBinary),
+        sa.column('board_string', sa.String),
+    )
+    for game_id, board in conn.execute(
+            sa.select(game_packed.c.id, game_packed.c.board).where(game_packed.c.board.isnot(None))
+    ):
+        conn.execute(
+            game_packed.update()
+            .where(game_packed.c.id == game_id)
+            .values(board_string=unpack(board))
+        )
+    op.drop_column('game', 'board')
+    op.alter_column('game', 'board_string', new_column_name='board')
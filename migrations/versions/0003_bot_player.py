@@ -0,0 +1,29 @@
+"""bot player
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+Флаги компьютерного соперника: user.is_bot, game.with_bot, gamemode.with_bot.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('is_bot', sa.Boolean(), server_default=sa.false(), nullable=True))
+    op.add_column('game', sa.Column('with_bot', sa.Boolean(), server_default=sa.false(), nullable=True))
+    op.add_column('gamemode', sa.Column('with_bot', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('gamemode', 'with_bot')
+    op.drop_column('game', 'with_bot')
+    op.drop_column('user', 'is_bot')
@@ -0,0 +1,30 @@
+"""game move count
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:00:00.000000
+
+Счетчик сделанных ходов game.move_count (= число камней на доске), заполняется по таблице move.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('game', sa.Column('move_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        'UPDATE game SET move_count = counts.num FROM '
+        '(SELECT game_id, count(*) AS num FROM move GROUP BY game_id) AS counts '
+        'WHERE counts.game_id = game.id'
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('game', 'move_count')
@@ -0,0 +1,38 @@
+"""playerrole finished flag
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:00:00.000000
+
+Флаг playerrole.finished (результат проставлен либо игра завершена) и частичный индекс по player_id
+для незавершенных участий: проверка активных игр юзера не зависит от размера его истории.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('playerrole', sa.Column('finished', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute(
+        'UPDATE playerrole SET finished = true '
+        'WHERE result_id IN (SELECT id FROM playerresult WHERE result IS NOT NULL) '
+        "OR game_id IN (SELECT id FROM game WHERE state = 'finished')"
+    )
+    op.create_index(
+        'ix_playerrole_player_id_unfinished',
+        'playerrole',
+        ['player_id'],
+        postgresql_where=sa.text('NOT finished'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playerrole_player_id_unfinished', table_name='playerrole')
+    op.drop_column('playerrole', 'finished')
@@ -0,0 +1,30 @@
+"""game history index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+
+Составной индекс (finished_at, id) по завершенным играм - для постраничной (по ключу) истории игр юзера.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_game_finished_at_id',
+        'game',
+        ['finished_at', 'id'],
+        postgresql_where=sa.text("state = 'finished'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_finished_at_id', table_name='game')
@@ -0,0 +1,40 @@
+"""index pack for hot queries
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:00:00.000000
+
+Индексы под частые запросы:
+- частичный индекс списка игр в лобби (условие - как в GameService.get_lobby_summaries);
+- ходы игры: move(game_id, id);
+- игроки игр: playerrole(game_id, role).
+Отдельный индекс playerrole(player_id) не нужен: player_id - первый столбец первичного ключа.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_game_lobby',
+        'game',
+        ['created_at'],
+        postgresql_where=sa.text(
+            "state IN ('created', 'pending') AND NOT with_myself AND NOT with_bot AND NOT is_private"
+        ),
+    )
+    op.create_index('ix_move_game_id_id', 'move', ['game_id', 'id'])
+    op.create_index('ix_playerrole_game_id_role', 'playerrole', ['game_id', 'role'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playerrole_game_id_role', table_name='playerrole')
+    op.drop_index('ix_move_game_id_id', table_name='move')
+    op.drop_index('ix_game_lobby', table_name='game')
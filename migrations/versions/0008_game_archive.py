@@ -0,0 +1,89 @@
+"""game archive
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00.000000
+
+Архив завершенных игр: ходы игры одной упакованной колонкой (см. app/core/codec.py).
+Архивация (app/api/services/archive.py) удаляет строки move игры и обнуляет ее доску.
+Откат возвращает архивированным играм строки move и доску; распаковка продублирована здесь,
+чтобы миграция не зависела от дальнейших изменений кода приложения.
+"""
+import struct
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+HEADER = struct.Struct('>BH')
+MOVE = struct.Struct('>H')
+
+game = sa.table(
+    'game',
+    sa.column('id'),
+    sa.column('board_size', sa.Integer),
+    sa.column('board', sa.LargeBinary),
+)
+move = sa.table(
+    'move',
+    sa.column('game_id'),
+    sa.column('role', sa.Enum('1', '2', '3', '4', name='playerroleenum', create_type=False)),
+    sa.column('x', sa.SmallInteger),
+    sa.column('y', sa.SmallInteger),
+)
+game_archive = sa.table(
+    'gamearchive',
+    sa.column('game_id'),
+    sa.column('moves', sa.LargeBinary),
+)
+
+
+def unpack_moves(data: bytes) -> list[tuple[int, int, int]]:
+    return [(code >> 12, (code >> 6 & 63) + 1, (code & 63) + 1) for code, in MOVE.iter_unpack(data)]
+
+
+def pack_board(moves: list[tuple[int, int, int]], size: int) -> bytes:
+    values = [0] * size ** 2
+    for value, x, y in moves:
+        values[(y - 1) * size + x - 1] = value
+    values += [0] * (-len(values) % 4)
+    body = bytes(
+        values[i] << 6 | values[i + 1] << 4 | values[i + 2] << 2 | values[i + 3]
+        for i in range(0, len(values), 4)
+    )
+    return HEADER.pack(size, len(moves)) + body
+
+
+def upgrade() -> None:
+    op.create_table(
+        'gamearchive',
+        sa.Column('game_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('moves', sa.LargeBinary(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['game.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('game_id'),
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    archived = conn.execute(
+        sa.select(game_archive.c.game_id, game_archive.c.moves, game.c.board_size)
+        .join(game, game.c.id == game_archive.c.game_id)
+    ).all()
+    for game_id, data, board_size in archived:
+        moves = unpack_moves(data)
+        if moves:
+            # id строк move - в порядке вставки, т.е. в порядке партии
+            conn.execute(move.insert(), [
+                dict(game_id=game_id, role=str(value), x=x, y=y) for value, x, y in moves
+            ])
+        conn.execute(game.update().where(game.c.id == game_id).values(board=pack_board(moves, board_size)))
+    op.drop_table('gamearchive')
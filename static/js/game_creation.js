@@ -70,7 +70,7 @@ function addGameModeList(modes) {
         }
 
         let modeTooltip = createRulesTooltip(
-            mode.time_limit, mode.board_size, mode.classic_mode, mode.with_myself, mode.three_players, mode.dev
+            mode.time_limit, mode.board_size, mode.classic_mode, mode.with_myself, mode.three_players, mode.dev, mode.with_bot
         );
         modeTooltip.classList.add("tooltip");
 
@@ -97,7 +97,7 @@ function updateCurrentRules(rules) {
     ruleList.appendChild(boardSize);
 
     const players = document.createElement("li");
-    let num_players = rules.three_players ? 3 : 2;
+    let num_players = rules.three_players && !rules.with_bot ? 3 : 2;
     players.innerHTML = `Players: ${num_players}`
     ruleList.appendChild(players);
 
@@ -112,6 +112,12 @@ function updateCurrentRules(rules) {
         withMyself.innerHTML = "With Myself";
         ruleList.appendChild(withMyself);
     }
+
+    if (rules.with_bot) {
+        const withBot = document.createElement("li");
+        withBot.innerHTML = "Versus Computer";
+        ruleList.appendChild(withBot);
+    }
 }
 
 function addMode(event) {
@@ -68,7 +68,7 @@ function createGameBlock(game, gameItem) {
     creator.innerHTML = "by";
     let creatorName = document.createElement("div");
     if (game.player_1) {
-        creatorName.innerHTML = game.player_1.player.name;
+        creatorName.innerHTML = game.player_1.name;
     } else {
         creatorName.innerHTML = "unknown";
     }
@@ -140,7 +140,7 @@ function createGameBlock(game, gameItem) {
     let spectatorsBlock = document.createElement("div");
     let svgEye = svgEyeTemp.content.firstElementChild.cloneNode(true);
     spectatorsBlock.appendChild(svgEye);
-    spectatorsBlock.innerHTML += ` ${game.spectators.length}`;
+    spectatorsBlock.innerHTML += ` ${game.spectators_num}`;
 
     gameItem.appendChild(spectatorsBlock);
 
@@ -167,7 +167,7 @@ function addGameInList(game) {
 function createIndicatorTooltip(player) {
     let tooltip = document.createElement("div");
     tooltip.classList.add("tooltip", "tooltip-autowidth");
-    tooltip.innerHTML = player.player.name;
+    tooltip.innerHTML = player.name;
     return tooltip
 }
 
@@ -178,19 +178,19 @@ function lightUpPlayerIndicators(game, indicatorBlock) {
     }
     if (game.player_1) {
         indicatorBlock.children[0].classList.remove("indicator-empty");
-        let cls = game.player_1.result.result == 2 ? "indicator-red" : "indicator-green";
+        let cls = game.player_1.result == 2 ? "indicator-red" : "indicator-green";
         indicatorBlock.children[0].classList.add(cls);
         indicatorBlock.children[0].appendChild(createIndicatorTooltip(game.player_1));
     }
     if (game.player_2) {
         indicatorBlock.children[1].classList.remove("indicator-empty");
-        let cls = game.player_2.result.result == 2 ? "indicator-red" : "indicator-green";
+        let cls = game.player_2.result == 2 ? "indicator-red" : "indicator-green";
         indicatorBlock.children[1].classList.add(cls);
         indicatorBlock.children[1].appendChild(createIndicatorTooltip(game.player_2));
     }
     if (game.player_3) {
         indicatorBlock.children[2].classList.remove("indicator-empty");
-        let cls = game.player_3.result.result == 2 ? "indicator-red" : "indicator-green";
+        let cls = game.player_3.result == 2 ? "indicator-red" : "indicator-green";
         indicatorBlock.children[2].classList.add(cls);
         indicatorBlock.children[2].appendChild(createIndicatorTooltip(game.player_3));
     }
@@ -179,7 +179,7 @@ function screenMainLoggedHide() {
     screenMainLogged.style.display = "none"
 }
 
-function createRulesTooltip(time_limit, board_size, classic_mode, with_myself, three_players, dev) {
+function createRulesTooltip(time_limit, board_size, classic_mode, with_myself, three_players, dev, with_bot) {
     const tooltip = document.createElement("div");
 
     if (time_limit != null) {
@@ -212,6 +212,11 @@ function createRulesTooltip(time_limit, board_size, classic_mode, with_myself, t
         p.innerHTML = "3 players";
         tooltip.appendChild(p);
     }
+    if (with_bot) {
+        let p = document.createElement("p");
+        p.innerHTML = "Versus computer";
+        tooltip.appendChild(p);
+    }
     if (dev) {
         let p = document.createElement("p");
         p.innerHTML = "[IN DEVELOPMENT]";
@@ -11,13 +11,15 @@ from app.config import config
 from app.core.db.base import Base
 from app.api.services.game_modes import bulk_create_game_modes
 from app.api.services.games import GameService
+from app.api.services.live import LiveGameStore, LiveMoveResult
+from app.models.game import Game
+from app.models.user import User
 from app.auth.services import UserService
-from app.schemas.game import GameModeInGameSchema
+from app.schemas.game import GameModeInGameSchema, GameCreateSchema, MoveInputSchema
 from app.schemas.user import UserCreateProgrammatically
 from main import app
 
-DB_URL = f'postgresql+asyncpg://{config.POSTGRES_USER}:{config.POSTGRES_PASSWORD}@db:' \
-         f'{config.POSTGRES_PORT}/{config.POSTGRES_DB}_tests'
+DB_URL = config.database_url(f'{config.POSTGRES_DB}_tests')
 engine = create_async_engine(DB_URL, future=True)
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -87,3 +89,39 @@ async def test_user(async_session):
         is_superuser=False,
     )
     return await UserService(async_session).create_user(user_schema)
+
+
+@pytest_asyncio.fixture(scope='function')
+async def second_user(async_session) -> User:
+    user_schema = UserCreateProgrammatically(
+        name='second_player',
+        email='second_player@example.com',
+        password=config.TEST_USER_PASSWORD,
+        is_active=True,
+        is_verified=True,
+    )
+    return await UserService(async_session).create_user(user_schema)
+
+
+@pytest_asyncio.fixture(scope='function')
+async def started_game(async_session, modes_no: list[GameModeInGameSchema], test_user: User, second_user: User) -> Game:
+    """ Начатая игра 1 на 1 с настройками по умолчанию: ходит test_user """
+    game_service = GameService(async_session)
+    game = (await game_service.create_game(creator=test_user, game_data=GameCreateSchema(modes=modes_no))).game
+    await game_service.join_game(player=second_user, game_id=game.id)
+    await game_service.set_player_ready(player=test_user, game_id=game.id)
+    game = (await game_service.set_player_ready(player=second_user, game_id=game.id)).game
+    return await game_service.attempt_to_start_game(game)
+
+
+async def play_moves(game: Game, moves: list[tuple[User, int, int]]) -> LiveMoveResult:
+    """
+    Ходы (игрок, x, y) через состояние игры в памяти, как в приложении; возвращается после их записи в БД.
+    Фоновая запись - задача asyncio: тестам нужен ``anyio_backend`` asyncio
+    """
+    store = LiveGameStore(session_maker=async_session_maker)
+    store.load(game)
+    for user, x, y in moves:
+        result = await store.move(user_id=user.id, cell=MoveInputSchema(x=x, y=y), game_id=game.id)
+    await store.close()
+    return result
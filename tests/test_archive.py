@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.game import GameSchemaOut, GameHistorySchema
+from app.models.game import Game, GameArchive, Move
+from app.models.user import User
+from app.enums.game import PlayerRoleEnum
+from app.api.services.games import GameService
+from app.api.services.archive import ArchiveService
+from tests.fixtures.fixture_db import async_session_maker, play_moves
+
+
+class TestGameArchive:
+
+    @pytest.fixture
+    def anyio_backend(self):
+        return 'asyncio'
+
+    @pytest.mark.anyio
+    async def test_archive_finished_game(
+            self,
+            async_session: AsyncSession,
+            started_game: Game,
+            test_user: User,
+            second_user: User,
+    ):
+        moves = [(user, x, y) for x in range(1, 5) for user, y in [(test_user, 1), (second_user, 2)]]
+        assert (await play_moves(started_game, moves + [(test_user, 5, 1)])).finished
+        async with async_session_maker() as db:
+            before = GameSchemaOut.from_orm(await GameService(db).get_game(started_game.id))
+            games, _ = await GameService(db).get_finished_games_page(test_user, limit=10, cursor=None)
+            history = [GameHistorySchema.from_orm(game) for game in games]
+        assert len(before.moves) == 9
+
+        service = ArchiveService(async_session)
+        assert await service.archive_finished_games(before.finished_at, limit=10) == 0, 'игра еще не старая'
+        assert await service.archive_finished_games(datetime.now() + timedelta(seconds=1), limit=10) == 1
+        assert await service.archive_finished_games(datetime.now() + timedelta(seconds=1), limit=10) == 0
+
+        assert await async_session.scalar(select(func.count()).where(Move.game_id == started_game.id)) == 0
+        archive = await async_session.get(GameArchive, started_game.id)
+        assert len(archive.moves) == 2 * 9
+
+        # чтение в новой сессии: строк move и доски нет, схема игры та же
+        async with async_session_maker() as db:
+            game_service = GameService(db)
+            game = await game_service.get_game(started_game.id)
+            assert game.board is None and game.moves == []
+            after = GameSchemaOut.from_orm(game)
+            assert after.board == before.board
+            assert [(move.role, move.x, move.y) for move in after.moves] == [
+                (move.role, move.x, move.y) for move in before.moves
+            ]
+            assert after.moves[0].role == PlayerRoleEnum.first and after.moves[-1].id == 9
+            assert after.dict(exclude={'moves'}) == before.dict(exclude={'moves'})
+            games, _ = await game_service.get_finished_games_page(test_user, limit=10, cursor=None)
+            assert [GameHistorySchema.from_orm(game) for game in games] == history
@@ -0,0 +1,227 @@
+import random
+
+import pytest
+
+from app.api.services import batch
+from app.core import codec
+from app.api.services.geometry import WIN_LENGTH, get_geometry
+from app.api.services.board import RenjuBoard
+from app.api.services.engines import BOARD_ENGINES, BoardEngine, get_board_engine
+from app.schemas.game import MoveInputSchema
+
+
+@pytest.fixture(params=list(BOARD_ENGINES))
+def engine(request) -> type[BoardEngine]:
+    return get_board_engine(request.param)
+
+
+def play_random_game(
+        rnd: random.Random,
+        engine: type[BoardEngine],
+        size: int,
+        num_players: int,
+) -> tuple[BoardEngine, MoveInputSchema | None]:
+    """
+    Случайная партия до первой победы по полной проверке доски либо до заполнения доски
+
+    :return: итоговая доска и последний сделанный ход
+    """
+    board = engine.default(size=size)
+    free_cells = [(x, y) for x in range(1, size + 1) for y in range(1, size + 1)]
+    rnd.shuffle(free_cells)
+    last_move = None
+    for i, (x, y) in enumerate(free_cells):
+        last_move = MoveInputSchema(x=x, y=y, value=i % num_players + 1)
+        board.move(last_move)
+        if board.check_victory():
+            break
+    return board, last_move
+
+
+class TestRenjuBoard:
+
+    @pytest.mark.parametrize('size', [11, 15, 30])
+    @pytest.mark.parametrize('num_players', [2, 3])
+    def test_check_victory_at_matches_full_scan(self, engine: type[BoardEngine], size: int, num_players: int):
+        rnd = random.Random(size * 10 + num_players)
+        for _ in range(10):
+            board, last_move = play_random_game(rnd, engine, size, num_players)
+            full_scan = board.check_victory()
+            incremental = board.check_victory_at(last_move.x, last_move.y)
+            assert incremental == full_scan, 'проверка по последнему ходу разошлась с полной проверкой доски'
+            if full_scan:
+                assert all(cell.value == last_move.value for cell in full_scan), 'в победный ряд попал чужой камень'
+
+    def test_check_victory_at_empty_cell(self, engine: type[BoardEngine]):
+        board = engine.default(size=15)
+        assert board.check_victory_at(1, 1) == []
+
+    @pytest.mark.parametrize('row, expected_xs', [
+        ('211111000000000', [2, 3, 4, 5, 6]),
+        ('011111100000000', [2, 3, 4, 5, 6]),
+        ('011112111100000', []),
+    ])
+    def test_check_line_winner(self, engine: type[BoardEngine], row: str, expected_xs: list[int]):
+        board = engine.from_string('.'.join([row] + ['0' * 15] * 14))
+        winning_cells = board.check_victory()
+        assert [cell.coord.x for cell in winning_cells] == expected_xs
+        assert all(cell.value == 1 for cell in winning_cells)
+        if expected_xs:
+            assert board.check_victory_at(expected_xs[-1], 1) == winning_cells
+
+    def test_string_roundtrip(self, engine: type[BoardEngine]):
+        board, _ = play_random_game(random.Random(0), engine, 15, 3)
+        assert engine.from_string(board.as_string).as_string == board.as_string
+        assert engine.default(size=11).as_string == RenjuBoard.default(size=11).as_string
+        assert engine.default(2, size=11).as_array == RenjuBoard.default(2, size=11).as_array
+
+    def test_check_free_space(self, engine: type[BoardEngine]):
+        board = engine.from_string('.'.join(['1' * 11] * 10 + ['1' * 10 + '0']))
+        assert board.check_free_space()
+        board.move(MoveInputSchema(x=11, y=11, value=2))
+        assert not board.check_free_space()
+
+    def test_move_out_of_board(self, engine: type[BoardEngine]):
+        board = engine.default(size=11)
+        for x, y in [(0, 1), (1, 12), (12, 12)]:
+            with pytest.raises(IndexError):
+                board.move(MoveInputSchema(x=x, y=y, value=1))
+        assert board.as_values == bytes(11 ** 2)
+
+    def test_flat_storage(self):
+        board = RenjuBoard.from_string('.'.join(['0' * 11] * 10 + ['1' * 11]))
+        assert isinstance(board.values, bytearray) and len(board.values) == 11 ** 2
+        assert not hasattr(board, '__dict__') and not hasattr(board[0][0], '__dict__')
+        # клетки - снимки значений, созданные по запросу
+        assert [cell.coord for cell in board[-1]] == [(x, 11) for x in range(1, 12)]
+        assert [len(row) for row in board] == [11] * 11
+        assert board.check_victory()[0].coord == (1, 11)
+
+    def test_stone_count(self, engine: type[BoardEngine]):
+        board, _ = play_random_game(random.Random(1), engine, 11, 2)
+        stones = sum(value != 0 for value in board.as_values)
+        assert board.stone_count == stones
+        assert engine.from_string(board.as_string).stone_count == stones
+        assert engine.from_values(board.as_values, 11).stone_count == stones
+        assert engine.default(size=11).stone_count == 0
+        assert engine.default(3, size=11).stone_count == 11 ** 2
+
+    @pytest.mark.parametrize('size', [11, 15, 40])
+    def test_engines_agree(self, size: int):
+        """ Любая позиция дает одинаковые результаты на всех движках доски """
+        rnd = random.Random(size)
+        for _ in range(20):
+            density = rnd.random()
+            string = '.'.join(
+                ''.join(str(rnd.randint(1, 3)) if rnd.random() < density else '0' for _ in range(size))
+                for _ in range(size)
+            )
+            boards = [engine.from_string(string) for engine in BOARD_ENGINES.values()]
+            assert len({board.as_string for board in boards}) == 1
+            results = [board.check_victory() for board in boards]
+            assert all(result == results[0] for result in results)
+            assert len({board.check_free_space() for board in boards}) == 1
+
+
+class TestBatchEvaluator:
+
+    @pytest.mark.parametrize('size', [11, 15, 30])
+    def test_matches_renju_board(self, size: int):
+        rnd = random.Random(size)
+        strings = []
+        for _ in range(50):
+            density = rnd.random()
+            strings.append('.'.join(
+                ''.join(str(rnd.randint(1, 3)) if rnd.random() < density else '0' for _ in range(size))
+                for _ in range(size)
+            ))
+        boards = batch.boards_from_strings(strings)
+        assert boards.shape == (len(strings), size, size)
+        assert batch.boards_to_strings(boards) == strings
+
+        result = batch.evaluate_boards(boards)
+        for i, string in enumerate(strings):
+            board = RenjuBoard.from_string(string)
+            winning_cells = board.check_victory()
+            expected_winner = winning_cells[0].value if winning_cells else 0
+            assert result.winners[i] == expected_winner
+            assert result.draws[i] == (not winning_cells and not board.check_free_space())
+            if winning_cells:
+                assert [tuple(coord) for coord in result.winning_cells[i]] == [cell.coord for cell in winning_cells]
+
+    def test_draw(self):
+        # заполненная доска без 5 в ряд: ни по одной линии больше 2 одинаковых камней подряд
+        size = 12
+        string = '.'.join(''.join(str(1 + (x // 2 + y) % 2) for x in range(size)) for y in range(size))
+        result = batch.evaluate_boards(batch.boards_from_strings([string, '0' * size + string[size:]]))
+        assert list(result.winners) == [0, 0]
+        assert list(result.draws) == [True, False]
+
+
+class TestBoardCodec:
+
+    @pytest.mark.parametrize('size', [11, 15, 30, 40])
+    def test_roundtrip(self, engine: type[BoardEngine], size: int):
+        board, _ = play_random_game(random.Random(size), engine, size, 3)
+        data = codec.encode_board(board, move_count=42)
+        assert len(data) == codec.HEADER.size + -(-size ** 2 // 4)
+        decoded, move_count = codec.decode_board(data, engine)
+        assert move_count == 42
+        assert decoded.as_string == board.as_string
+        assert codec.unpack_array(data) == board.as_array
+
+    def test_corrupted(self):
+        data = codec.encode_board(RenjuBoard.default(size=15))
+        with pytest.raises(ValueError):
+            codec.unpack(data[:-1])
+
+    def test_moves_roundtrip(self):
+        rnd = random.Random(0)
+        moves = [(i % 3 + 1, rnd.randint(1, 40), rnd.randint(1, 40)) for i in range(500)]
+        data = codec.pack_moves(moves)
+        assert len(data) == 2 * len(moves)
+        assert codec.unpack_moves(data) == moves
+        with pytest.raises(ValueError):
+            codec.unpack_moves(data[:-1])
+        with pytest.raises(ValueError):
+            codec.pack_moves([(4, 1, 1)])
+
+    def test_board_from_moves(self, engine: type[BoardEngine]):
+        board = engine.default(size=15)
+        moves = [(1, 8, 8), (2, 9, 8), (1, 1, 15)]
+        for value, x, y in moves:
+            board.move(MoveInputSchema(x=x, y=y, value=value))
+        assert codec.board_from_moves(moves, 15) == codec.encode_board(board, move_count=3)
+
+
+class TestLineGeometry:
+
+    @staticmethod
+    def reference_diagonals(board: RenjuBoard) -> list[list[int]]:
+        """ Диагонали в том виде, в каком их строил RenjuBoard до появления общих таблиц """
+        primary, secondary = [], []
+        for offset in range(1 - len(board), len(board)):
+            primary.append([row[offset - i - 1].value for i, row in enumerate(board) if -len(row) < offset - i <= 0])
+            secondary.append([row[i + offset].value for i, row in enumerate(board) if 0 <= i + offset < len(row)])
+        return primary + secondary
+
+    @pytest.mark.parametrize('size', [11, 15, 40])
+    def test_lines(self, size: int):
+        rnd = random.Random(size)
+        board = RenjuBoard.from_values(bytes(rnd.randint(0, 3) for _ in range(size ** 2)), size)
+        assert [[cell.value for cell in line] for line in board.diagonals] == self.reference_diagonals(board)
+        assert [[cell.value for cell in line] for line in board.columns] == [list(col) for col in zip(*board.as_array)]
+
+    @pytest.mark.parametrize('size', [11, 40])
+    def test_windows(self, size: int):
+        geometry = get_geometry(size)
+        assert get_geometry(size) is geometry, 'таблицы должны строиться один раз на размер доски'
+        for cell, cell_windows in enumerate(geometry.windows):
+            assert len(cell_windows) == 4
+            for (line, position), direction_windows in zip(geometry.cell_lines[cell], cell_windows):
+                assert line[position] == cell
+                assert 1 <= len(direction_windows) <= WIN_LENGTH or len(line) < WIN_LENGTH
+                for window in direction_windows:
+                    assert cell in window and len(window) == WIN_LENGTH
+                    start = line.index(window[0])
+                    assert line[start:start + WIN_LENGTH] == window
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import config
+from app.core import exceptions
+from app.auth.services import UserService
+from app.schemas.user import UserCreate, UserCreateProgrammatically
+from app.schemas.game import GameModeInGameSchema, GameCreateSchema, GameSchemaOut, MoveInputSchema
+from app.models.user import User
+from app.enums.game import PlayerRoleEnum, GameStateEnum
+from app.api.services import bot
+from app.api.services.bot import Searcher, search
+from app.api.services.games import GameService
+from app.api.services.live import LiveGameStore
+from tests.fixtures.fixture_db import async_session_maker
+
+SIZE = 15
+
+
+def make_values(first: list[tuple[int, int]], second: list[tuple[int, int]] = ()) -> bytes:
+    values = bytearray(SIZE ** 2)
+    for value, stones in [(1, first), (2, second)]:
+        for x, y in stones:
+            values[(y - 1) * SIZE + x - 1] = value
+    return bytes(values)
+
+
+class TestBotSearch:
+
+    def test_empty_board(self):
+        assert search(bytes(SIZE ** 2), SIZE, player=1, time_limit=0.1) == (8, 8)
+
+    def test_completes_five(self):
+        values = make_values(first=[(1, 1), (1, 3), (3, 1), (14, 14)], second=[(5, 7), (6, 7), (7, 7), (8, 7)])
+        assert search(values, SIZE, player=2, time_limit=1) in [(4, 7), (9, 7)]
+
+    def test_blocks_four(self):
+        # у соперника закрытая с одного конца четверка - закрыть второй конец
+        values = make_values(first=[(4, 4), (5, 5), (6, 6), (7, 7)], second=[(3, 3), (10, 2)])
+        assert search(values, SIZE, player=2, time_limit=1) == (8, 8)
+
+    def test_blocks_open_three(self):
+        values = make_values(first=[(6, 8), (7, 8), (8, 8)], second=[(7, 7)])
+        assert search(values, SIZE, player=2, time_limit=1) in [(5, 8), (9, 8), (4, 8), (10, 8)]
+
+    def test_move_is_legal(self):
+        rnd = random.Random(0)
+        values = bytearray(SIZE ** 2)
+        for i, cell in enumerate(rnd.sample(range(SIZE ** 2), 40)):
+            values[cell] = i % 2 + 1
+        x, y = search(bytes(values), SIZE, player=1, time_limit=0.3)
+        assert values[(y - 1) * SIZE + x - 1] == 0
+
+    def test_place_undo_restores_position(self):
+        values = make_values(first=[(6, 8), (7, 8), (8, 8)], second=[(7, 7), (8, 9)])
+        searcher = Searcher(values, SIZE)
+        state = (bytes(searcher.values), searcher.score, searcher.hash, list(searcher.near))
+        searcher.best_move(player=2, time_limit=0.3, max_depth=3)
+        assert (bytes(searcher.values), searcher.score, searcher.hash, list(searcher.near)) == state
+
+
+class TestBotUser:
+
+    @pytest.mark.anyio
+    async def test_reserved_name(self, async_session: AsyncSession):
+        user_service = UserService(async_session)
+        for name, email in [(config.BOT_USERNAME.upper(), 'user@example.com'), ('user', config.BOT_EMAIL)]:
+            with pytest.raises(exceptions.UserAlreadyExists):
+                await user_service.create_user(UserCreate(name=name, email=email, password='Sup3r-secret-pass'))
+        bot = await user_service.get_bot_user()
+        assert bot.is_bot and bot.name == config.BOT_USERNAME
+        assert (await user_service.get_bot_user()).id == bot.id
+
+    @pytest.mark.anyio
+    async def test_name_taken_before_reservation(self, async_session: AsyncSession):
+        user_service = UserService(async_session)
+        user = await user_service.create_user(UserCreateProgrammatically(
+            name=config.BOT_USERNAME, email=config.BOT_EMAIL, password='Sup3r-secret-pass', is_bot=True,
+        ))
+        user.is_bot = False
+        await async_session.commit()
+
+        bot = await user_service.get_bot_user()
+        assert bot.is_bot and bot.id != user.id
+        assert bot.name.startswith(config.BOT_USERNAME) and bot.name != user.name and bot.email != user.email
+
+
+class TestBotGame:
+
+    @pytest.fixture
+    def anyio_backend(self):
+        # ход бота считается в ProcessPoolExecutor через event loop asyncio
+        return 'asyncio'
+
+    @pytest.mark.anyio
+    async def test_bot_seat(
+            self,
+            async_session: AsyncSession,
+            modes: list[GameModeInGameSchema],
+            test_user: User,
+            monkeypatch,
+    ):
+        monkeypatch.setattr(config, 'BOT_MOVE_TIME_LIMIT', 0.2)
+        game_service = GameService(async_session)
+        game_data = GameCreateSchema(modes=[mode for mode in modes if mode.name == 'Versus Computer'])
+        game = (await game_service.create_game(creator=test_user, game_data=game_data)).game
+        assert game.with_bot
+        bot_pr = next(pr for pr in game.players if pr.role == PlayerRoleEnum.second)
+        assert bot_pr.player.is_bot and bot_pr.ready
+        assert not await game_service.get_lobby_summaries(), 'игра с ботом не должна попадать в список игр'
+
+        await game_service.set_player_ready(player=test_user, game_id=game.id)
+        game = await game_service.attempt_to_start_game(game)
+        assert game.state == GameStateEnum.pending
+
+        store = LiveGameStore(session_maker=async_session_maker)
+        assert store.load(game).players[1].is_bot
+        assert await store.bot_move(game.id) is None, 'первым ходит не бот'
+        await store.move(user_id=test_user.id, cell=MoveInputSchema(x=8, y=8), game_id=game.id)
+        try:
+            result = await store.bot_move(game.id)
+        finally:
+            bot.shutdown_executor()
+        assert result.move.role == PlayerRoleEnum.second
+        assert (result.move.x, result.move.y) != (8, 8)
+        assert result.game.current_player.user_id == test_user.id, 'после хода бота очередь возвращается игроку'
+
+        await store.close()
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(game.id)
+        human_pr = next(pr for pr in game.players if pr.role == PlayerRoleEnum.first)
+        assert human_pr.can_move
+        assert game.move_count == 2
+        assert GameSchemaOut.from_orm(game).move_count == 2
@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.db.pool import InstrumentedQueuePool
+from tests.fixtures.fixture_db import DB_URL
+
+
+class TestInstrumentedPool:
+
+    @pytest.mark.anyio
+    async def test_stats(self):
+        engine = create_async_engine(DB_URL, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1,
+                                     pool_timeout=0.2)
+        pool = engine.pool
+        try:
+            async with engine.connect() as first:
+                await first.execute(text('SELECT 1'))
+                async with engine.connect() as second:
+                    await second.execute(text('SELECT 1'))
+                    stats = pool.snapshot()
+                    assert (stats['checked_out'], stats['overflow'], stats['overflows']) == (2, 1, 1)
+                    with pytest.raises(exc.TimeoutError):
+                        async with engine.connect() as third:
+                            await third.execute(text('SELECT 1'))
+            stats = pool.snapshot()
+            assert stats['checked_out'] == 0 and stats['checked_in'] == 1
+            assert stats['checkouts'] == 2 and stats['timeouts'] == 1
+            assert stats['wait_max'] <= stats['wait_total'] < 0.2, 'таймаут в ожидание выданных не входит'
+        finally:
+            await engine.dispose()
@@ -0,0 +1,51 @@
+import pytest
+
+from app.api.services.forbidden import find_forbidden
+from app.enums.game import ForbiddenMoveEnum
+
+SIZE = 15
+
+
+def make_values(black: list[tuple[int, int]], white: list[tuple[int, int]] = ()) -> bytes:
+    values = bytearray(SIZE ** 2)
+    for value, stones in [(1, black), (2, white)]:
+        for x, y in stones:
+            values[(y - 1) * SIZE + x - 1] = value
+    return bytes(values)
+
+
+class TestForbiddenMoves:
+
+    @pytest.mark.parametrize('black, white, expected', [
+        # две открытые тройки: горизонталь и вертикаль
+        ([(6, 8), (7, 8), (8, 6), (8, 7)], [], ForbiddenMoveEnum.double_three),
+        # тройка с разрывом тоже открытая
+        ([(5, 8), (7, 8), (8, 6), (8, 7)], [], ForbiddenMoveEnum.double_three),
+        # закрытая с одной стороны тройка не считается
+        ([(6, 8), (7, 8), (8, 6), (8, 7)], [(5, 8)], None),
+        # две четверки по разным линиям
+        ([(5, 8), (6, 8), (7, 8), (8, 5), (8, 6), (8, 7)], [], ForbiddenMoveEnum.double_four),
+        # две четверки в одной линии: X.XXX.X
+        ([(4, 8), (6, 8), (7, 8), (10, 8)], [], ForbiddenMoveEnum.double_four),
+        # четверка + тройка разрешены
+        ([(5, 8), (6, 8), (7, 8), (8, 6), (8, 7)], [], None),
+        # длинный ряд
+        ([(3, 8), (4, 8), (5, 8), (6, 8), (7, 8)], [], ForbiddenMoveEnum.overline),
+        ([(2, 8), (3, 8), (4, 8), (6, 8), (7, 8)], [], ForbiddenMoveEnum.overline),
+        # белые камни длинный ряд не продолжают
+        ([(3, 8), (4, 8), (5, 8), (6, 8), (7, 8)], [(9, 8)], ForbiddenMoveEnum.overline),
+        ([(4, 8), (5, 8), (6, 8), (7, 8)], [(3, 8), (9, 8)], None),
+        # ровно пять побеждают даже при двойной тройке
+        ([(4, 8), (5, 8), (6, 8), (7, 8), (8, 6), (8, 7), (9, 9), (10, 10)], [], None),
+        # одиночная тройка
+        ([(6, 8), (7, 8)], [], None),
+    ])
+    def test_find_forbidden(self, black, white, expected):
+        x, y = (5, 8) if (2, 8) in black else (8, 8)
+        assert find_forbidden(make_values(black, white), SIZE, x, y) == expected
+
+    def test_board_edge_blocks(self):
+        # тройка, упертая в край доски, не открытая
+        black = [(1, 8), (2, 8), (3, 4), (3, 5)]
+        assert find_forbidden(make_values(black), SIZE, 3, 8) is None
+        assert find_forbidden(make_values(black), SIZE, 3, 6) is None
@@ -1,10 +1,29 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+
 import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.game import GameModeInGameSchema, GameCreateSchema
+from app.schemas.game import (
+    GameModeInGameSchema, GameCreateSchema, GameSchemaOut, GameSummarySchema, GameHistoryPage,
+    MoveInputSchema,
+)
+from app.core import exceptions
+from app.models.game import Game, PlayerRole, PlayerResult
 from app.models.user import User
-from app.enums.game import PlayerRoleEnum
+from app.enums.game import PlayerRoleEnum, GameStateEnum, PlayerResultEnum
+from app.api.services import loaders
+from app.api.services.board import RenjuBoard
+from app.core.codec import encode_board
 from app.api.services.games import GameService
+from app.api.services.live import LiveGameStore
+from app.api.services.lobby import LobbyIndex
+from tests.fixtures.fixture_db import engine, async_session_maker, play_moves
 
 
 class TestGameService:
@@ -30,17 +49,235 @@ class TestGameService:
     async def test_game_list(
             self,
             async_session: AsyncSession,
+            modes: list[GameModeInGameSchema],
             modes_public: list[GameModeInGameSchema],
             modes_private: list[GameModeInGameSchema],
             test_user: User,
     ):
-        for game_data in [
-            GameCreateSchema(modes=modes_public),
-            GameCreateSchema(modes=modes_private),
-            GameCreateSchema(is_private=True, modes=modes_public),
-        ]:
-            await GameService(async_session).create_game(creator=test_user, game_data=game_data)
-
-        games = await GameService(async_session).get_available_games()
-        assert len(games) == 1, 'в список доступных попала приватная игра'
-        assert games[0].num_players == 3
+        game_service = GameService(async_session)
+        public, dev, private, with_bot = [
+            (await game_service.create_game(creator=test_user, game_data=game_data)).game
+            for game_data in [
+                GameCreateSchema(modes=modes_public),
+                GameCreateSchema(modes=modes_private),
+                GameCreateSchema(is_private=True, modes=modes_public),
+                GameCreateSchema(modes=[mode for mode in modes if mode.name == 'Versus Computer']),
+            ]
+        ]
+
+        summaries = await game_service.get_lobby_summaries()
+        assert [summary.id for summary in summaries] == [public.id, dev.id], 'в список попала приватная игра или игра с ботом'
+        assert summaries[0].num_players == 3
+        assert [mode.name for mode in summaries[1].modes] == ['Trinity'], 'dev-мод не выбирается при создании игры'
+        assert not summaries[1].with_myself
+
+        dev.with_myself = True
+        await async_session.commit()
+        lobby = LobbyIndex()
+        await lobby.rebuild(async_session)
+        assert [summary.id for summary in lobby.summaries()] == [public.id], 'в список попала игра с самим собой'
+
+
+class TestMovePipeline:
+    """ Запись хода из памяти (GameService.save_move): ход, передача очереди и результаты - одной транзакцией """
+
+    @staticmethod
+    @contextmanager
+    def count_statements() -> Iterator[list[str]]:
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+    @staticmethod
+    def writes(statements: list[str]) -> list[str]:
+        """ Изменяющие запросы в виде "<команда> <таблица>" """
+        return [
+            ' '.join(match.groups()) for statement in statements
+            if (match := re.match(r'(UPDATE|INSERT INTO|DELETE FROM) "?(\w+)', statement))
+        ]
+
+    @pytest.fixture
+    def anyio_backend(self):
+        # ходы записываются фоновой задачей asyncio (см. live.py)
+        return 'asyncio'
+
+    @pytest.mark.anyio
+    async def test_normal_move(self, started_game: Game, test_user: User):
+        store = LiveGameStore(session_maker=async_session_maker)
+        store.load(started_game)
+        with self.count_statements() as statements:
+            await store.move(test_user.id, MoveInputSchema(x=1, y=1), started_game.id)
+            await store.close()
+        # игра и ее игроки (2 SELECT) + по одному запросу на игру, ход и очередность
+        assert self.writes(statements) == ['UPDATE game', 'INSERT INTO move', 'UPDATE playerrole']
+        assert len(statements) == 5
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id)
+        assert game.move_count == 1
+        assert [(move.x, move.y) for move in game.moves] == [(1, 1)]
+
+    @pytest.mark.anyio
+    async def test_winning_move(self, started_game: Game, test_user: User, second_user: User):
+        store = LiveGameStore(session_maker=async_session_maker)
+        store.load(started_game)
+        for x in range(1, 5):
+            await store.move(test_user.id, MoveInputSchema(x=x, y=1), started_game.id)
+            await store.move(second_user.id, MoveInputSchema(x=x, y=2), started_game.id)
+        await store.flush()
+        with self.count_statements() as statements:
+            result = await store.move(test_user.id, MoveInputSchema(x=5, y=1), started_game.id)
+            await store.close()
+        assert len(result.winning_cells) == 5
+        # флаг finished игроков; у ходившего игрока меняется еще и can_move - отдельный UPDATE
+        assert self.writes(statements) == [
+            'UPDATE game', 'UPDATE playerresult', 'INSERT INTO move', 'UPDATE playerrole', 'UPDATE playerrole',
+        ]
+        assert len(statements) == 7
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id)
+        assert game.state == GameStateEnum.finished
+        assert GameSchemaOut.from_orm(game).winner().player.id == test_user.id
+
+    @pytest.mark.anyio
+    async def test_drawing_move(self, async_session: AsyncSession, started_game: Game, test_user: User):
+        # заполненная доска без 5 в ряд, кроме одной клетки первого игрока
+        size = started_game.board_size
+        values = bytearray(1 + (x // 2 + y) % 2 for y in range(size) for x in range(size))
+        values[0] = 0
+        started_game.board = encode_board(RenjuBoard.from_values(values, size), move_count=size ** 2 - 1)
+        started_game.move_count = size ** 2 - 1
+        await async_session.commit()
+
+        store = LiveGameStore(session_maker=async_session_maker)
+        store.load(started_game)
+        with self.count_statements() as statements:
+            result = await store.move(test_user.id, MoveInputSchema(x=1, y=1), started_game.id)
+            await store.close()
+        assert result.finished and not result.winning_cells
+        # флаг finished игроков; у ходившего игрока меняется еще и can_move - отдельный UPDATE
+        assert self.writes(statements) == [
+            'UPDATE game', 'UPDATE playerresult', 'INSERT INTO move', 'UPDATE playerrole', 'UPDATE playerrole',
+        ]
+        assert len(statements) == 7
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id)
+        assert game.state == GameStateEnum.finished
+        assert {pr.result.result for pr in game.players} == {PlayerResultEnum.draw}
+
+
+class TestLoaderProfiles:
+
+    @pytest.mark.anyio
+    async def test_profiles_load_only_what_is_serialized(self, started_game: Game, test_user: User):
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id, loaders.MOVE)
+            assert {pr.player.id for pr in game.players} >= {test_user.id}
+            assert all(pr.result.result is None for pr in game.players)
+            with pytest.raises(InvalidRequestError):
+                game.moves     # noqa: история ходов профилем хода не загружается
+            with pytest.raises(InvalidRequestError):
+                game.players[0].player.games     # noqa: связи не загружаются каскадом
+
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id, loaders.IN_GAME)
+            assert GameSchemaOut.from_orm(game).id == started_game.id
+
+        # профиль без архива: игра сериализуется по строкам move и доске, архив не читается
+        async with async_session_maker() as db:
+            profile = (*loaders.MOVE, selectinload(Game.modes), selectinload(Game.moves))
+            game = await GameService(db).get_game(started_game.id, profile)
+            assert GameSchemaOut.from_orm(game).moves == []
+
+
+class TestUserGames:
+
+    @pytest.mark.anyio
+    async def test_scopes(self, async_session: AsyncSession, started_game: Game, test_user: User, second_user: User):
+        game_service = GameService(async_session)
+        for scope in ['active', 'unfinished', 'all']:
+            assert [game.id for game in await game_service.get_user_games(test_user, scope)] == [started_game.id]
+        for scope in ['nonstarted', 'finished']:
+            assert await game_service.get_user_games(test_user, scope) == []
+        with pytest.raises(exceptions.UnfinishedGame):
+            await game_service.create_game(creator=test_user, game_data=GameCreateSchema(modes=[]))
+
+        game_meta = await game_service.leave(player=second_user, game_id=started_game.id)
+        assert game_meta.game.state == GameStateEnum.finished
+        assert all(pr.finished for pr in game_meta.game.players)
+        for user in [test_user, second_user]:
+            assert await game_service.get_user_games(user, 'unfinished') == []
+            assert [game.id for game in await game_service.get_user_games(user, 'finished')] == [started_game.id]
+        # после завершения игры можно создать новую
+        game = (await game_service.create_game(creator=test_user, game_data=GameCreateSchema(modes=[]))).game
+        assert [game.id for game in await game_service.get_user_games(test_user, 'nonstarted')] == [game.id]
+
+    @pytest.mark.anyio
+    async def test_finished_games_pages(self, async_session: AsyncSession, test_user: User, second_user: User):
+        # у части игр одинаковое время завершения - порядок внутри них определяет id
+        finished_at = [datetime(2026, 1, 1 + i // 2, tzinfo=timezone.utc) for i in range(7)]
+        for i, moment in enumerate(finished_at):
+            game = Game(state=GameStateEnum.finished, finished_at=moment, board_size=15, classic_mode=False,
+                        with_myself=False, board=b'')
+            game.players.append(PlayerRole(role=PlayerRoleEnum.first, player=test_user, result=PlayerResult()))
+            if i % 3:
+                game.players.append(PlayerRole(role=PlayerRoleEnum.second, player=second_user, result=PlayerResult()))
+            async_session.add(game)
+        async_session.add(Game(state=GameStateEnum.pending, board_size=15, classic_mode=False, with_myself=False,
+                               players=[PlayerRole(role=PlayerRoleEnum.first, player=test_user)]))
+        await async_session.commit()
+        stmt = select(Game.id).where(Game.state == GameStateEnum.finished)
+        expected = (await async_session.scalars(stmt.order_by(Game.finished_at.desc(), Game.id.desc()))).all()
+
+        game_service = GameService(async_session)
+        pages, cursor = [], None
+        while True:
+            games, cursor = await game_service.get_finished_games_page(test_user, limit=3, cursor=cursor)
+            pages.append([game.id for game in games])
+            if cursor is None:
+                break
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert sum(pages, []) == expected
+
+        games, _ = await game_service.get_finished_games_page(second_user, limit=10)
+        assert len(games) == 4
+        page = GameHistoryPage(games=games)
+        assert {len(game.players) for game in page.games} == {2}
+        assert 'board' not in page.games[0].dict() and 'moves' not in page.games[0].dict()
+
+        with pytest.raises(exceptions.InvalidCursor):
+            await game_service.get_finished_games_page(test_user, limit=3, cursor='not-a-cursor')
+
+
+class TestLobbySummaries:
+
+    @pytest.fixture
+    def anyio_backend(self):
+        return 'asyncio'
+
+    @pytest.mark.anyio
+    async def test_projection_matches_game_schema(
+            self,
+            async_session: AsyncSession,
+            started_game: Game,
+            test_user: User,
+    ):
+        game_service = GameService(async_session)
+        await play_moves(started_game, [(test_user, 8, 8)])
+
+        with TestMovePipeline.count_statements() as statements:
+            summaries = await game_service.get_lobby_summaries()
+        assert len(statements) == 3, 'игры, игроки и моды - по одному запросу'
+        assert [summary.id for summary in summaries] == [started_game.id]
+
+        game_schema = GameSchemaOut.from_orm(await game_service.get_game(started_game.id))
+        assert summaries[0] == GameSummarySchema.from_game(game_schema)
+        assert summaries[0].player_2.name == 'second_player' and summaries[0].spectators_num == 0
+        # доска 15 x 15 и ходы в строку лобби не попадают; разница растет с каждым ходом
+        assert len(summaries[0].json()) * 3 < len(game_schema.json())
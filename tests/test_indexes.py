@@ -0,0 +1,135 @@
+import json
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import exceptions
+from app.schemas.game import GameCreateSchema
+from app.models.game import Game, PlayerRole, Move
+from app.models.user import User
+from app.enums.game import PlayerRoleEnum, GameStateEnum
+from app.api.services import loaders
+from app.api.services.games import GameService
+from tests.fixtures.fixture_db import engine, play_moves
+
+SEED_USERS = 2000
+SEED_GAMES = 5000
+SEED_MOVES = 4
+# таблицы, которые растут вместе с историей игр: полный проход по ним в частых запросах недопустим
+GROWING_TABLES = {'game', 'playerrole', 'move', 'user'}
+
+
+@contextmanager
+def capture_queries() -> Iterator[list[tuple[str, tuple]]]:
+    """ Запоминает SELECT-запросы, отправленные в БД, вместе с параметрами """
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.startswith('SELECT'):
+            queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """ Таблицы, которые план запроса (EXPLAIN FORMAT JSON) читает последовательным проходом """
+    tables = [plan['Relation Name']] if plan['Node Type'] == 'Seq Scan' else []
+    for subplan in plan.get('Plans', []):
+        tables += find_seq_scans(subplan)
+    return tables
+
+
+async def assert_no_seq_scans(queries: list[tuple[str, tuple]], tables: set[str] = GROWING_TABLES) -> None:
+    """
+    EXPLAIN каждого запроса: падает, если план читает таблицу из ``tables`` последовательным проходом.
+
+    Последовательный проход штрафуется (``enable_seqscan = off``), и планировщик выбирает его, только если
+    подходящего индекса нет: результат не зависит от того, где на тестовом объеме данных проходит граница
+    между Seq Scan и индексом
+    """
+    assert queries, 'нет запросов для проверки'
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql('SET enable_seqscan = off')
+        for statement, parameters in queries:
+            result = await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            seq_scans = set(find_seq_scans(plan[0]['Plan'])) & tables
+            assert not seq_scans, f'Seq Scan по {seq_scans}:\n{statement}'
+
+
+@pytest_asyncio.fixture
+async def seeded_history(async_session: AsyncSession, test_user: User, second_user: User) -> None:
+    """ Большая история завершенных игр, в том числе с участием test_user; статистика планировщика обновлена """
+    rnd = random.Random(0)
+    users = [
+        dict(id=uuid.uuid4(), email=f'seed{i}@example.com', name=f'seed{i}', hashed_password='-', is_active=True)
+        for i in range(SEED_USERS)
+    ]
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    games, roles, moves = [], [], []
+    for i in range(SEED_GAMES):
+        game_id = uuid.uuid4()
+        games.append(dict(
+            id=game_id, state=GameStateEnum.finished, created_at=started, started_at=started,
+            finished_at=started + timedelta(minutes=i), is_private=False, board_size=15, classic_mode=False,
+            with_myself=False, with_bot=False, num_players=2, board=b'', move_count=SEED_MOVES,
+        ))
+        first, second = rnd.sample(users, 2)
+        first_id = test_user.id if i % 50 == 0 else first['id']
+        for player_id, role in [(first_id, PlayerRoleEnum.first), (second['id'], PlayerRoleEnum.second)]:
+            roles.append(dict(player_id=player_id, game_id=game_id, role=role, ready=True, can_move=False,
+                              finished=True))
+        for n in range(SEED_MOVES):
+            moves.append(dict(game_id=game_id, role=PlayerRoleEnum.first if n % 2 else PlayerRoleEnum.second,
+                              x=n + 1, y=1))
+    await async_session.execute(insert(User), users)
+    await async_session.execute(insert(Game), games)
+    await async_session.execute(insert(PlayerRole), roles)
+    await async_session.execute(insert(Move), moves)
+    await async_session.commit()
+    await async_session.execute(text('ANALYZE'))
+    await async_session.commit()
+
+
+class TestHotQueryPlans:
+
+    @pytest.fixture
+    def anyio_backend(self):
+        return 'asyncio'
+
+    @pytest.mark.anyio
+    async def test_no_seq_scans(
+            self,
+            async_session: AsyncSession,
+            seeded_history: None,
+            started_game: Game,
+            test_user: User,
+    ):
+        game_service = GameService(async_session)
+        await play_moves(started_game, [(test_user, 8, 8)])
+        with capture_queries() as queries:
+            # лобби, экран игры и ход
+            assert [game.id for game in await game_service.get_lobby_summaries()] == [started_game.id]
+            await game_service.get_game(started_game.id, loaders.IN_GAME)
+            await game_service.get_game(started_game.id, loaders.MOVE)
+            # незавершенные игры юзера и проверка перед созданием новой
+            assert len(await game_service.get_user_games(test_user, 'unfinished')) == 1
+            with pytest.raises(exceptions.UnfinishedGame):
+                await game_service.create_game(creator=test_user, game_data=GameCreateSchema(modes=[]))
+            # история: первая и следующая страницы
+            games, cursor = await game_service.get_finished_games_page(test_user, limit=20)
+            games, _ = await game_service.get_finished_games_page(test_user, limit=20, cursor=cursor)
+            assert len(games) == 20
+        await assert_no_seq_scans(queries)
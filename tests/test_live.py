@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from app.core import exceptions
+from app.schemas.game import MoveInputSchema
+from app.models.game import Game
+from app.models.user import User
+from app.enums.game import PlayerRoleEnum, GameStateEnum, PlayerResultEnum
+from app.api.services.games import GameService
+from app.api.services.live import LiveGameStore
+from tests.fixtures.fixture_db import async_session_maker
+
+
+@pytest.fixture
+def anyio_backend():
+    # фоновая запись ходов - задача asyncio
+    return 'asyncio'
+
+
+class TestLiveGameStore:
+
+    @pytest.mark.anyio
+    async def test_moves_validated_in_memory(self, started_game: Game, test_user: User, second_user: User):
+        store = LiveGameStore(session_maker=async_session_maker)
+        live_game = store.load(started_game)
+        assert live_game.current_player.user_id == test_user.id
+
+        with pytest.raises(exceptions.FalseClick):
+            await store.move(user_id=second_user.id, cell=MoveInputSchema(x=1, y=1), game_id=started_game.id)
+        await store.move(user_id=test_user.id, cell=MoveInputSchema(x=1, y=1), game_id=started_game.id)
+        with pytest.raises(exceptions.FalseClick):
+            await store.move(user_id=second_user.id, cell=MoveInputSchema(x=1, y=1), game_id=started_game.id)
+        with pytest.raises(exceptions.NotAPlayer):
+            await store.move(user_id=started_game.id, cell=MoveInputSchema(x=2, y=2), game_id=started_game.id)
+
+        result = await store.move(user_id=second_user.id, cell=MoveInputSchema(x=2, y=2), game_id=started_game.id)
+        assert result.move.role == PlayerRoleEnum.second
+        assert result.game.schema.board[1][1] == 2
+        assert result.game.schema.move_count == 2
+        assert result.game.schema.current_player().player.id == test_user.id
+        await store.close()
+
+    @pytest.mark.anyio
+    async def test_write_behind(self, started_game: Game, test_user: User, second_user: User):
+        store = LiveGameStore(session_maker=async_session_maker)
+        store.load(started_game)
+        for x in range(1, 5):
+            await store.move(user_id=test_user.id, cell=MoveInputSchema(x=x, y=1), game_id=started_game.id)
+            await store.move(user_id=second_user.id, cell=MoveInputSchema(x=x, y=2), game_id=started_game.id)
+        result = await store.move(user_id=test_user.id, cell=MoveInputSchema(x=5, y=1), game_id=started_game.id)
+
+        # результат известен сразу, без записи в БД
+        assert result.finished
+        assert [cell.coord.x for cell in result.winning_cells] == [1, 2, 3, 4, 5]
+        assert result.game.schema.winner().player.id == test_user.id
+        assert store.get(started_game.id) is None, 'завершенная игра убирается из памяти'
+
+        await store.close()
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id)
+            assert game.state == GameStateEnum.finished
+            assert game.move_count == 9
+            assert sorted((move.x, move.y) for move in game.moves) == sorted(
+                [(x, 1) for x in range(1, 6)] + [(x, 2) for x in range(1, 5)]
+            )
+            results = {pr.role: pr.result.result for pr in game.players}
+            assert results == {PlayerRoleEnum.first: PlayerResultEnum.win, PlayerRoleEnum.second: PlayerResultEnum.lose}
+            assert store.load(game) is None
+
+    @pytest.mark.anyio
+    async def test_move_waits_for_reload(self, started_game: Game, test_user: User, second_user: User):
+        store = LiveGameStore(session_maker=async_session_maker)
+        store.load(started_game)
+        await store.move(user_id=test_user.id, cell=MoveInputSchema(x=1, y=1), game_id=started_game.id)
+
+        async with store.reloading(started_game.id):
+            # ход сделан, пока игра читается из БД
+            move = asyncio.create_task(
+                store.move(user_id=second_user.id, cell=MoveInputSchema(x=2, y=2), game_id=started_game.id)
+            )
+            await asyncio.sleep(0)
+            assert not move.done(), 'ход ждет конца перечитывания'
+            async with async_session_maker() as db:
+                game = await GameService(db).get_game(started_game.id)
+                assert game.move_count == 1, 'к началу перечитывания очередь записи дописана'
+                store.load(game)
+        result = await move
+        assert result.game.schema.move_count == 2
+        assert result.game.board.value_at(2, 2) == 2
+
+        await store.close()
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id)
+            assert game.move_count == 2
+            assert sorted((move.x, move.y) for move in game.moves) == [(1, 1), (2, 2)]
+
+    @pytest.mark.anyio
+    async def test_failed_write_evicts_game(
+            self,
+            started_game: Game,
+            test_user: User,
+            second_user: User,
+            monkeypatch,
+    ):
+        failed = []
+
+        async def on_persist_error(game_id):
+            failed.append(game_id)
+
+        async def save_move(service, record):
+            raise ConnectionError('db is down')
+
+        store = LiveGameStore(session_maker=async_session_maker)
+        store.on_persist_error = on_persist_error
+        store.load(started_game)
+        with monkeypatch.context() as patch:
+            patch.setattr(GameService, 'save_move', save_move)
+            await store.move(user_id=test_user.id, cell=MoveInputSchema(x=1, y=1), game_id=started_game.id)
+            await store.move(user_id=second_user.id, cell=MoveInputSchema(x=2, y=2), game_id=started_game.id)
+            await store.flush()
+        await asyncio.sleep(0)
+        assert store.get(started_game.id) is None, 'игра, разошедшаяся с БД, убирается из памяти'
+        assert failed == [started_game.id]
+
+        with pytest.raises(exceptions.NoGameFound):
+            await store.move(user_id=test_user.id, cell=MoveInputSchema(x=3, y=3), game_id=started_game.id)
+        async with async_session_maker() as db:
+            game = await GameService(db).get_game(started_game.id)
+            assert game.move_count == 0, 'следующий ход не пишется поверх незаписанного'
+            live_game = store.load(game)
+        assert live_game.current_player.user_id == test_user.id
+        await store.move(user_id=test_user.id, cell=MoveInputSchema(x=3, y=3), game_id=started_game.id)
+        await store.close()
+        async with async_session_maker() as db:
+            assert (await GameService(db).get_game(started_game.id)).move_count == 1
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.game import GameModeInGameSchema, GameCreateSchema, GameSchemaOut
+from app.models.game import Game
+from app.models.user import User
+from app.enums.game import GameStateEnum
+from app.api.services.games import GameService
+from app.api.services.lobby import LobbyIndex
+
+
+class TestLobbyIndex:
+
+    @pytest.mark.anyio
+    async def test_follows_game_events(
+            self,
+            async_session: AsyncSession,
+            modes_public: list[GameModeInGameSchema],
+            started_game: Game,
+            test_user: User,
+            second_user: User,
+    ):
+        game_service = GameService(async_session)
+        lobby = LobbyIndex()
+        await lobby.rebuild(async_session)
+        assert [summary.id for summary in lobby.summaries()] == [started_game.id]
+        assert await lobby.find_inconsistencies(async_session) == []
+
+        # завершение игры: игрок сдается
+        game_meta = await game_service.leave(player=second_user, game_id=started_game.id)
+        assert game_meta.game.state == GameStateEnum.finished
+        assert await lobby.find_inconsistencies(async_session) == [started_game.id], 'пропущенное событие'
+        lobby.update(GameSchemaOut.from_orm(game_meta.game))
+        assert lobby.summaries() == []
+
+        # создание: публичная игра появляется в лобби, приватная - нет
+        for is_private in [False, True]:
+            game_data = GameCreateSchema(is_private=is_private, modes=modes_public)
+            game = (await game_service.create_game(creator=test_user if is_private else second_user,
+                                                   game_data=game_data)).game
+            lobby.update(GameSchemaOut.from_orm(game))
+            if not is_private:
+                public_game = game
+        assert [summary.id for summary in lobby.summaries()] == [public_game.id]
+        assert await lobby.find_inconsistencies(async_session) == []
+
+        # вход и готовность меняют строку лобби
+        game_meta = await game_service.join_game(player=test_user, game_id=public_game.id)
+        row = lobby.update(GameSchemaOut.from_orm(game_meta.game))
+        assert row.player_2.name == test_user.name and not row.player_2.ready
+        game_meta = await game_service.set_player_ready(player=test_user, game_id=public_game.id)
+        assert lobby.update(GameSchemaOut.from_orm(game_meta.game)).player_2.ready
+        assert await lobby.find_inconsistencies(async_session) == []
+
+        # удаление
+        await game_service.remove_game(game_meta.game)
+        lobby.remove(public_game.id)
+        assert lobby.summaries() == []
+        assert await lobby.find_inconsistencies(async_session) == []
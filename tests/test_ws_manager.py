@@ -0,0 +1,292 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from app.config import config
+from app.core.ws.base import WebSocketActions
+from app.core.ws.broker import Broker, Envelope
+from app.core.ws.manager import ConnectionManager, WSConnection
+from app.core.ws.writer import ConnectionWriter, OutgoingMessage, WriterStats
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0, broken: bool = False):
+        self.sent = []
+        self.delay = delay
+        self.broken = broken
+        self.close_code = None
+
+    async def send_text(self, data: str):
+        if self.broken:
+            raise RuntimeError('Connection is closed.')
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int):
+        self.close_code = code
+
+
+class FakeBroker(Broker):
+    """ Брокер в памяти, общий для нескольких менеджеров ("процессов"): рассылка проходит через формат канала """
+
+    def __init__(self, bus: list['FakeBroker']):
+        super().__init__()
+        self.bus = bus
+        bus.append(self)
+
+    async def publish(self, envelope: Envelope) -> None:
+        data = envelope.dumps()
+        for broker in self.bus:
+            await broker.deliver(Envelope.loads(data))
+
+
+@pytest.fixture
+def anyio_backend():
+    # рассылка - задачи asyncio
+    return 'asyncio'
+
+
+class TestConnectionManager:
+
+    @pytest_asyncio.fixture
+    async def manager(self, monkeypatch) -> ConnectionManager:
+        monkeypatch.setattr(config, 'DEBUG', True)
+        manager = ConnectionManager()
+        yield manager
+        for connection in list(manager.active_connections.all):
+            manager.disconnect(connection)
+        await asyncio.sleep(0)   # отмена задач писателей
+
+    @pytest.mark.anyio
+    async def test_registry(self, manager: ConnectionManager):
+        user_id, other_id = uuid.uuid4(), uuid.uuid4()
+        first, second, other = (WSConnection(FakeWebSocket(), uid) for uid in [user_id, user_id, other_id])
+        for connection in [first, second, other]:
+            await manager.connect(connection)
+        assert await manager.get_online() == 3
+        assert manager.active_connections.get_websocket(user_id) is first.websocket
+        assert manager.active_connections.get_websocket_list([user_id, user_id]) == [first.websocket,
+                                                                                    second.websocket]
+
+        manager.disconnect(first)
+        manager.disconnect(first)
+        assert manager.active_connections.get_websocket(user_id) is second.websocket
+        manager.disconnect(second)
+        assert manager.active_connections.get_websocket(user_id) is None
+        assert list(manager.active_connections.all) == [other]
+
+    @pytest.mark.anyio
+    async def test_rooms(self, manager: ConnectionManager):
+        game_id = uuid.uuid4()
+        player, spectator, offline, outsider = (WSConnection(FakeWebSocket(), uuid.uuid4()) for _ in range(4))
+        for connection in [player, spectator, outsider]:
+            await manager.connect(connection)
+
+        # участник может быть подключен к другому процессу
+        manager.set_room(game_id, [player.user_id, spectator.user_id, offline.user_id])
+        await manager.room_broadcast(game_id, {'action': 'move'})
+        await manager.flush()
+        assert [len(conn.websocket.sent) for conn in [player, spectator, outsider]] == [1, 1, 0]
+
+        # отключение убирает пользователя из комнат, выход из игры - из ее комнаты
+        manager.disconnect(spectator)
+        assert manager.rooms[game_id] == {player.user_id, offline.user_id}
+        manager.set_room(game_id, [player.user_id, outsider.user_id])
+        assert manager.rooms[game_id] == {player.user_id, outsider.user_id}
+        manager.set_room(game_id, [player.user_id])
+        assert manager.rooms[game_id] == {player.user_id} and outsider.user_id not in manager.user_rooms
+
+        manager.close_room(game_id)
+        assert manager.rooms == {} and manager.user_rooms == {}
+        await manager.room_broadcast(game_id, {'action': 'move'})
+        await manager.flush()
+        assert len(player.websocket.sent) == 1
+
+    @pytest.mark.anyio
+    async def test_broadcast_isolates_failures(self, manager: ConnectionManager, monkeypatch):
+        monkeypatch.setattr(config, 'WS_SEND_TIMEOUT', 0.2)
+        encoded = []
+        encode = OutgoingMessage.encode
+        monkeypatch.setattr(OutgoingMessage, 'encode', classmethod(
+            lambda cls, message: encoded.append(message) or encode(message)
+        ))
+        healthy = [WSConnection(FakeWebSocket(), uuid.uuid4()) for _ in range(50)]
+        slow = WSConnection(FakeWebSocket(delay=10), uuid.uuid4())
+        broken = WSConnection(FakeWebSocket(broken=True), uuid.uuid4())
+        for connection in [slow, broken, *healthy]:
+            await manager.connect(connection)
+
+        started = asyncio.get_running_loop().time()
+        await manager.broadcast({'action': 'online_counter', 'total': 52})
+        await manager.flush()
+        assert asyncio.get_running_loop().time() - started < 1, 'медленный получатель задержал рассылку'
+        assert len(encoded) == 1, 'сообщение кодируется один раз на рассылку'
+        assert all(conn.websocket.sent == [{'action': 'online_counter', 'total': 52}] for conn in healthy)
+        assert manager.stats.failed_sends == 2
+        assert manager.metrics()['sent'] == 50
+
+    @pytest.mark.anyio
+    async def test_handler_does_not_wait_for_slow_client(self, manager: ConnectionManager):
+        slow = WSConnection(FakeWebSocket(delay=10), uuid.uuid4())
+        await manager.connect(slow)
+        started = asyncio.get_running_loop().time()
+        for total in range(3):
+            await manager.send_message(slow.websocket, {'action': 'error', 'detail': str(total)})
+        await asyncio.sleep(0)
+        assert asyncio.get_running_loop().time() - started < 0.1
+        assert manager.metrics()['queued'] == 2, 'первое сообщение уже отправляется'
+        manager.disconnect(slow)
+        assert manager.metrics()['connections'] == 0 and manager.writers == {}
+
+
+class TestConnectionWriter:
+
+    @staticmethod
+    def lobby_update(game_id: int, version: int) -> OutgoingMessage:
+        return OutgoingMessage.encode({'action': 'update_game_list', 'game': {'id': game_id, 'version': version}})
+
+    @staticmethod
+    def move(number: int) -> OutgoingMessage:
+        return OutgoingMessage.encode({'action': 'move', 'move': {'id': number}})
+
+    @staticmethod
+    async def fill(policy: str, messages: list[OutgoingMessage]) -> tuple[ConnectionWriter, FakeWebSocket]:
+        """ Писатель с очередью на 3 сообщения, занятый отправкой первого из ``messages`` """
+        websocket = FakeWebSocket(delay=0.05)
+        writer = ConnectionWriter(websocket, WriterStats(), max_size=3, policy=policy)
+        for outgoing in messages:
+            writer.put(outgoing)
+            await asyncio.sleep(0)
+        return writer, websocket
+
+    @pytest.mark.anyio
+    async def test_coalesce(self):
+        writer, websocket = await self.fill('coalesce', [
+            self.move(0), self.lobby_update(1, 1), self.lobby_update(2, 1), self.move(1), self.lobby_update(1, 2),
+        ])
+        await writer.join()
+        writer.stop()
+        # обновление игры 1 заменено на своем месте - до хода, поставленного после устаревшего
+        sent = [(m['action'], m.get('game', {}).get('id'), m.get('game', {}).get('version')) for m in websocket.sent]
+        assert sent == [('move', None, None), ('update_game_list', 1, 2), ('update_game_list', 2, 1), ('move', None, None)]
+        assert websocket.sent[3]['move']['id'] == 1
+
+    @pytest.mark.anyio
+    async def test_drop(self):
+        writer, websocket = await self.fill('drop', [
+            self.move(0), self.lobby_update(1, 1), self.move(1), self.move(2), self.lobby_update(1, 2), self.move(3),
+        ])
+        await writer.join()
+        writer.stop()
+        assert [m['action'] for m in websocket.sent] == ['move'] * 4, 'некритичные вытеснены ходами'
+        assert websocket.close_code is None
+
+    @pytest.mark.anyio
+    async def test_disconnect(self):
+        writer, websocket = await self.fill('coalesce', [self.move(number) for number in range(5)])
+        await writer.join()
+        assert writer.overflowed and websocket.close_code == 1013
+        assert len(websocket.sent) == 1
+
+
+class TestBroker:
+
+    @pytest.mark.anyio
+    async def test_fan_out_across_processes(self, monkeypatch):
+        monkeypatch.setattr(config, 'DEBUG', True)
+        bus = []
+        managers = [ConnectionManager(broker=FakeBroker(bus)) for _ in range(3)]
+        connections = [WSConnection(FakeWebSocket(), uuid.uuid4()) for _ in range(6)]
+        for i, connection in enumerate(connections):
+            await managers[i % 3].connect(connection)
+        game_id = uuid.uuid4()
+        players = [connections[0].user_id, connections[4].user_id]
+
+        # событие игры обработано процессом 0, второй игрок подключен к процессу 1
+        managers[0].set_room(game_id, players)
+        await managers[0].room_broadcast(game_id, {'action': 'move'})
+        await managers[0].send_to_user(connections[4].user_id, {'action': 'unblock_board'})
+        await managers[2].broadcast({'action': 'update_game_list', 'game': {'id': str(game_id)}})
+        for manager in managers:
+            await manager.flush()
+
+        actions = [[message['action'] for message in conn.websocket.sent] for conn in connections]
+        assert actions == [
+            ['move', 'update_game_list'],
+            ['update_game_list'],
+            ['update_game_list'],
+            ['update_game_list'],
+            ['move', 'unblock_board', 'update_game_list'],
+            ['update_game_list'],
+        ]
+        for manager in managers:
+            for connection in list(manager.active_connections.all):
+                manager.disconnect(connection)
+        await asyncio.sleep(0)
+
+    def test_envelope_roundtrip(self):
+        message = OutgoingMessage.encode({'action': 'update_game_list', 'game': {'id': 'x', 'name': 'игра\n1'}})
+        for user_ids in [None, (uuid.uuid4(), uuid.uuid4())]:
+            envelope = Envelope(message, user_ids)
+            assert Envelope.loads(envelope.dumps().encode()) == envelope
+
+
+class TestOnlineTicker:
+
+    @pytest.mark.anyio
+    async def test_reconnect_storm(self, monkeypatch):
+        monkeypatch.setattr(config, 'DEBUG', True)
+        monkeypatch.setattr(config, 'WS_ONLINE_INTERVAL', 0.05)
+
+        class Actions(WebSocketActions):
+            manager = ConnectionManager()
+
+        actions, manager = Actions(), Actions.manager
+        connections = [WSConnection(FakeWebSocket(), uuid.uuid4()) for _ in range(100)]
+        for connection in connections:
+            await actions.on_connect(connection)
+        # переподключение: онлайн тот же
+        await actions.on_disconnect(connections[0], close_code=1000)
+        await actions.on_connect(connections[0])
+        await asyncio.sleep(0.12)
+        await manager.flush()
+
+        counters = [[m['total'] for m in conn.websocket.sent] for conn in connections]
+        assert counters[1] == [2, 100], 'при подключении - текущее значение, дальше - одна рассылка на тик'
+        assert all(sent[-1] == 100 for sent in counters)
+        assert manager.online.broadcasts == 1 and manager.metrics()['online_broadcasts_saved'] == 101
+
+        # значение не изменилось - рассылки нет
+        manager.online.touch()
+        await asyncio.sleep(0.12)
+        assert manager.online.broadcasts == 1
+
+        await manager.close()
+        for connection in connections:
+            manager.disconnect(connection)
+        await asyncio.sleep(0)
+
+    @pytest.mark.anyio
+    async def test_counter_stays_in_process(self, monkeypatch):
+        monkeypatch.setattr(config, 'DEBUG', True)
+        bus = []
+        managers = [ConnectionManager(broker=FakeBroker(bus)) for _ in range(2)]
+        connections = [WSConnection(FakeWebSocket(), uuid.uuid4()) for _ in range(3)]
+        await managers[0].connect(connections[0])
+        for connection in connections[1:]:
+            await managers[1].connect(connection)
+        for manager in managers:
+            manager.online.touch()
+            await manager.online.tick()
+            await manager.flush()
+
+        # значение процесса не уходит через брокер соединениям других процессов
+        assert [[m['total'] for m in conn.websocket.sent] for conn in connections] == [[1], [2], [2]]
+        for manager in managers:
+            await manager.close()
+            for connection in list(manager.active_connections.all):
+                manager.disconnect(connection)
+        await asyncio.sleep(0)